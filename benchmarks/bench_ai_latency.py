@@ -0,0 +1,143 @@
+"""
+📈 AI latency benchmark
+Drives send_code_to_ollama and the editor's AI actions (AICodeAssistant
+generate/explain/optimize) against the fake Ollama server and reports
+p50/p95/p99 latency, time-to-first-token and throughput under concurrency.
+
+    python benchmarks/bench_ai_latency.py -n 50 --concurrency 1 4 8 --prefill 0.2 --tps 50
+
+Pass --url to run the same suite against a real Ollama instance.
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ollama_client import OllamaClient, set_default_client
+from ollama_pyqt5_code_editor import send_code_to_ollama
+from improved_ai_code_editor_working import AICodeAssistant
+from fake_ollama_server import FakeOllamaConfig, FakeOllamaServer
+
+SAMPLE_CODE = '''def total(items):
+    result = 0
+    for item in items:
+        result = result + item.price * item.quantity
+    return result
+'''
+
+_unique = itertools.count()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def timed_call(call: Callable[..., Dict]) -> Dict:
+    """Run one streaming call, measuring time-to-first-token and total latency"""
+    first_token = []
+    start = time.perf_counter()
+
+    def on_chunk(_text):
+        if not first_token:
+            first_token.append(time.perf_counter())
+
+    result = call(on_chunk)
+    end = time.perf_counter()
+    return {
+        "latency": end - start,
+        "ttft": (first_token[0] - start) if first_token else end - start,
+        "tokens": result.get("eval_count", 0),
+        "error": "error" in result,
+    }
+
+
+def run_load(call: Callable[..., Dict], requests_total: int, concurrency: int) -> Dict:
+    """Issue requests_total calls from concurrency threads; aggregate the samples"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda _i: timed_call(call), range(requests_total)))
+    wall = time.perf_counter() - start
+    ok = [s for s in samples if not s["error"]]
+    return {
+        "samples": ok,
+        "errors": len(samples) - len(ok),
+        "wall": wall,
+        "tokens": sum(s["tokens"] for s in ok),
+    }
+
+
+def report(name: str, concurrency: int, stats: Dict):
+    samples = stats["samples"]
+    if not samples:
+        print(f"{name:<22} c={concurrency:<3} all {stats['errors']} requests failed")
+        return
+    lat = [s["latency"] * 1000 for s in samples]
+    ttft = [s["ttft"] * 1000 for s in samples]
+    print(
+        f"{name:<22} c={concurrency:<3} "
+        f"lat p50 {percentile(lat, 50):7.1f} p95 {percentile(lat, 95):7.1f} p99 {percentile(lat, 99):7.1f} ms | "
+        f"ttft p50 {percentile(ttft, 50):7.1f} p95 {percentile(ttft, 95):7.1f} ms | "
+        f"{len(samples) / stats['wall']:6.1f} req/s {stats['tokens'] / stats['wall']:8.1f} tok/s"
+        + (f" | {stats['errors']} errors" if stats["errors"] else "")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--requests", type=int, default=40, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--url", help="Ollama base URL (default: in-process fake server)")
+    parser.add_argument("--model", default="codellama:7b")
+    parser.add_argument("--prefill", type=float, default=0.05, help="fake server prefill delay (s)")
+    parser.add_argument("--tps", type=float, default=200.0, help="fake server tokens per second")
+    parser.add_argument("--tokens", type=int, default=32, help="fake server tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake server 503 rate")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        config = FakeOllamaConfig(prefill_delay=args.prefill, tokens_per_second=args.tps,
+                                  response_tokens=args.tokens, error_rate=args.error_rate)
+        server = FakeOllamaServer(config).start()
+        base_url = server.base_url
+
+    # No response cache: every request must reach the backend to be measured.
+    # Prompts carry a unique suffix so the single-flight layer never merges them.
+    client = OllamaClient(base_url, pool_size=max(args.concurrency))
+    set_default_client(client)
+    assistant = AICodeAssistant(model_name=args.model, client=client)
+
+    scenarios = {
+        "send_code_to_ollama": lambda on_chunk: send_code_to_ollama(
+            f"{SAMPLE_CODE}# {next(_unique)}", model_name=args.model, on_chunk=on_chunk),
+        "assistant.generate": lambda on_chunk: assistant.generate_code(
+            f"a function that sums prices #{next(_unique)}", on_chunk=on_chunk),
+        "assistant.explain": lambda on_chunk: assistant.explain_code(
+            f"{SAMPLE_CODE}# {next(_unique)}", on_chunk=on_chunk),
+        "assistant.optimize": lambda on_chunk: assistant.optimize_code(
+            f"{SAMPLE_CODE}# {next(_unique)}", on_chunk=on_chunk),
+    }
+
+    print(f"{args.requests} requests per scenario against {base_url}")
+    for name, call in scenarios.items():
+        for concurrency in args.concurrency:
+            report(name, concurrency, run_load(call, args.requests, concurrency))
+
+    client.close()
+    if server is not None:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
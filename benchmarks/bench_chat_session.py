@@ -0,0 +1,112 @@
+"""
+💬 Chat session benchmark
+Runs a long multi-turn conversation through ChatSession against the fake
+Ollama server and reports per-turn latency and prefilled tokens. With
+keep_alive the server reuses the KV cache of the unchanged history, so turn
+latency stays flat; with keep_alive=0 (the model is unloaded between turns,
+like re-sending the whole history to a cold server) it grows with every turn.
+
+    python benchmarks/bench_chat_session.py --turns 50 --prefill-per-token 0.0005
+
+Pass --url to run the same conversation against a real Ollama instance.
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from chat_session import ChatSession
+from ollama_client import OllamaClient
+from prompt_builder import PromptBuilder
+from fake_ollama_server import FakeOllamaConfig, FakeOllamaServer
+
+QUESTIONS = (
+    "How can I make this loop faster when the list has a million items?",
+    "What does the walrus operator do in that comprehension?",
+    "Can you rewrite the parser so it streams the file instead of reading it all?",
+    "Why would a dict lookup be slower than expected here?",
+    "Suggest a test for the edge case where the input is empty.",
+)
+
+
+def run_conversation(client: OllamaClient, model: str, turns: int, keep_alive, num_ctx: int) -> List[Dict]:
+    """Run one conversation; returns wall-clock latency and server stats per turn"""
+    session = ChatSession(model, client=client, keep_alive=keep_alive,
+                          system="You are a concise Python assistant.",
+                          prompt_builder=PromptBuilder(num_ctx=num_ctx))
+    samples = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        result = session.send(f"{QUESTIONS[turn % len(QUESTIONS)]} (turn {turn + 1})",
+                              on_chunk=lambda _text: None)
+        latency = time.perf_counter() - start
+        if "error" in result:
+            print(f"turn {turn + 1} failed: {result['error']}")
+            continue
+        samples.append({
+            "turn": turn + 1,
+            "latency": latency,
+            "prefilled": result.get("prompt_eval_count", 0),
+            "history": len(session.messages),
+        })
+    return samples
+
+
+def report(name: str, samples: List[Dict]):
+    if not samples:
+        print(f"{name}: no successful turns")
+        return
+    print(f"\n{name}")
+    print(f"{'turn':>6} {'latency ms':>11} {'prefilled':>10} {'messages':>9}")
+    shown = {1, 2, 5, 10, 20, 30, 40, len(samples)}
+    for sample in samples:
+        if sample["turn"] in shown:
+            print(f"{sample['turn']:>6} {sample['latency'] * 1000:>11.1f} "
+                  f"{sample['prefilled']:>10} {sample['history']:>9}")
+    window = max(1, len(samples) // 5)
+    first = sum(s["latency"] for s in samples[:window]) / window
+    last = sum(s["latency"] for s in samples[-window:]) / window
+    print(f"mean latency first {window} turns {first * 1000:.1f} ms, "
+          f"last {window} turns {last * 1000:.1f} ms ({last / first:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--url", help="Ollama base URL (default: in-process fake server)")
+    parser.add_argument("--model", default="codellama:7b")
+    parser.add_argument("--num-ctx", type=int, default=8192)
+    parser.add_argument("--prefill", type=float, default=0.02, help="fake server fixed prefill delay (s)")
+    parser.add_argument("--prefill-per-token", type=float, default=0.0005,
+                        help="fake server prefill seconds per uncached prompt token")
+    parser.add_argument("--tps", type=float, default=500.0, help="fake server tokens per second")
+    parser.add_argument("--tokens", type=int, default=48, help="fake server tokens per answer")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        config = FakeOllamaConfig(prefill_delay=args.prefill, prefill_per_token=args.prefill_per_token,
+                                  tokens_per_second=args.tps, response_tokens=args.tokens)
+        server = FakeOllamaServer(config).start()
+        base_url = server.base_url
+
+    client = OllamaClient(base_url)
+    print(f"{args.turns}-turn conversation against {base_url}")
+    report("ChatSession, keep_alive=0 (full prefill every turn)",
+           run_conversation(client, args.model, args.turns, 0, args.num_ctx))
+    report("ChatSession, keep_alive=30m (KV cache reused)",
+           run_conversation(client, args.model, args.turns, "30m", args.num_ctx))
+
+    client.close()
+    if server is not None:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
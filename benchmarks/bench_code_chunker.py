@@ -0,0 +1,117 @@
+"""
+🧩 Code chunker benchmark
+Builds a multi-megabyte Python file by concatenating this repository's
+sources with renamed identifiers (so every copy is distinct text), then
+times chunk_source on it cold and from the cache, next to a plain
+ast.parse of the same file. Also times a file that is one giant class,
+and enclosing_chunk lookups as the prompt builder does them.
+
+    python benchmarks/bench_code_chunker.py --megabytes 3
+"""
+
+import os
+import re
+import sys
+import ast
+import time
+import glob
+import argparse
+import statistics
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import code_chunker
+from code_chunker import chunk_source, enclosing_chunk
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+def load_sources() -> list:
+    sources = []
+    for path in sorted(glob.glob(os.path.join(SRC, "*.py"))):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            ast.parse(text)
+        except SyntaxError:
+            continue
+        sources.append(text)
+    return sources
+
+
+def make_module(megabytes: float) -> str:
+    """Repository sources repeated until the size is reached, identifiers suffixed per copy"""
+    sources = load_sources()
+    parts, size, copy = [], 0, 0
+    while size < megabytes * 2 ** 20:
+        for text in sources:
+            renamed = re.sub(r"\bdef (\w+)", rf"def \1_{copy}", text)
+            renamed = re.sub(r"\bclass (\w+)", rf"class \1_{copy}", renamed)
+            parts.append(renamed)
+            size += len(renamed)
+        copy += 1
+    return "\n\n".join(parts)
+
+
+def make_class(megabytes: float) -> str:
+    """One class holding as many methods as fit"""
+    lines, size, i = ["class Giant:", '    """Everything in one place"""', ""], 0, 0
+    while size < megabytes * 2 ** 20:
+        method = (f"    def method_{i}(self, value: int) -> int:\n"
+                  f"        \"\"\"Step {i}\"\"\"\n"
+                  f"        total = value * {i}\n"
+                  f"        for item in range({i % 7 + 1}):\n"
+                  f"            total += self.method_{max(i - 1, 0)}(item)\n"
+                  f"        return total\n")
+        lines.append(method)
+        size += len(method)
+        i += 1
+    return "\n".join(lines)
+
+
+def timed(label: str, text: str, repeat: int):
+    code_chunker._cache.clear()
+    code_chunker._cache_bytes = 0
+    cold = []
+    for _ in range(repeat):
+        code_chunker._cache.clear()
+        code_chunker._cache_bytes = 0
+        start = time.perf_counter()
+        chunks = chunk_source("module.py", text)
+        cold.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    chunk_source("module.py", text)
+    cached = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    ast.parse(text)
+    parse = (time.perf_counter() - start) * 1000
+    kinds = {}
+    for chunk in chunks:
+        kinds[chunk.kind] = kinds.get(chunk.kind, 0) + 1
+    print(f"{label} ({len(text) / 2 ** 20:.1f} MiB, {text.count(chr(10)) + 1} lines): "
+          f"{len(chunks)} chunks {kinds}")
+    print(f"  chunk_source: median {statistics.median(cold):.0f} ms cold, {cached:.1f} ms cached; "
+          f"ast.parse alone: {parse:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    module = make_module(args.megabytes)
+    timed("concatenated sources", module, args.repeat)
+    timed("one giant class", make_class(args.megabytes / 3), args.repeat)
+
+    line_count = module.count("\n") + 1
+    lookups = []
+    for line in range(1, line_count, max(line_count // 50, 1)):
+        start = time.perf_counter()
+        enclosing_chunk("module.py", module, line, line + 2, max_tokens=2048)
+        lookups.append((time.perf_counter() - start) * 1000)
+    print(f"enclosing_chunk: first {lookups[0]:.0f} ms, then median {statistics.median(lookups[1:]):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+🎨 Highlighter benchmark
+Loads generated Python of 1,000 and 100,000 lines into a QTextEdit with
+the PythonHighlighter attached and times the initial highlight, then a
+keystroke in the middle of the file (with the number of lines Qt asks the
+highlighter to redo), and opening and closing a triple quote above a
+function with a docstring. Opening it turns the rest of the file inside
+out (each docstring's second quote opens the next string), so it has to
+re-highlight every following line; their states are checked. The same
+keystroke followed by a full rehighlight() stands in for a naive
+whole-document pass.
+
+    python benchmarks/bench_highlighter.py
+    python benchmarks/bench_highlighter.py --lines 1000 100000 --keystrokes 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Render without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PyQt5.QtWidgets import QApplication, QTextEdit
+from PyQt5.QtGui import QTextCursor
+
+from python_highlighter import IN_TRIPLE_DOUBLE, PythonHighlighter
+
+SAMPLE = '''@property
+def value_{n}(self, items=None):
+    """Return the value for item {n}"""
+    result = [len(item) * 0x{n:x} for item in items or []]  # comment
+    return 'done' if result else None
+
+'''
+
+
+class CountingHighlighter(PythonHighlighter):
+    """Counts the lines it is asked to highlight"""
+
+    calls = 0
+
+    def highlightBlock(self, text: str):
+        self.calls += 1
+        super().highlightBlock(text)
+
+
+def make_source(lines: int) -> str:
+    per_sample = SAMPLE.count("\n")
+    return "".join(SAMPLE.format(n=n) for n in range(lines // per_sample))
+
+
+def type_at(document, line: int, text: str) -> float:
+    start = time.perf_counter()
+    QTextCursor(document.findBlockByNumber(line)).insertText(text)
+    return (time.perf_counter() - start) * 1000
+
+
+def check_open_string(document, line: int):
+    """Every line from line on must end inside the triple-quoted string"""
+    wrong = [block for block in range(line, document.blockCount())
+             if document.findBlockByNumber(block).userState() != IN_TRIPLE_DOUBLE]
+    if wrong:
+        raise RuntimeError(f"{len(wrong)} line(s) after the open quote end outside the string, "
+                           f"first at line {wrong[0] + 1}")
+
+
+def measure(app: QApplication, lines: int, keystrokes: int, naive_keystrokes: int):
+    editor = QTextEdit()
+    document = editor.document()
+    highlighter = CountingHighlighter(document)
+    start = time.perf_counter()
+    editor.setPlainText(make_source(lines))
+    app.processEvents()
+    print(f"{document.blockCount():,} lines: initial highlight {time.perf_counter() - start:.2f}s")
+
+    middle = document.blockCount() // 2
+    middle -= middle % SAMPLE.count("\n")  # The decorator above a function with a docstring
+    highlighter.calls = 0
+    times = [type_at(document, middle, "x") for _ in range(keystrokes)]
+    print(f"  keystroke: median {statistics.median(times):.3f} ms, "
+          f"{highlighter.calls / keystrokes:.0f} line(s) highlighted each")
+
+    highlighter.calls = 0
+    opened = type_at(document, middle, '"""')
+    opened_calls = highlighter.calls
+    check_open_string(document, middle)
+    highlighter.calls = 0
+    closed = type_at(document, middle + 1, '"""')
+    print(f"  open triple quote above a docstring: {opened:.2f} ms ({opened_calls} lines), "
+          f"close it on the next line: {closed:.2f} ms ({highlighter.calls} lines)")
+
+    times = []
+    for _ in range(naive_keystrokes):
+        start = time.perf_counter()
+        QTextCursor(document.findBlockByNumber(middle)).insertText("x")
+        highlighter.rehighlight()
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"  keystroke + full rehighlight (naive): median {statistics.median(times):.1f} ms")
+    editor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--keystrokes", type=int, default=200)
+    parser.add_argument("--naive-keystrokes", type=int, default=3)
+    args = parser.parse_args()
+    app = QApplication(sys.argv)
+    for lines in args.lines:
+        measure(app, lines, args.keystrokes, args.naive_keystrokes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+⏱️ HTTP session benchmark
+Fires hundreds of short prompts at an Ollama-compatible endpoint, once with a
+fresh requests.post() per call (a new TCP connection each time) and once
+through the shared OllamaClient session, and reports the per-request cost
+and, against the stand-in server, how many connections each mode opened.
+
+By default the fake Ollama server runs in-process and answers instantly, so
+the numbers are pure client/connection overhead. Pass --url to measure against
+a real Ollama instead.
+
+    python benchmarks/bench_http_session.py -n 500
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import requests
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ollama_client import OllamaClient
+from fake_ollama_server import FakeOllamaConfig, FakeOllamaServer
+
+
+def time_calls(call, count):
+    """Run call() count times and return per-call latencies in milliseconds"""
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        call(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<28} mean {statistics.mean(latencies):7.3f} ms   "
+          f"p50 {statistics.median(latencies):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--requests", type=int, default=300, help="prompts per mode")
+    parser.add_argument("--url", help="Ollama base URL (default: in-process stand-in server)")
+    parser.add_argument("--model", default="codellama", help="model name sent with each prompt")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        config = FakeOllamaConfig(prefill_delay=0, tokens_per_second=0, response_tokens=1)
+        server = FakeOllamaServer(config).start()
+        base_url = server.base_url
+
+    def one_shot(i):
+        payload = {"model": args.model, "prompt": f"say {i}", "stream": False}
+        requests.post(f"{base_url}/api/generate", json=payload, timeout=20).raise_for_status()
+
+    client = OllamaClient(base_url)
+
+    def pooled(i):
+        result = client.generate(f"say {i}", model=args.model)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+
+    def connections():
+        return server.request_counts.get("connection", 0) if server is not None else 0
+
+    print(f"{args.requests} short prompts against {base_url}")
+    for name, call in (("requests.post (new conn)", one_shot), ("OllamaClient (pooled)", pooled)):
+        opened = connections()
+        report(name, time_calls(call, args.requests))
+        if server is not None:
+            print(f"{'':<28} {connections() - opened} TCP connection(s) opened")
+
+    client.close()
+    if server is not None:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
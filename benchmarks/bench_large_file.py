@@ -0,0 +1,144 @@
+"""
+📜 Large file benchmark
+Writes a generated Python file of the given size and opens it as a
+PieceTable: times the memory-mapped open (the first screen), the
+background line scan, a keystroke (one edit plus reading the lines of a
+screen) and a streamed save, with the process's resident memory after
+each (Linux). Then types into a LargeFileView rendered offscreen and times
+each keystroke with its repaint, against the same for a 1,000-line file.
+Ends with QTextEdit.setPlainText and toPlainText on the large text for
+comparison (up to 200 MB).
+
+    python benchmarks/bench_large_file.py --megabytes 100
+    python benchmarks/bench_large_file.py --megabytes 1024 --keystrokes 50
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+# Render without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PyQt5.QtWidgets import QApplication, QTextEdit
+from PyQt5.QtCore import QEvent, Qt
+from PyQt5.QtGui import QKeyEvent
+
+from piece_table import PieceTable
+from large_file_view import LargeFileView
+
+WORDS = "def return self value items index for in while if else result buffer".split()
+SCREEN_LINES = 50
+
+
+def make_file(path: str, megabytes: float, seed: int = 0) -> int:
+    rng = random.Random(seed)
+    size = lines = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while size < megabytes * 2 ** 20:
+            line = f"    value_{lines} = {' '.join(rng.choices(WORDS, k=8))}\n"
+            f.write(line)
+            size += len(line)
+            lines += 1
+    return lines
+
+
+def resident() -> str:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return f"{int(line.split()[1]) // 1024} MiB resident"
+    except OSError:
+        pass
+    return "resident memory n/a"
+
+
+def piece_table_timings(path: str, keystrokes: int):
+    print(f"before open: {resident()}")
+    start = time.perf_counter()
+    document = PieceTable.open(path)
+    print(f"open: first {len(document)} lines in {(time.perf_counter() - start) * 1000:.1f} ms, {resident()}")
+    start = time.perf_counter()
+    document.scan()
+    document.add_scanned_lines()
+    print(f"  scan: {len(document)} lines in {time.perf_counter() - start:.2f}s, "
+          f"{len(document.page_offsets)} index entries, {resident()}")
+    rng = random.Random(1)
+    times = []
+    for _ in range(keystrokes):
+        line = rng.randrange(len(document) - SCREEN_LINES)
+        start = time.perf_counter()
+        document.insert((line, 4), "x")
+        list(document.lines(line, line + SCREEN_LINES))
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"  keystroke at random lines ({len(document.pieces)} pieces after): "
+          f"median {statistics.median(times):.3f} ms, max {max(times):.3f} ms, {resident()}")
+    start = time.perf_counter()
+    document.save(path + ".saved")
+    print(f"  streamed save: {(time.perf_counter() - start) * 1000:.0f} ms, {resident()}")
+    document.close()
+    os.unlink(path + ".saved")
+
+
+def typing_timings(app: QApplication, path: str, keystrokes: int) -> float:
+    view = LargeFileView()
+    view.resize(1200, 900)
+    view.show()
+    document = PieceTable.open(path)
+    document.scan()
+    document.add_scanned_lines()
+    view.set_document(document)
+    view.go_to_line(len(view.document) // 2)
+    view.setFocus()
+    app.processEvents()
+    times = []
+    for i in range(keystrokes):
+        char = "abc"[i % 3]
+        start = time.perf_counter()
+        view.keyPressEvent(QKeyEvent(QEvent.KeyPress, 0, Qt.NoModifier, char))
+        view.viewport().repaint()
+        times.append((time.perf_counter() - start) * 1000)
+    view.close()
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=100)
+    parser.add_argument("--keystrokes", type=int, default=200)
+    args = parser.parse_args()
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        large = os.path.join(directory, "large.py")
+        small = os.path.join(directory, "small.py")
+        make_file(large, args.megabytes)
+        make_file(small, 1000 * 60 / 2 ** 20)
+        piece_table_timings(large, args.keystrokes)
+
+        for label, path in (("1,000 lines", small), (f"{args.megabytes:g} MB", large)):
+            print(f"LargeFileView keystroke + repaint, {label}: "
+                  f"median {typing_timings(app, path, args.keystrokes):.2f} ms")
+
+        if args.megabytes > 200:
+            return
+        with open(large, encoding="utf-8") as f:
+            text = f.read()
+        editor = QTextEdit()
+        start = time.perf_counter()
+        editor.setPlainText(text)
+        loaded = time.perf_counter() - start
+        start = time.perf_counter()
+        editor.toPlainText()
+        print(f"QTextEdit: setPlainText {loaded:.1f}s, toPlainText {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+🔤 Lexical index benchmark
+Generates a synthetic Python project (identifiers drawn from a Zipf-like
+vocabulary, so some terms are in almost every file and most are rare),
+indexes it with LexicalIndex, re-indexes it unchanged after reopening, and
+times BM25 queries of a few words and of a whole pasted file. Then times
+saving one file, and the segment merge.
+
+    python benchmarks/bench_lexical_index.py --files 50000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lexical_index import LexicalIndex
+
+WORDS = ("get set load save read write parse format build update handle request response "
+         "client server cache token model prompt chunk index vector search query result error "
+         "retry timeout session stream buffer line text file path config editor widget").split()
+
+
+def make_project(root: str, files: int, seed: int = 0) -> np.ndarray:
+    """Write files of a few small functions each; returns the vocabulary"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"{rng.choice(WORDS)}_{rng.choice(WORDS)}{i}" for i in range(files * 2)])
+    # Zipf-like: low indices are common
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    drawn = vocabulary[rng.choice(len(vocabulary), size=(files, 24), p=weights)]
+    for i, names in enumerate(drawn):
+        directory = os.path.join(root, f"pkg{i // 1000}")
+        os.makedirs(directory, exist_ok=True)
+        functions = []
+        for f in range(3):
+            a, b, c, d = names[f * 8:f * 8 + 4]
+            functions.append(f"def {a}({b}, {c}):\n    \"\"\"{d} helper\"\"\"\n"
+                             f"    {d} = {b}.{c}()\n    return {a}({d})\n")
+        with open(os.path.join(directory, f"module{i}.py"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(functions))
+    return vocabulary
+
+
+def timed_queries(index: LexicalIndex, queries, label: str):
+    index._postings_cache.clear()
+    cold = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=5)
+        cold.append((time.perf_counter() - start) * 1000)
+    warm = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=5)
+        warm.append((time.perf_counter() - start) * 1000)
+    print(f"  {label}: median {statistics.median(cold):.2f} ms cold, {statistics.median(warm):.2f} ms warm, "
+          f"max {max(cold):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as directory:
+        project = os.path.join(directory, "project")
+        start = time.perf_counter()
+        vocabulary = make_project(project, args.files)
+        print(f"generated {args.files} files in {time.perf_counter() - start:.1f}s")
+
+        index = LexicalIndex(os.path.join(directory, "index"))
+        start = time.perf_counter()
+        result = index.build(project)
+        size = os.path.getsize(os.path.join(directory, "index", "lexical.sqlite3")) / 2 ** 20
+        print(f"indexed {result} in {time.perf_counter() - start:.1f}s ({size:.0f} MiB on disk)")
+
+        index.close()
+        start = time.perf_counter()
+        index = LexicalIndex(os.path.join(directory, "index"))
+        print(f"reopened in {(time.perf_counter() - start) * 1000:.0f} ms")
+        start = time.perf_counter()
+        result = index.build(project)
+        print(f"rebuilt unchanged project: {result} in {time.perf_counter() - start:.1f}s")
+
+        short = [" ".join(rng.choice(vocabulary[:2000], size=3)) for _ in range(args.queries)]
+        timed_queries(index, short, "3-identifier queries")
+        words = [" ".join(rng.choice(WORDS, size=2)) for _ in range(args.queries)]
+        timed_queries(index, words, "2 common words")
+        path = os.path.join(project, "pkg0", "module0.py")
+        with open(path, encoding="utf-8") as f:
+            code = f.read()
+        timed_queries(index, [code] * 5, "whole file as query")
+
+        for i in range(3):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(f"\n\ndef edited{i}():\n    return {vocabulary[i]}\n")
+            start = time.perf_counter()
+            index.update_file(path)
+            print(f"  save one file: {(time.perf_counter() - start) * 1000:.0f} ms")
+        start = time.perf_counter()
+        index.merge_segments()
+        print(f"merged segments in {time.perf_counter() - start:.1f}s")
+        timed_queries(index, short, "3-identifier queries after merge")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
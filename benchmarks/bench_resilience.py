@@ -0,0 +1,126 @@
+"""
+🛡️ Resilience benchmark
+Measures how the Ollama client behaves when the backend misbehaves:
+
+  * flaky: the fake server answers a share of requests with 503 (as Ollama
+    does while a model loads); compares the success rate without and with
+    retries.
+  * outage: the backend accepts no connections, so every connect times out;
+    compares the time each "click" waits without and with the circuit
+    breaker, then how quickly requests work again once the server is back.
+
+    python benchmarks/bench_resilience.py --clicks 10 --error-rate 0.3
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+from typing import List
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ollama_client import OllamaClient
+from resilience import RetryPolicy
+from fake_ollama_server import FakeOllamaConfig, FakeOllamaServer
+
+MODEL = "codellama:7b"
+
+
+class Blackhole:
+    """A port whose accept queue is full, so new connections hang until the connect timeout"""
+
+    def __init__(self):
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(0)
+        self.fillers: List[socket.socket] = []
+        for _ in range(4):
+            filler = socket.socket()
+            filler.setblocking(False)
+            try:
+                filler.connect(self.listener.getsockname())
+            except BlockingIOError:
+                pass
+            self.fillers.append(filler)
+        time.sleep(0.1)
+
+    @property
+    def port(self) -> int:
+        return self.listener.getsockname()[1]
+
+    def close(self):
+        for filler in self.fillers:
+            filler.close()
+        self.listener.close()
+
+
+def no_resilience(client: OllamaClient) -> OllamaClient:
+    """Make a client behave like the original code: one attempt, no circuit breaker"""
+    client.retry = RetryPolicy(max_attempts=1)
+    client.breaker.failure_threshold = sys.maxsize
+    return client
+
+
+def flaky(args):
+    config = FakeOllamaConfig(prefill_delay=0.01, tokens_per_second=2000, error_rate=args.error_rate)
+    server = FakeOllamaServer(config).start()
+    print(f"flaky backend: {args.error_rate:.0%} of requests answered with 503")
+    for name, client in (("single attempt", no_resilience(OllamaClient(server.base_url))),
+                         ("with retries", OllamaClient(server.base_url))):
+        start = time.perf_counter()
+        ok = sum("error" not in client.generate(f"flaky {name} {i}", model=MODEL)
+                 for i in range(args.clicks * 4))
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<16} {ok}/{args.clicks * 4} succeeded, {elapsed / (args.clicks * 4) * 1000:.0f} ms per request")
+        client.close()
+    server.stop()
+
+
+def outage(args):
+    blackhole = Blackhole()
+    base_url = f"http://127.0.0.1:{blackhole.port}"
+    timeouts = {"generate": (args.connect_timeout, 120), "tags": (args.connect_timeout, 5)}
+    print(f"\noutage: connections time out after {args.connect_timeout:.1f}s")
+    for name, client in (("no breaker", no_resilience(OllamaClient(base_url, timeouts))),
+                         ("circuit breaker", OllamaClient(base_url, timeouts))):
+        waits = []
+        for i in range(args.clicks):
+            start = time.perf_counter()
+            client.generate(f"outage {name} {i}", model=MODEL)
+            waits.append(time.perf_counter() - start)
+        print(f"  {name:<16} first click {waits[0]:.2f}s, mean {sum(waits) / len(waits):.2f}s, "
+              f"total blocked {sum(waits):.1f}s over {args.clicks} clicks")
+        if name == "circuit breaker":
+            recovery(client, blackhole)
+        client.close()
+    blackhole.close()
+
+
+def recovery(client: OllamaClient, blackhole: Blackhole):
+    """Bring a server up on the dead port and time until requests succeed again"""
+    port = blackhole.port
+    blackhole.close()
+    server = FakeOllamaServer(FakeOllamaConfig(prefill_delay=0.01), port=port).start()
+    start = time.perf_counter()
+    while "error" in client.generate(f"recovery {time.perf_counter()}", model=MODEL):
+        time.sleep(0.05)
+    print(f"  back up: requests succeed again after {time.perf_counter() - start:.2f}s "
+          f"({client.breaker.rejected} requests failed fast while open)")
+    server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clicks", type=int, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--connect-timeout", type=float, default=3.05)
+    args = parser.parse_args()
+    flaky(args)
+    outage(args)
+
+
+if __name__ == "__main__":
+    main()
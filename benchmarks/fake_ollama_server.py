@@ -0,0 +1,354 @@
+"""
+🧪 Fake Ollama Server
+A stand-in for the Ollama HTTP API so the AI paths can be exercised and
+benchmarked offline or in CI. Implements /api/generate, /api/chat,
+/api/tags, /api/ps and /api/embed with configurable prefill delay,
+generation speed, error rate and streaming. Like Ollama, a model is loaded on first use (an
+empty prompt only loads it) and stays loaded for keep_alive, and the
+processed prompt of the last request per model is kept as a KV cache: a
+request that starts with the same text only pays prefill for the rest.
+
+    python benchmarks/fake_ollama_server.py --port 11434 --prefill 0.2 --tps 40
+
+Point the editor at it with OLLAMA_HOST=http://127.0.0.1:<port>.
+"""
+
+import os
+import re
+import json
+import math
+import functools
+import time
+import random
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("def", "return", "self", "value", "result", "data", "for", "in", "if",
+         "the", "function", "loop", "list", "None", "import", "class", "code")
+
+
+@dataclass
+class FakeOllamaConfig:
+    """Behaviour knobs of the fake server"""
+    prefill_delay: float = 0.05        # Fixed seconds before the first token
+    prefill_per_token: float = 0.0     # Extra seconds per prompt token not in the KV cache
+    tokens_per_second: float = 200.0   # Generation speed
+    response_tokens: int = 32          # Tokens per answer unless num_predict is set
+    error_rate: float = 0.0            # Fraction of requests answered with HTTP 503
+    embedding_dim: int = 64
+    kv_cache: bool = True              # Reuse the cached prefix of the previous prompt
+    load_delay: float = 0.0            # Seconds to load a model that isn't in memory
+    default_keep_alive: float = 300.0  # Seconds a model stays loaded if keep_alive isn't given
+    models: List[str] = field(default_factory=lambda: ["codellama:7b", "qwen2.5-coder:1.5b"])
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def model_size(name: str) -> int:
+    """Plausible size in bytes of a 4-bit model, from the parameter count in its tag"""
+    match = re.search(r"(\d+(?:\.\d+)?)b", name)
+    return int(float(match.group(1)) * 0.6e9) if match else 0
+
+
+def parse_keep_alive(value, default: float) -> float:
+    """keep_alive as seconds: numbers are seconds, strings like "30s", "10m", "1h"; negative is forever"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        units = {"s": 1, "m": 60, "h": 3600}
+        text = str(value).strip()
+        if text and text[-1] in units:
+            seconds = float(text[:-1]) * units[text[-1]]
+        else:
+            seconds = float(text)
+    return math.inf if seconds < 0 else seconds
+
+
+def fake_tokens(seed: str, count: int) -> List[str]:
+    """Deterministic answer tokens for a prompt"""
+    rng = random.Random(hashlib.sha256(seed.encode("utf-8")).hexdigest())
+    return [rng.choice(WORDS) + " " for _ in range(count)]
+
+
+@functools.lru_cache(maxsize=50_000)
+def _word_vector(word: str, dim: int) -> tuple:
+    rng = random.Random(hashlib.sha256(word.encode("utf-8")).hexdigest())
+    return tuple(rng.gauss(0, 1) for _ in range(dim))
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """Deterministic unit vector for a text; texts sharing words get similar vectors"""
+    vector = [0.0] * dim
+    for word in re.findall(r"[A-Za-z_]\w*", text.lower()) or [text]:
+        vector = [v + w for v, w in zip(vector, _word_vector(word, dim))]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Request handler; the config lives on the server object"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    @property
+    def config(self) -> FakeOllamaConfig:
+        return self.server.config
+
+    def setup(self):
+        super().setup()
+        self.server.record_request("connection")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            models = [{"name": name, "model": name, "size": model_size(name)} for name in self.config.models]
+            self.send_json({"models": models})
+        elif self.path == "/api/ps":
+            models = [{"name": name, "model": name, "size": model_size(name)}
+                      for name in self.server.loaded_models()]
+            self.send_json({"models": models})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self.send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        self.server.record_request(self.path)
+        if random.random() < self.config.error_rate:
+            self.send_json({"error": "server busy, model is loading"}, status=503)
+            return
+
+        if self.path == "/api/generate":
+            self.generate(body, chat=False)
+        elif self.path == "/api/chat":
+            self.generate(body, chat=True)
+        elif self.path == "/api/embed":
+            inputs = body.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            embeddings = [fake_embedding(text, self.config.embedding_dim) for text in inputs]
+            self.send_json({"model": body.get("model"), "embeddings": embeddings})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def generate(self, body: Dict, chat: bool):
+        """Answer /api/generate or /api/chat, streaming unless stream is false"""
+        model = body.get("model", "")
+        if chat:
+            # Rendered like a chat template, so the next turn starts with this turn's text
+            prompt = "".join(f"<|{m.get('role', 'user')}|>{m.get('content', '')}"
+                             for m in body.get("messages", [])) + "<|assistant|>"
+        else:
+            prompt = body.get("prompt", "")
+        keep_alive = parse_keep_alive(body.get("keep_alive"), self.config.default_keep_alive)
+        started = time.perf_counter()
+        if not prompt and not chat:
+            # An empty prompt only loads (or, with keep_alive 0, unloads) the model
+            if keep_alive == 0:
+                self.server.unload(model)
+                reason = "unload"
+            else:
+                self.server.load(model, keep_alive)
+                reason = "load"
+            self.send_json({"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                            "response": "", "done": True, "done_reason": reason})
+            return
+        load_duration = self.server.load(model, keep_alive)
+
+        options = body.get("options") or {}
+        tokens = fake_tokens(model + prompt, options.get("num_predict", self.config.response_tokens))
+        cached = self.server.cached_prefix(model, prompt)
+        prompt_tokens = count_tokens(prompt[cached:])
+
+        prefill_started = time.perf_counter()
+        time.sleep(self.config.prefill_delay + prompt_tokens * self.config.prefill_per_token)
+        prefill_done = time.perf_counter()
+        self.server.remember(model, prompt + "".join(tokens), keep_alive)
+
+        def chunk(text: str, done: bool) -> Dict:
+            data = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"), "done": done}
+            if chat:
+                data["message"] = {"role": "assistant", "content": text}
+            else:
+                data["response"] = text
+            return data
+
+        def final_chunk() -> Dict:
+            data = chunk("", True)
+            now = time.perf_counter()
+            data.update({
+                "done_reason": "stop",
+                "total_duration": int((now - started) * 1e9),
+                "load_duration": int(load_duration * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int((prefill_done - prefill_started) * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int((now - prefill_done) * 1e9),
+            })
+            if not chat:
+                data["context"] = list(range(prompt_tokens + len(tokens)))
+            return data
+
+        delay = 1.0 / self.config.tokens_per_second if self.config.tokens_per_second > 0 else 0
+        if body.get("stream", True) is False:
+            time.sleep(delay * len(tokens))
+            data = final_chunk()
+            text = "".join(tokens)
+            if chat:
+                data["message"]["content"] = text
+            else:
+                data["response"] = text
+            self.send_json(data)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                time.sleep(delay)
+                self.write_chunk(chunk(token, False))
+            self.write_chunk(final_chunk())
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream (cancelled request): stop generating
+            self.server.record_request("cancelled")
+            self.close_connection = True
+
+    def write_chunk(self, data: Dict):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def send_json(self, data: Dict, status: int = 200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Threaded fake Ollama server with per-endpoint request counters"""
+
+    daemon_threads = True
+
+    def __init__(self, config: FakeOllamaConfig = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), FakeOllamaHandler)
+        self.config = config or FakeOllamaConfig()
+        self.request_counts: Dict[str, int] = {}
+        self.kv_cache: Dict[str, str] = {}
+        self.loaded_until: Dict[str, float] = {}  # Model -> monotonic unload time
+        self._counts_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self, path: str):
+        with self._counts_lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def is_loaded(self, model: str) -> bool:
+        with self._counts_lock:
+            return self.loaded_until.get(model, 0) > time.monotonic()
+
+    def loaded_models(self) -> List[str]:
+        now = time.monotonic()
+        with self._counts_lock:
+            return [model for model, until in self.loaded_until.items() if until > now]
+
+    def load(self, model: str, keep_alive: float) -> float:
+        """Make sure model is in memory for keep_alive more seconds; returns the load time spent"""
+        load_time = 0.0
+        if not self.is_loaded(model):
+            self.record_request("load")
+            with self._counts_lock:
+                self.kv_cache.pop(model, None)
+            load_time = self.config.load_delay
+            time.sleep(load_time)
+        with self._counts_lock:
+            self.loaded_until[model] = time.monotonic() + keep_alive
+        return load_time
+
+    def unload(self, model: str):
+        with self._counts_lock:
+            self.loaded_until.pop(model, None)
+            self.kv_cache.pop(model, None)
+
+    def cached_prefix(self, model: str, prompt: str) -> int:
+        """Length of the prompt prefix already in the model's KV cache"""
+        if not self.config.kv_cache:
+            return 0
+        with self._counts_lock:
+            cached = self.kv_cache.get(model, "")
+        return len(os.path.commonprefix([cached, prompt]))
+
+    def remember(self, model: str, text: str, keep_alive: float):
+        """Keep the processed text as the model's KV cache; keep_alive 0 unloads the model"""
+        if keep_alive == 0:
+            self.unload(model)
+            return
+        with self._counts_lock:
+            self.kv_cache[model] = text
+
+    def start(self) -> "FakeOllamaServer":
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--prefill", type=float, default=0.05, help="seconds before the first token")
+    parser.add_argument("--prefill-per-token", type=float, default=0.0, help="extra seconds per uncached prompt token")
+    parser.add_argument("--tps", type=float, default=200.0, help="generated tokens per second")
+    parser.add_argument("--tokens", type=int, default=32, help="tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 503")
+    parser.add_argument("--no-kv-cache", action="store_true", help="prefill the whole prompt every time")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="seconds to load a model into memory")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        prefill_delay=args.prefill, prefill_per_token=args.prefill_per_token,
+        tokens_per_second=args.tps, response_tokens=args.tokens, error_rate=args.error_rate,
+        kv_cache=not args.no_kv_cache, load_delay=args.load_delay
+    )
+    server = FakeOllamaServer(config, args.host, args.port)
+    print(f"Fake Ollama listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+📊 AI Metrics
+Records every AI request the app makes: model, action, prompt and output
+tokens, time to first token, total latency, whether it was a cache hit and
+whether it failed. The recorder keeps a bounded history in memory, computes
+percentiles and histograms for the statistics dialog, and exports the raw
+samples as JSON or CSV so runs on different models or hardware can be
+compared.
+"""
+
+import csv
+import json
+import time
+import platform
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class RequestMetric:
+    """Measurements of one AI request"""
+    timestamp: float
+    model: str
+    action: str
+    prompt_tokens: int
+    output_tokens: int
+    ttft: float        # Seconds until the first piece of text arrived
+    latency: float     # Seconds until the request finished
+    cache_hit: bool
+    error: str = ""
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Output speed after the first token (0 for cache hits and unstreamed requests)"""
+        if self.cache_hit:
+            return 0.0
+        generating = self.latency - self.ttft
+        return self.output_tokens / generating if generating > 0 and self.output_tokens else 0.0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for no values)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# Measurements that are meaningless for cache hits
+LIVE_ONLY_FIELDS = ("ttft", "tokens_per_second")
+
+
+class MetricsRecorder:
+    """Thread-safe store of recent request metrics"""
+
+    def __init__(self, max_samples: int = 10_000):
+        self.samples: "deque[RequestMetric]" = deque(maxlen=max_samples)
+        self.cancelled = 0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[RequestMetric], None]] = []
+
+    def add_listener(self, listener: Callable[[RequestMetric], None]):
+        """Call listener(metric) after each recorded request (on the recording thread)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[RequestMetric], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def record(self, metric: RequestMetric):
+        with self._lock:
+            self.samples.append(metric)
+        for listener in list(self._listeners):
+            listener(metric)
+
+    def record_result(self, action: str, model: str, result: Dict, started: float,
+                      first_token: Optional[float] = None):
+        """Record a finished Ollama request from its result dict and timings (perf_counter)"""
+        if result.get("cancelled"):
+            with self._lock:
+                self.cancelled += 1
+            return
+        finished = time.perf_counter()
+        self.record(RequestMetric(
+            timestamp=time.time(),
+            model=model,
+            action=action,
+            prompt_tokens=result.get("prompt_eval_count", 0),
+            output_tokens=result.get("eval_count", 0),
+            ttft=(first_token or finished) - started,
+            latency=finished - started,
+            cache_hit=bool(result.get("cached")),
+            error=result.get("error", ""),
+        ))
+
+    def snapshot(self) -> List[RequestMetric]:
+        with self._lock:
+            return list(self.samples)
+
+    def clear(self):
+        with self._lock:
+            self.samples.clear()
+            self.cancelled = 0
+
+    def summary(self, samples: Optional[List[RequestMetric]] = None) -> Dict:
+        """Counts, rates and latency percentiles over samples (default: all)"""
+        if samples is None:
+            samples = self.snapshot()
+        ok = [m for m in samples if not m.error]
+        live = [m for m in ok if not m.cache_hit]
+        latencies = [m.latency for m in ok]
+        ttfts = [m.ttft for m in live]
+        speeds = [m.tokens_per_second for m in live if m.tokens_per_second]
+        return {
+            "requests": len(samples),
+            "errors": len(samples) - len(ok),
+            "success_rate": len(ok) / len(samples) if samples else 0.0,
+            "cache_hit_rate": (len(ok) - len(live)) / len(ok) if ok else 0.0,
+            "latency": {p: percentile(latencies, p) for p in (50, 95, 99)},
+            "ttft": {p: percentile(ttfts, p) for p in (50, 95, 99)},
+            "tokens_per_second": sum(speeds) / len(speeds) if speeds else 0.0,
+            "prompt_tokens": sum(m.prompt_tokens for m in ok),
+            "output_tokens": sum(m.output_tokens for m in ok),
+        }
+
+    def breakdown(self, key: str) -> Dict[str, Dict]:
+        """summary() per value of a RequestMetric field, e.g. "model" or "action" """
+        groups: Dict[str, List[RequestMetric]] = {}
+        for metric in self.snapshot():
+            groups.setdefault(getattr(metric, key), []).append(metric)
+        return {name: self.summary(group) for name, group in groups.items()}
+
+    def histogram(self, field: str = "latency", bins: int = 10,
+                  samples: Optional[List[RequestMetric]] = None) -> List[tuple]:
+        """(low, high, count) buckets of a numeric field over the successful samples"""
+        if samples is None:
+            samples = self.snapshot()
+        samples = [m for m in samples if not m.error]
+        if field in LIVE_ONLY_FIELDS:
+            samples = [m for m in samples if not m.cache_hit]
+        values = [getattr(m, field) for m in samples]
+        if field == "tokens_per_second":
+            values = [value for value in values if value]
+        if not values:
+            return []
+        low, high = min(values), max(values)
+        width = (high - low) / bins or 1.0
+        counts = [0] * bins
+        for value in values:
+            counts[min(int((value - low) / width), bins - 1)] += 1
+        return [(low + i * width, low + (i + 1) * width, counts[i]) for i in range(bins)]
+
+    def export_json(self, path: str):
+        """Write the samples plus host information, for comparing runs"""
+        data = {
+            "exported_at": time.time(),
+            "host": {
+                "node": platform.node(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "system": platform.platform(),
+            },
+            "summary": self.summary(),
+            "samples": [asdict(m) for m in self.snapshot()],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def export_csv(self, path: str):
+        """Write one row per sample"""
+        names = [f.name for f in fields(RequestMetric)]
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=names)
+            writer.writeheader()
+            for metric in self.snapshot():
+                writer.writerow(asdict(metric))
+
+
+_default_recorder = MetricsRecorder()
+
+
+def get_default_recorder() -> MetricsRecorder:
+    """The recorder shared by the app's Ollama client and statistics dialog"""
+    return _default_recorder
@@ -0,0 +1,170 @@
+"""
+🧵 AI Job Executor
+A small pool of QThread workers that runs LLM requests off the GUI thread.
+Jobs report streamed text and their final result back through Qt signals,
+so the window stays responsive while a generation is in progress. Jobs can
+be cancelled, and a newer job with the same supersede key cancels the older
+one so no CPU is spent on generations nobody will read.
+"""
+
+import queue
+import logging
+import itertools
+from typing import Callable, Dict, Hashable, List, Optional, Set
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from ollama_client import CancelToken, cancelled_result
+
+logger = logging.getLogger(__name__)
+
+
+class AIJob(QObject):
+    """A single AI request queued on an AIJobExecutor"""
+
+    # Emitted from the worker thread; Qt queues delivery to the GUI thread
+    started = pyqtSignal()
+    chunk = pyqtSignal(str)
+    finished = pyqtSignal(dict)
+
+    _ids = itertools.count(1)
+
+    def __init__(self, func: Callable[..., Dict], args: tuple, kwargs: dict,
+                 supersede_key: Optional[Hashable] = None):
+        super().__init__()
+        self.job_id = next(self._ids)
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.supersede_key = supersede_key
+        self.cancel_token = CancelToken()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token.cancelled
+
+    def cancel(self):
+        """Cancel the job; a running request has its HTTP stream closed"""
+        self.cancel_token.cancel()
+
+    def run(self):
+        """Call the job function in the current (worker) thread"""
+        if self.cancelled:
+            self.finished.emit(cancelled_result())
+            return
+        self.started.emit()
+        try:
+            result = self.func(*self.args, on_chunk=self.chunk.emit,
+                               cancel_token=self.cancel_token, **self.kwargs)
+        except Exception as e:
+            logger.exception("AI job %d failed", self.job_id)
+            result = {"error": f"Unexpected error: {e}"}
+        self.finished.emit(result)
+
+
+class AIWorkerThread(QThread):
+    """Worker thread that runs queued jobs until it receives the stop sentinel"""
+
+    def __init__(self, jobs: "queue.Queue[Optional[AIJob]]", parent=None):
+        super().__init__(parent)
+        self.jobs = jobs
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            job.run()
+
+
+class AIJobExecutor(QObject):
+    """Runs AI jobs on a fixed pool of worker threads"""
+
+    # (queued, running) whenever a job is submitted, starts or finishes
+    load_changed = pyqtSignal(int, int)
+
+    def __init__(self, max_workers: int = 2, parent=None):
+        super().__init__(parent)
+        self.jobs: "queue.Queue[Optional[AIJob]]" = queue.Queue()
+        self.active_jobs: Dict[int, AIJob] = {}
+        self.running_jobs: Set[int] = set()
+        self.latest_jobs: Dict[Hashable, AIJob] = {}
+        self.workers: List[AIWorkerThread] = []
+        for _ in range(max_workers):
+            worker = AIWorkerThread(self.jobs)
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, func: Callable[..., Dict], *args,
+               on_chunk: Optional[Callable[[str], None]] = None,
+               on_finished: Optional[Callable[[Dict], None]] = None,
+               supersede_key: Optional[Hashable] = None,
+               **kwargs) -> AIJob:
+        """Queue func(*args, on_chunk=..., cancel_token=..., **kwargs) and return its job.
+
+        The callbacks are connected before the job is queued, so no signal
+        can be emitted before they are in place. They run on the GUI thread.
+        Chunks of a cancelled job are dropped; on_finished still runs, with a
+        result marked "cancelled". Submitting a job with the same
+        supersede_key as an unfinished one cancels the older job.
+        """
+        if supersede_key is not None:
+            previous = self.latest_jobs.get(supersede_key)
+            if previous is not None:
+                previous.cancel()
+
+        job = AIJob(func, args, kwargs, supersede_key)
+        if on_chunk is not None:
+            job.chunk.connect(lambda text: None if job.cancelled else on_chunk(text))
+        job.started.connect(lambda: self._mark_running(job))
+        job.finished.connect(lambda _result: self._forget(job))
+        if on_finished is not None:
+            job.finished.connect(on_finished)
+        self.active_jobs[job.job_id] = job
+        if supersede_key is not None:
+            self.latest_jobs[supersede_key] = job
+        self.jobs.put(job)
+        self._emit_load()
+        return job
+
+    def cancel_all(self):
+        """Cancel every queued and running job"""
+        for job in list(self.active_jobs.values()):
+            job.cancel()
+
+    def _mark_running(self, job: AIJob):
+        if job.job_id in self.active_jobs:
+            self.running_jobs.add(job.job_id)
+            self._emit_load()
+
+    def _forget(self, job: AIJob):
+        """Drop bookkeeping for a finished job"""
+        self.active_jobs.pop(job.job_id, None)
+        self.running_jobs.discard(job.job_id)
+        if self.latest_jobs.get(job.supersede_key) is job:
+            del self.latest_jobs[job.supersede_key]
+        self._emit_load()
+
+    def _emit_load(self):
+        self.load_changed.emit(self.queued_count(), self.running_count())
+
+    def pending_count(self) -> int:
+        """Number of submitted jobs that have not finished yet"""
+        return len(self.active_jobs)
+
+    def running_count(self) -> int:
+        """Number of jobs a worker is running right now"""
+        return len(self.running_jobs)
+
+    def queued_count(self) -> int:
+        """Number of jobs waiting for a free worker"""
+        return len(self.active_jobs) - len(self.running_jobs)
+
+    def shutdown(self, wait: bool = True):
+        """Cancel outstanding jobs and stop all workers"""
+        self.cancel_all()
+        for _ in self.workers:
+            self.jobs.put(None)
+        if wait:
+            for worker in self.workers:
+                worker.wait()
@@ -0,0 +1,166 @@
+"""
+🚦 Backend Status
+Tracks the live state of the Ollama backend for the status bar: whether it
+is reachable, which model is loaded, how fast tokens are streaming right
+now and how many AI jobs are queued or running. Everything is driven by
+events from the client (circuit breaker, finished requests, streamed
+chunks) and the job executor; the only timer runs while text is streaming,
+to turn chunk counts into a tokens-per-second rate.
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from ai_worker import AIJobExecutor
+from ollama_client import OllamaClient
+from resilience import CircuitBreaker
+
+RATE_INTERVAL_MS = 500
+
+
+class BackendStatus(QObject):
+    """Aggregates backend events into one status the GUI can show"""
+
+    changed = pyqtSignal()
+
+    # Client callbacks run on worker threads; these hop to the GUI thread
+    _reachability_changed = pyqtSignal(bool)
+    _request_finished = pyqtSignal(str)
+    _models_loaded = pyqtSignal(list)
+    _stream_started = pyqtSignal()
+
+    def __init__(self, client: OllamaClient, executor: Optional[AIJobExecutor] = None, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.executor = executor
+        self.reachable: Optional[bool] = None  # None until the first check
+        self.loaded_models: List[str] = []
+        self.tokens_per_second = 0.0
+        self.queued = 0
+        self.running = 0
+
+        self._chunks = 0
+        self._measuring = False
+        self._chunks_lock = threading.Lock()
+        self._rate_started = time.monotonic()
+        self.rate_timer = QTimer(self)
+        self.rate_timer.setInterval(RATE_INTERVAL_MS)
+        self.rate_timer.timeout.connect(self.update_rate)
+
+        self._reachability_changed.connect(self.set_reachable)
+        self._request_finished.connect(self.on_request_finished)
+        self._models_loaded.connect(self.set_loaded_models)
+        self._stream_started.connect(self.start_rate)
+        client.breaker.add_listener(self.on_breaker_state)
+        client.add_observer(self.on_result)
+        client.add_stream_listener(self.on_chunk)
+        if executor is not None:
+            executor.load_changed.connect(self.set_load)
+
+    def close(self):
+        """Stop listening to the client and executor (when the window closes)"""
+        self.client.breaker.remove_listener(self.on_breaker_state)
+        self.client.remove_observer(self.on_result)
+        self.client.remove_stream_listener(self.on_chunk)
+        if self.executor is not None:
+            self.executor.load_changed.disconnect(self.set_load)
+        self.rate_timer.stop()
+
+    @property
+    def loaded_model(self) -> str:
+        return self.loaded_models[0] if self.loaded_models else ""
+
+    @property
+    def saturated(self) -> bool:
+        """Jobs are waiting for the backend"""
+        return self.queued > 0
+
+    def check(self):
+        """Ask the server once, in the background, whether it is up and what it has loaded"""
+        def run():
+            result = self.client.running_models()
+            self._reachability_changed.emit("error" not in result)
+            if "error" not in result:
+                self._models_loaded.emit([m.get("name", "") for m in result.get("models", [])])
+        threading.Thread(target=run, name="ollama-status", daemon=True).start()
+
+    def on_breaker_state(self, state: str):
+        """Circuit breaker listener; runs on whichever thread changed the state"""
+        self._reachability_changed.emit(state == CircuitBreaker.CLOSED)
+
+    def on_result(self, model: str, result: Dict):
+        """Client observer; runs on the requesting thread"""
+        self._request_finished.emit(model)
+
+    def set_reachable(self, reachable: bool):
+        if reachable != self.reachable:
+            self.reachable = reachable
+            if not reachable:
+                self.loaded_models = []
+            self.changed.emit()
+
+    def set_loaded_models(self, models: List[str]):
+        if models != self.loaded_models:
+            self.loaded_models = models
+            self.changed.emit()
+
+    def set_loaded_model(self, model: str):
+        """A model was loaded (e.g. by ModelManager); it becomes the current one"""
+        self.set_loaded_models([model] + [m for m in self.loaded_models if m != model])
+
+    def on_request_finished(self, model: str):
+        # A request only completes on a reachable server with its model loaded
+        self.set_reachable(True)
+        self.set_loaded_model(model)
+
+    def set_load(self, queued: int, running: int):
+        self.queued, self.running = queued, running
+        self.changed.emit()
+
+    def on_chunk(self, model: str, text: str):
+        """Stream listener; runs on the requesting thread for every chunk"""
+        with self._chunks_lock:
+            self._chunks += 1
+            starting = not self._measuring
+            self._measuring = True
+        if starting:
+            self._stream_started.emit()
+
+    def start_rate(self):
+        self._rate_started = time.monotonic()
+        self.rate_timer.start()
+
+    def update_rate(self):
+        """Turn the chunks counted since the last tick into tokens per second"""
+        # Ollama streams one token per chunk
+        now = time.monotonic()
+        with self._chunks_lock:
+            chunks, self._chunks = self._chunks, 0
+            # Stop ticking once a whole interval passes without text
+            self._measuring = chunks > 0
+        elapsed = now - self._rate_started
+        self._rate_started = now
+        self.tokens_per_second = chunks / elapsed if elapsed > 0 else 0.0
+        if not chunks:
+            self.rate_timer.stop()
+        self.changed.emit()
+
+    def text(self) -> str:
+        """One-line status bar summary"""
+        if self.reachable is None:
+            parts = ["⚪ Checking Ollama..."]
+        elif self.reachable:
+            parts = ["🟢 Ollama reachable"]
+        else:
+            parts = ["🔴 Ollama unreachable"]
+        parts.append(f"🧠 {self.loaded_model}" if self.loaded_model else "🧠 No model loaded")
+        if self.tokens_per_second:
+            parts.append(f"⚡ {self.tokens_per_second:.1f} tok/s")
+        jobs = f"📋 {self.running} running, {self.queued} queued"
+        if self.saturated:
+            jobs = "⏳ " + jobs
+        parts.append(jobs)
+        return " | ".join(parts)
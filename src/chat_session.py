@@ -0,0 +1,126 @@
+"""
+💬 Chat Session
+A multi-turn conversation with an Ollama model over /api/chat. Each turn
+sends the history in the same order with keep_alive set, so the model stays
+loaded and Ollama can reuse the KV cache of the unchanged prefix: only the
+newest messages have to be prefilled, and per-turn latency stays flat as the
+conversation grows. History that no longer fits the context window is
+dropped from the front in large steps, so the cached prefix is rarely
+invalidated.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from model_router import ModelRouter
+from ollama_client import CancelToken, OllamaClient, get_default_client
+from prompt_builder import PromptBuilder, TokenCounter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEEP_ALIVE = "30m"
+
+
+class ChatSession:
+    """Conversation history plus the settings that keep the server-side cache warm"""
+
+    def __init__(self, model: str, client: Optional[OllamaClient] = None,
+                 system: Optional[str] = None, keep_alive: str = DEFAULT_KEEP_ALIVE,
+                 prompt_builder: Optional[PromptBuilder] = None):
+        self.model = model
+        self.client = client or get_default_client()
+        self.system = system
+        self.keep_alive = keep_alive
+        self.prompt_builder = prompt_builder or PromptBuilder()
+        self.temperature: Optional[float] = None
+        # Picks the model per turn when set ("chat" rule); otherwise model is used
+        self.router: Optional[ModelRouter] = None
+        self.messages: List[Dict] = []
+        self.turns: List[Dict] = []  # Server-reported timings of every completed turn
+        # Turns run on worker threads; one at a time keeps the history consistent
+        self._lock = threading.Lock()
+
+    @property
+    def counter(self) -> TokenCounter:
+        return self.prompt_builder.counter
+
+    def send(self, text: str, on_chunk: Optional[Callable[[str], None]] = None,
+             cancel_token: Optional[CancelToken] = None) -> Dict:
+        """Send a user message and return Ollama's reply dict (or an error dict).
+
+        The message, the reply and any trimming of old turns are committed
+        to the history only if the turn succeeded; a failed or cancelled
+        turn leaves the history as it was.
+        """
+        with self._lock:
+            messages = self._trim_history(self.messages + [{"role": "user", "content": text}])
+            request = self._request_messages(messages)
+            options = {"num_ctx": self.prompt_builder.num_ctx}
+            if self.temperature is not None:
+                options["temperature"] = self.temperature
+            result = self.client.chat(
+                request, model=self.model_for(request), options=options,
+                on_chunk=on_chunk, cancel_token=cancel_token, keep_alive=self.keep_alive
+            )
+            if "error" in result:
+                if not result.get("cancelled"):
+                    logger.warning("Chat turn failed: %s", result["error"])
+                return result
+            messages.append({"role": "assistant", "content": result["message"]["content"]})
+            self.messages = messages
+            self.turns.append({
+                "prompt_eval_count": result.get("prompt_eval_count", 0),
+                "prompt_eval_duration": result.get("prompt_eval_duration", 0),
+                "eval_count": result.get("eval_count", 0),
+                "total_duration": result.get("total_duration", 0),
+            })
+            return result
+
+    def model_for(self, request: List[Dict]) -> str:
+        """Model for a turn sending request.
+
+        The whole request counts towards the estimate: only the model that
+        answered the previous turn has its prefix cached, and a turn routed
+        elsewhere pays for all of it.
+        """
+        if self.router is None:
+            return self.model
+        prompt_tokens = sum(self.counter.count(m["content"]) for m in request)
+        return self.router.route("chat", prompt_tokens, default=self.model)
+
+    def reset(self):
+        """Forget the conversation"""
+        with self._lock:
+            self.messages.clear()
+            self.turns.clear()
+
+    def _request_messages(self, messages: List[Dict]) -> List[Dict]:
+        if self.system:
+            return [{"role": "system", "content": self.system}] + messages
+        return list(messages)
+
+    def _trim_history(self, messages: List[Dict]) -> List[Dict]:
+        """Return messages without the oldest turns once they outgrow the prompt budget.
+
+        Every trim changes the prefix and costs one full prefill, so instead
+        of dropping a single turn per message (a cache miss on every turn)
+        history is cut back to half the budget at once.
+        """
+        budget = self.prompt_builder.budget
+        if self.system:
+            budget -= self.counter.count(self.system)
+        sizes = [self.counter.count(m["content"]) for m in messages]
+        if sum(sizes) <= budget:
+            return messages
+        keep_tokens = budget // 2
+        start = len(messages) - 1  # Always keep the new user message
+        kept = sizes[start]
+        while start > 0 and kept + sizes[start - 1] <= keep_tokens:
+            start -= 1
+            kept += sizes[start]
+        # Start the history on a user message, as the model expects
+        while start < len(messages) - 1 and messages[start]["role"] != "user":
+            start += 1
+        logger.debug("Dropping %d old chat messages", start)
+        return messages[start:]
@@ -0,0 +1,478 @@
+"""
+🧩 Code Chunker
+Cuts source files into chunks for AI prompts and the project indexes.
+Python is cut along its syntax: the module header (docstring, imports,
+constants), each top-level function and each class become chunks, and a
+class over the token cap is split into its header and its methods, a
+function into groups of whole statements. Every chunk starts with the
+signatures of the scopes around it (e.g. ``class Editor(QWidget):``), so a
+method read on its own still says where it lives.
+
+Top-level units are found with a line scan and only units over the cap are
+parsed with ast, so a multi-megabyte file is never parsed as a whole, and a
+syntax error mid-edit only affects the unit it is in. Results are cached
+per file content hash. Other files fall back to blocks of lines.
+"""
+
+import ast
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from prompt_builder import TokenCounter
+
+# Token cap per chunk: about a screenful of code, well inside embedding models' context
+MAX_CHUNK_TOKENS = 512
+# Neighbouring chunks smaller than this are joined, so one-line helpers don't each cost an embedding
+MIN_CHUNK_TOKENS = 48
+# Total size of the source texts whose chunks are cached
+CACHE_BYTES = 32 * 1024 * 1024
+
+_DEFINITION = re.compile(r"[ \t]*(?:async[ \t]+)?(def|class)[ \t]+(\w+)")
+_UNIT_DEFINITION = re.compile(r"@|(?:async[ \t]+)?(?:def|class)\b")
+_TRIPLE_QUOTE = re.compile(r'"""|\'\'\'')
+_DEFINITION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+@dataclass
+class Chunk:
+    """A block of lines from one source file"""
+    path: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    text: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.path}:{self.start_line}-{self.end_line}"
+
+    @property
+    def hash(self) -> str:
+        return hashlib.sha1(self.text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CodeChunk(Chunk):
+    """A chunk cut along the code's structure; text is scope followed by source"""
+    kind: str = "block"  # "module", "class", "function", "method" or "block"
+    name: str = ""       # Qualified name, e.g. "Editor.save"
+    scope: str = ""      # Signature lines of the enclosing class/function
+    tokens: int = 0
+
+    @property
+    def source(self) -> str:
+        """The chunk's own lines, without the enclosing signatures"""
+        return self.text[len(self.scope):]
+
+
+def split_lines(text: str) -> List[str]:
+    """Lines with their endings, split on "\\n" only so numbers match ast's"""
+    lines = text.split("\n")
+    for index in range(len(lines) - 1):
+        lines[index] += "\n"
+    if lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def chunk_text(path: str, text: str, max_lines: int = 40, min_lines: int = 8) -> List[Chunk]:
+    """Cut text into chunks at top-level blocks.
+
+    A block starts at each unindented line after a blank line, so chunk
+    boundaries only depend on nearby text: an edit changes the chunks it
+    touches, not every chunk after it. Blocks over max_lines are split the
+    same way at any line after a blank line (e.g. between methods), and
+    only then into fixed windows. Short blocks join the previous chunk
+    while it has fewer than min_lines lines.
+    """
+    lines = split_lines(text)
+    top_level = lambda i: not lines[i][0].isspace() and not lines[i - 1].strip()
+    after_blank = lambda i: not lines[i - 1].strip()
+
+    chunks = []
+    for start, end in _split_spans(lines, 0, len(lines), top_level, min_lines, max_lines):
+        if end - start > max_lines:
+            spans = _split_spans(lines, start, end, after_blank, min_lines, max_lines)
+        else:
+            spans = [(start, end)]
+        for span_start, span_end in spans:
+            for window in range(span_start, span_end, max_lines):
+                window_end = min(span_end, window + max_lines)
+                body = "".join(lines[window:window_end])
+                if body.strip():
+                    chunks.append(Chunk(path, window + 1, window_end, body))
+    return chunks
+
+
+def _split_spans(lines: List[str], start: int, end: int, is_boundary: Callable[[int], bool],
+                 min_lines: int, max_lines: int) -> List[tuple]:
+    """Split lines[start:end] at non-blank lines where is_boundary(i), merging short spans"""
+    starts = [start] + [i for i in range(start + 1, end) if lines[i].strip() and is_boundary(i)]
+    spans: List[List[int]] = []
+    for span_start, span_end in zip(starts, starts[1:] + [end]):
+        if spans and spans[-1][1] - spans[-1][0] < min_lines and span_end - spans[-1][0] <= max_lines:
+            spans[-1][1] = span_end
+        else:
+            spans.append([span_start, span_end])
+    return [tuple(span) for span in spans]
+
+
+def is_python(path: str) -> bool:
+    """Whether path is chunked as Python (untitled documents, with no path, are)"""
+    return not path or path.endswith((".py", ".pyw"))
+
+
+_cache: "OrderedDict[tuple, Tuple[List[CodeChunk], int]]" = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def chunk_source(path: str, text: str, max_tokens: int = MAX_CHUNK_TOKENS,
+                 min_tokens: int = MIN_CHUNK_TOKENS) -> List[CodeChunk]:
+    """Chunks of a file's text, at most max_tokens each; cached by content.
+
+    Pass min_tokens=0 for exactly one chunk per function, method and
+    class header (functions over the cap still come in several parts).
+    """
+    global _cache_bytes
+    key = (path, hashlib.sha1(text.encode("utf-8")).hexdigest(), max_tokens, min_tokens)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return list(cached[0])
+
+    chunker = _Chunker(path, text, max_tokens, min_tokens)
+    chunks = chunker.python() if is_python(path) else chunker.blocks()
+
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = (chunks, len(text))
+            _cache_bytes += len(text)
+        while _cache_bytes > CACHE_BYTES and len(_cache) > 1:
+            _key, (_chunks, size) = _cache.popitem(last=False)
+            _cache_bytes -= size
+    return list(chunks)
+
+
+def enclosing_chunk(path: str, text: str, first_line: int, last_line: Optional[int] = None,
+                    max_tokens: int = MAX_CHUNK_TOKENS) -> Optional[CodeChunk]:
+    """The function, method or class header holding 1-based lines first..last, if one does"""
+    if not is_python(path):
+        return None
+    last_line = first_line if last_line is None else last_line
+    for chunk in chunk_source(path, text, max_tokens, min_tokens=0):
+        if chunk.start_line <= first_line and last_line <= chunk.end_line:
+            return chunk if chunk.kind in ("class", "function", "method") else None
+    return None
+
+
+def _indentation(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _parse(source: str) -> Optional[ast.Module]:
+    """ast.parse, or None if source isn't valid Python"""
+    try:
+        return ast.parse(source)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+
+def _unit_starts(lines: List[str], start: int, end: int, indent: str = "") -> List[int]:
+    """First lines of the units among lines[start:end] at an indentation:
+    each def/class, with its decorators and the comments right above it, and
+    each run of other statements.
+
+    A line scan that follows triple-quoted strings, so that only the units
+    that need splitting have to be parsed.
+    """
+    starts = [start]
+    width = len(indent)
+    open_quote = None
+    decorated = False
+    in_definition = False
+    for index in range(start, end):
+        line = lines[index]
+        quoted = open_quote is not None
+        if '"""' in line or "'''" in line:
+            for match in _TRIPLE_QUOTE.finditer(line):
+                if open_quote is None:
+                    open_quote = match.group()
+                elif match.group() == open_quote:
+                    open_quote = None
+        # Deeper lines, blank lines, comments and continuation lines never start a unit
+        if quoted or len(line) <= width or line[width] in " \t\r\n#)]}" or not line.startswith(indent):
+            continue
+        starts_unit = False
+        if _UNIT_DEFINITION.match(line, width):
+            starts_unit = not decorated
+            decorated = line[width] == "@"
+            in_definition = True
+        elif in_definition:
+            starts_unit = True
+            in_definition = decorated = False
+        if starts_unit and index > start:
+            first = index
+            while first - 1 > starts[-1] and lines[first - 1].lstrip().startswith("#"):
+                first -= 1
+            starts.append(first)
+    return starts
+
+
+class _Chunker:
+    """Chunks one file; line token counts are shared by the recursive passes"""
+
+    def __init__(self, path: str, text: str, max_tokens: int, min_tokens: int):
+        self.path = path
+        self.text = text
+        self.lines = split_lines(text)
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        # Per chunker: it only remembers this file's scope headers, and parallel files don't share a lock
+        self.counter = TokenCounter()
+        # Code repeats lines a lot (blank lines, closing brackets), so each distinct one is counted once
+        counts = {line: self.counter.count(line, remember=False) for line in set(self.lines)}
+        self.prefix = [0] + list(accumulate(counts[line] for line in self.lines))
+
+    def tokens(self, start: int, end: int, scope: str = "") -> int:
+        """Tokens of lines[start:end] (0-based, end exclusive) under a scope header"""
+        return self.prefix[end] - self.prefix[start] + (self.counter.count(scope) if scope else 0)
+
+    def fits(self, start: int, end: int, scope: str) -> bool:
+        return self.tokens(start, end, scope) <= self.max_tokens
+
+    def chunk(self, start: int, end: int, scope: str, kind: str, name: str) -> List[CodeChunk]:
+        """lines[start:end] as a chunk, without leading and trailing blank lines"""
+        while start < end and not self.lines[start].strip():
+            start += 1
+        while end > start and not self.lines[end - 1].strip():
+            end -= 1
+        if start == end:
+            return []
+        source = "".join(self.lines[start:end])
+        return [CodeChunk(self.path, start + 1, end, scope + source, kind, name, scope,
+                          self.tokens(start, end, scope))]
+
+    def windows(self, start: int, end: int, scope: str, kind: str, name: str) -> List[CodeChunk]:
+        """Consecutive runs of lines within the cap, for code that can't be split further"""
+        chunks = []
+        budget = self.max_tokens - self.counter.count(scope)
+        while start < end:
+            stop = start + 1
+            while stop < end and self.prefix[stop + 1] - self.prefix[start] <= budget:
+                stop += 1
+            chunks.extend(self.chunk(start, stop, scope, kind, name))
+            start = stop
+        return chunks
+
+    def blocks(self) -> List[CodeChunk]:
+        """Non-Python files: chunk_text blocks, cut further where over the cap"""
+        chunks = []
+        for block in chunk_text(self.path, self.text):
+            chunks.extend(self.windows(block.start_line - 1, block.end_line, "", "block", ""))
+        return chunks
+
+    def python(self) -> List[CodeChunk]:
+        chunks = self.units(0, len(self.lines), "", "", "", in_class=False)
+        return self.merge(chunks) if self.min_tokens else chunks
+
+    def units(self, start: int, end: int, indent: str, scope: str, prefix: str,
+              in_class: bool) -> List[CodeChunk]:
+        """Chunks of the statements in lines[start:end] at an indentation"""
+        chunks = []
+        starts = _unit_starts(self.lines, start, end, indent)
+        for unit_start, unit_end in zip(starts, starts[1:] + [end]):
+            chunks.extend(self.unit(unit_start, unit_end, indent, scope, prefix, in_class))
+        return chunks
+
+    def unit(self, start: int, end: int, indent: str, scope: str, prefix: str,
+             in_class: bool) -> List[CodeChunk]:
+        """One definition or run of statements; only parsed when it must be split"""
+        kind, name = self.describe(start, end, in_class)
+        name = prefix + name if name else prefix.rstrip(".")
+        if self.fits(start, end, scope):
+            return self.chunk(start, end, scope, kind, name)
+        if kind == "class":
+            chunks = self.scan_class(start, end, scope, name)
+            if chunks is not None:
+                return chunks
+        # Indented code parses as the body of an "if"; its line numbers then start one early
+        source = "".join(self.lines[start:end])
+        tree = _parse("if 1:\n" + source if indent else source)
+        if tree is None:
+            return self.windows(start, end, scope, kind, name)
+        nodes, offset = (tree.body[0].body, start - 1) if indent else (tree.body, start)
+        return self.body(nodes, start, end, offset, scope, prefix, in_class)
+
+    def scan_class(self, start: int, end: int, scope: str, name: str) -> Optional[List[CodeChunk]]:
+        """Split a class at its members without parsing it; None if its layout is unusual"""
+        lines = self.lines
+        line = next((i for i in range(start, end) if _DEFINITION.match(lines[i])), None)
+        if line is None:
+            return None
+        # The signature ends at the first ":" outside brackets
+        depth = 0
+        signature_end = None
+        for index in range(line, end):
+            code = lines[index].split("#", 1)[0]
+            depth += sum(map(code.count, "([{")) - sum(map(code.count, ")]}"))
+            if depth <= 0 and code.rstrip().endswith(":"):
+                signature_end = index + 1
+                break
+        if signature_end is None:
+            return None
+        body = next((i for i in range(signature_end, end)
+                     if lines[i].strip() and not lines[i].lstrip().startswith("#")), None)
+        if body is None:
+            return None
+        class_indent = _indentation(lines[line])
+        indent = _indentation(lines[body])
+        if len(indent) <= len(class_indent):
+            return None
+
+        inner = scope + "".join(lines[line:signature_end])
+        starts = _unit_starts(lines, signature_end, end, indent) + [end]
+        if not self.describe(starts[0], starts[1], True)[1]:
+            # Docstring and attributes go with the decorators and signature
+            starts.pop(0)
+        # The header is a chunk of its own under the outer scope, even when a member follows at once
+        if self.fits(start, starts[0], scope):
+            chunks = self.chunk(start, starts[0], scope, "class", name)
+        else:
+            chunks = self.windows(start, starts[0], scope, "class", name)
+        for unit_start, unit_end in zip(starts, starts[1:]):
+            chunks.extend(self.unit(unit_start, unit_end, indent, inner, name + ".", in_class=True))
+        return chunks
+
+    def describe(self, start: int, end: int, in_class: bool) -> Tuple[str, str]:
+        """Kind and unqualified name of a unit from its first code line"""
+        for line in self.lines[start:end]:
+            code = line.lstrip()
+            if code and not code.startswith(("@", "#")):
+                match = _DEFINITION.match(line)
+                if match and match.group(1) == "class":
+                    return "class", match.group(2)
+                if match:
+                    return ("method" if in_class else "function"), match.group(2)
+                break
+        return ("class" if in_class else "module"), ""
+
+    def node_start(self, node: ast.stmt, offset: int, floor: int) -> int:
+        """0-based first line of a statement, with decorators and the comments above it"""
+        lines = [node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])]
+        start = offset + min(lines) - 1
+        while start - 1 >= floor and self.lines[start - 1].lstrip().startswith("#"):
+            start -= 1
+        return start
+
+    def starts(self, nodes: Sequence[ast.stmt], start: int, offset: int) -> List[int]:
+        """First line of each statement; the first one takes everything from start"""
+        starts = [start]
+        for previous, node in zip(nodes, nodes[1:]):
+            starts.append(self.node_start(node, offset, offset + previous.end_lineno))
+        return starts
+
+    def body(self, nodes: Sequence[ast.stmt], start: int, end: int, offset: int,
+             scope: str, prefix: str, in_class: bool) -> List[CodeChunk]:
+        """Chunks of a module or class body: one per definition, others grouped"""
+        chunks = []
+        starts = self.starts(nodes, start, offset) + [end]
+        index = 0
+        while index < len(nodes):
+            node = nodes[index]
+            if isinstance(node, _DEFINITION_NODES):
+                chunks.extend(self.definition(node, starts[index], starts[index + 1], offset,
+                                              scope, prefix, in_class))
+                index += 1
+                continue
+            run_end = index
+            while run_end < len(nodes) and not isinstance(nodes[run_end], _DEFINITION_NODES):
+                run_end += 1
+            kind = "class" if in_class else "module"
+            chunks.extend(self.statements(nodes[index:run_end], starts[index], starts[run_end], offset,
+                                          scope, scope, kind, prefix.rstrip(".")))
+            index = run_end
+        return chunks
+
+    def definition(self, node: ast.stmt, start: int, end: int, offset: int,
+                   scope: str, prefix: str, in_class: bool) -> List[CodeChunk]:
+        """A function or class; split when over the cap"""
+        name = prefix + node.name
+        if isinstance(node, ast.ClassDef):
+            kind = "class"
+        else:
+            kind = "method" if in_class else "function"
+        if self.fits(start, end, scope):
+            return self.chunk(start, end, scope, kind, name)
+
+        body_start = self.node_start(node.body[0], offset, offset + node.lineno - 1)
+        signature = "".join(self.lines[offset + node.lineno - 1:body_start])
+        if not signature:  # Body on the def line itself
+            return self.windows(start, end, scope, kind, name)
+        inner = scope + signature
+        if kind != "class":
+            # The first group holds the decorators and signature, so it keeps the outer scope
+            return self.statements(node.body, start, end, offset, scope, inner, kind, name)
+
+        members = next((i for i, member in enumerate(node.body) if isinstance(member, _DEFINITION_NODES)),
+                       len(node.body))
+        header_end = end
+        if members < len(node.body):
+            header_end = self.node_start(node.body[members], offset,
+                                         offset + node.body[members - 1].end_lineno if members
+                                         else body_start)
+        chunks = []
+        if members:
+            chunks = self.statements(node.body[:members], start, header_end, offset, scope, inner, "class", name)
+        if members < len(node.body):
+            chunks.extend(self.body(node.body[members:], header_end, end, offset, inner, name + ".", True))
+        return chunks
+
+    def statements(self, nodes: Sequence[ast.stmt], start: int, end: int, offset: int,
+                   first_scope: str, scope: str, kind: str, name: str) -> List[CodeChunk]:
+        """Group consecutive statements into chunks within the cap.
+
+        The first group uses first_scope and the rest scope. A statement over
+        the cap alone is split itself if it is a definition, else into windows.
+        """
+        chunks = []
+        starts = self.starts(nodes, start, offset) + [end]
+        group_start, group_scope = start, first_scope
+        for index, node in enumerate(nodes):
+            node_end = starts[index + 1]
+            if self.fits(group_start, node_end, group_scope):
+                continue
+            node_start = starts[index]
+            if node_start > group_start:
+                chunks.extend(self.chunk(group_start, node_start, group_scope, kind, name))
+                group_start, group_scope = node_start, scope
+            if self.fits(node_start, node_end, group_scope):
+                continue
+            if isinstance(node, _DEFINITION_NODES):
+                chunks.extend(self.definition(node, node_start, node_end, offset, group_scope,
+                                              name + ".", in_class=False))
+            else:
+                chunks.extend(self.windows(node_start, node_end, group_scope, kind, name))
+            group_start, group_scope = node_end, scope
+        chunks.extend(self.chunk(group_start, end, group_scope, kind, name))
+        return chunks
+
+    def merge(self, chunks: List[CodeChunk]) -> List[CodeChunk]:
+        """Join neighbours with the same scope while one is under min_tokens"""
+        merged: List[CodeChunk] = []
+        for chunk in chunks:
+            previous = merged[-1] if merged else None
+            if (previous is not None and previous.scope == chunk.scope
+                    and min(previous.tokens, chunk.tokens) < self.min_tokens
+                    and self.fits(previous.start_line - 1, chunk.end_line, chunk.scope)):
+                kind = previous.kind if previous.kind == chunk.kind else "block"
+                name = ", ".join(n for n in dict.fromkeys(previous.name.split(", ") + [chunk.name]) if n)
+                merged[-1] = self.chunk(previous.start_line - 1, chunk.end_line, chunk.scope, kind, name)[0]
+            else:
+                merged.append(chunk)
+        return merged
@@ -0,0 +1,143 @@
+"""
+🌳 Completion Cache
+Remembers inline completions per document so that continued typing reuses
+them. A completion is stored as the text typed on its line plus the
+suggestion, in a character trie per line number. When what the user has
+typed since then is still a prefix of a stored text, the rest of it is the
+new suggestion and no model request is needed. Lookups read only the lines
+from the entry's line to the cursor, so a keystroke costs the same in any
+size of file. Entries are dropped when the file is edited above their line
+or anywhere but at the cursor, and by LRU.
+"""
+
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+
+class _Node:
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.entries: List[int] = []  # Ids of the stored texts passing through this node
+
+
+class PrefixTrie:
+    """Character trie that finds stored texts starting with a given prefix"""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def __len__(self) -> int:
+        return len(self.root.entries)
+
+    def insert(self, entry_id: int, text: str):
+        node = self.root
+        node.entries.append(entry_id)
+        for char in text:
+            node = node.children.setdefault(char, _Node())
+            node.entries.append(entry_id)
+
+    def remove(self, entry_id: int, text: str):
+        path = [self.root]
+        for char in text:
+            path.append(path[-1].children[char])
+        for node in path:
+            node.entries.remove(entry_id)
+        # Prune the branch that no longer leads to any text
+        for depth in range(len(text), 0, -1):
+            if path[depth].entries:
+                break
+            del path[depth - 1].children[text[depth - 1]]
+
+    def starting_with(self, prefix: str) -> List[int]:
+        """Ids of the stored texts that start with prefix, oldest first"""
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.entries
+
+
+@dataclass
+class _Entry:
+    anchor: int       # Number of the line the completion was requested on
+    text: str         # Text typed on that line before the request, plus the suggestion
+    key_length: int   # Length of the typed part of text
+    after: str        # Rest of the line after the cursor at request time
+
+
+class CompletionCache:
+    """LRU cache of inline completions for one document, with trie lookup"""
+
+    def __init__(self, max_entries: int = 256, max_lines: int = 8):
+        self.max_entries = max_entries
+        self.max_lines = max_lines  # Lines a suggestion can span
+        self.tries: Dict[int, PrefixTrie] = {}
+        self.entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._ids = itertools.count()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def put(self, line: int, typed: str, after: str, suggestion: str):
+        """Remember suggestion as the completion of a line's typed text, with after left of the line"""
+        if not suggestion:
+            return
+        entry = _Entry(line, typed + suggestion, len(typed), after)
+        entry_id = next(self._ids)
+        self.entries[entry_id] = entry
+        self.tries.setdefault(line, PrefixTrie()).insert(entry_id, entry.text)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def lookup(self, line: int, typed_since: Callable[[int], str], after: str) -> Optional[str]:
+        """Rest of a cached suggestion that the typing continues, if any.
+
+        line is the cursor's line and after the rest of it; typed_since(n)
+        gives the text from the start of line n to the cursor.
+        """
+        # Nearest line first: the freshest context
+        anchors = sorted((a for a in self.tries if line - self.max_lines <= a <= line), reverse=True)
+        for anchor in anchors:
+            typed = typed_since(anchor)
+            for entry_id in reversed(self.tries[anchor].starting_with(typed)):
+                entry = self.entries[entry_id]
+                if entry.key_length <= len(typed) < len(entry.text) and entry.after == after:
+                    self.entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return entry.text[len(typed):]
+        self.misses += 1
+        return None
+
+    def invalidate(self, line: int):
+        """Drop completions requested below a line edited at the cursor.
+
+        Typing at the cursor is what the cache follows; an edit anywhere
+        else should clear() it instead.
+        """
+        for anchor in [a for a in self.tries if a > line]:
+            for entry_id in list(self.tries[anchor].starting_with("")):
+                del self.entries[entry_id]
+            del self.tries[anchor]
+
+    def clear(self):
+        self.tries.clear()
+        self.entries.clear()
+
+    def _remove(self, entry_id: int):
+        entry = self.entries.pop(entry_id)
+        trie = self.tries[entry.anchor]
+        trie.remove(entry_id, entry.text)
+        if not len(trie):
+            del self.tries[entry.anchor]
@@ -0,0 +1,448 @@
+"""
+🧭 Embedding Index
+A local semantic index over the project's source files, used to add the
+most relevant code from other files to AI prompts. Files are cut into
+chunks along their functions and classes (see code_chunker.py), each
+chunk is embedded through Ollama's /api/embed, and the unit-length vectors
+are stored in a NumPy memory-mapped float32 matrix next to a small SQLite
+table describing every row. A query
+is one matrix-vector product over the memmap plus a partial sort, so top-k
+cosine search over tens of thousands of chunks takes milliseconds.
+
+Every row stores a hash of its chunk's text. Re-indexing a file only embeds
+chunks whose hash is new; rows of chunks that disappeared become dead and
+are compacted away once they make up a large part of the matrix.
+"""
+
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from code_chunker import Chunk, chunk_source
+from ollama_client import OllamaClient, get_default_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+DEFAULT_INDEX_ROOT = os.path.join(os.path.expanduser("~"), ".ai_code_editor", "index")
+SOURCE_EXTENSIONS = (".py", ".js", ".ts", ".java", ".c", ".h", ".cpp", ".go", ".rs", ".md")
+SKIP_DIRS = {".git", "__pycache__", "node_modules", "venv", ".venv", "build", "dist", ".tox"}
+MAX_FILE_BYTES = 512 * 1024
+MAX_FILES = 5000
+# Inputs per /api/embed call; one call covers a typical save
+EMBED_BATCH_SIZE = 32
+# Compact the matrix once this many rows, and this share of them, are dead
+COMPACT_MIN_DEAD = 256
+COMPACT_DEAD_SHARE = 0.25
+
+
+@dataclass
+class SearchHit:
+    score: float  # Cosine similarity
+    chunk: Chunk
+
+
+def is_source_file(path: str, extensions: Sequence[str] = SOURCE_EXTENSIONS) -> bool:
+    """Whether a file is indexed: a source file, and not a very large one"""
+    if not path.endswith(tuple(extensions)):
+        return False
+    try:
+        return os.path.getsize(path) <= MAX_FILE_BYTES
+    except OSError:
+        return False
+
+
+def iter_source_files(root: str, extensions: Sequence[str] = SOURCE_EXTENSIONS,
+                      max_files: int = MAX_FILES) -> Iterable[str]:
+    """Source files under root, skipping build/VCS directories and very large files"""
+    found = 0
+    for directory, subdirs, files in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if d not in SKIP_DIRS and not d.startswith("."))
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            if not is_source_file(path, extensions):
+                continue
+            yield path
+            found += 1
+            if found >= max_files:
+                return
+
+
+PROJECT_MARKERS = (".git", "pyproject.toml", "setup.py", "requirements.txt", "package.json")
+
+
+def find_project_root(path: str) -> str:
+    """Nearest directory above path with a project marker, else path's own directory"""
+    start = os.path.dirname(os.path.abspath(path))
+    directory = start
+    while True:
+        if any(os.path.exists(os.path.join(directory, marker)) for marker in PROJECT_MARKERS):
+            return directory
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return start
+        directory = parent
+
+
+def index_dir_for(project_root: str, base: str = DEFAULT_INDEX_ROOT) -> str:
+    """Directory holding the index files of a project"""
+    digest = hashlib.sha1(os.path.abspath(project_root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base, digest)
+
+
+class EmbeddingIndex:
+    """Chunk vectors in a memory-mapped matrix plus their metadata in SQLite"""
+
+    def __init__(self, directory: str, client: Optional[OllamaClient] = None,
+                 model: str = DEFAULT_EMBED_MODEL, batch_size: int = EMBED_BATCH_SIZE):
+        self.directory = directory
+        self.client = client or get_default_client()
+        self.model = model
+        self.batch_size = batch_size
+        self.embed_calls = 0
+        self.vectors: Optional[np.memmap] = None  # capacity x dim; rows past self.rows are unused
+        self.live = np.zeros(0, dtype=bool)
+        self.rows = 0
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        # Updated on a worker thread, queried from others; access is serialized by _lock
+        self._db = sqlite3.connect(os.path.join(directory, "chunks.sqlite3"), check_same_thread=False)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(chunks)")]
+        if columns and "hash" not in columns:
+            # Index from before content hashes: it is only a cache, so start over
+            self._db.execute("DROP TABLE chunks")
+            self._db.execute("DROP TABLE IF EXISTS meta")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "row INTEGER PRIMARY KEY, path TEXT NOT NULL, start_line INTEGER NOT NULL, "
+            "end_line INTEGER NOT NULL, text TEXT NOT NULL, hash TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_hash ON chunks (hash)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+        if self._meta("model") not in (None, self.model):
+            self._reset()
+        self._open_vectors()
+
+    def __len__(self) -> int:
+        """Number of live chunks"""
+        return int(self.live[:self.rows].sum())
+
+    @property
+    def dead_rows(self) -> int:
+        return self.rows - len(self)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.dead_rows >= COMPACT_MIN_DEAD and self.dead_rows >= self.rows * COMPACT_DEAD_SHARE
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, **values):
+        self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             [(key, str(value)) for key, value in values.items()])
+
+    @property
+    def root(self) -> Optional[str]:
+        """Project directory the index was built from"""
+        with self._lock:
+            return self._meta("root")
+
+    def relative(self, path: str) -> Optional[str]:
+        """path as stored in the index (relative to root), or None if outside the project"""
+        root = self.root
+        if root is None:
+            return None
+        relative = os.path.relpath(os.path.abspath(path), root)
+        return None if relative.startswith("..") else relative
+
+    def _reset(self):
+        """Forget every chunk, e.g. after switching embedding models"""
+        self.vectors = None
+        self._db.execute("DELETE FROM chunks")
+        self._db.execute("DELETE FROM meta WHERE key IN ('rows', 'dim')")
+        self._set_meta(model=self.model)
+        self._db.commit()
+        if os.path.exists(self.vectors_path):
+            os.remove(self.vectors_path)
+
+    def _open_vectors(self):
+        """Map the stored matrix and mark which of its rows hold live chunks"""
+        self.rows = int(self._meta("rows") or 0)
+        dim = int(self._meta("dim") or 0)
+        self.vectors = None
+        self.live = np.zeros(self.rows, dtype=bool)
+        if not dim or not os.path.exists(self.vectors_path):
+            self.rows = 0
+            return
+        capacity = os.path.getsize(self.vectors_path) // (dim * 4)
+        if capacity:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        self.live = np.zeros(capacity, dtype=bool)
+        live_rows = [row for (row,) in self._db.execute("SELECT row FROM chunks")]
+        self.live[live_rows] = True
+
+    def _append(self, vectors: np.ndarray) -> List[int]:
+        """Write vectors after the used rows, growing the file geometrically; returns their rows"""
+        count, dim = vectors.shape
+        capacity = 0 if self.vectors is None else self.vectors.shape[0]
+        if self.rows + count > capacity:
+            capacity = max(2 * capacity, self.rows + count, 256)
+            self.vectors = None  # Release the mapping before resizing the file
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * dim * 4)
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+            self.live = np.concatenate([self.live, np.zeros(capacity - len(self.live), dtype=bool)])
+        rows = list(range(self.rows, self.rows + count))
+        self.vectors[self.rows:self.rows + count] = vectors
+        self.live[rows] = True
+        self.rows += count
+        return rows
+
+    def embed(self, texts: List[str], cancel_token=None) -> Optional[np.ndarray]:
+        """Unit-length embeddings of texts as a float32 matrix, or None on error.
+
+        Texts are sent in batches of batch_size, one /api/embed call each.
+        """
+        parts = []
+        for start in range(0, len(texts), self.batch_size):
+            if cancel_token is not None and cancel_token.cancelled:
+                return None
+            self.embed_calls += 1
+            result = self.client.embed(texts[start:start + self.batch_size], self.model)
+            if "error" in result:
+                logger.warning("Embedding with %s failed: %s", self.model, result["error"])
+                return None
+            parts.append(np.asarray(result["embeddings"], dtype=np.float32))
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32)
+        matrix = np.vstack(parts)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def build(self, root: str, on_chunk: Optional[Callable[[str], None]] = None,
+              cancel_token=None) -> Dict:
+        """Bring the index up to date with every source file under root.
+
+        Unchanged chunks keep their vectors, so re-opening an indexed project
+        costs no embedding calls. Progress messages go to on_chunk; follows
+        the AIJobExecutor job signature so it can run on a worker. Returns
+        sync_files() counts or an {"error": ...} dict.
+        """
+        root = os.path.abspath(root)
+        with self._lock:
+            if self._meta("root") not in (None, root):
+                self._reset()
+                self._open_vectors()
+            self._set_meta(root=root)
+            self._db.commit()
+        paths = list(iter_source_files(root))
+        wanted = {os.path.relpath(path, root) for path in paths}
+        with self._lock:
+            indexed = {path for (path,) in self._db.execute("SELECT DISTINCT path FROM chunks")}
+        gone = sorted(indexed - wanted)
+        return self.sync_files(paths, on_chunk, cancel_token, removed=gone)
+
+    def update_file(self, path: str, on_chunk: Optional[Callable[[str], None]] = None,
+                    cancel_token=None) -> Dict:
+        """Re-index one saved file; a job for AIJobExecutor like build()"""
+        relative = self.relative(path)
+        if relative is None:
+            return {"files": 0, "chunks": 0, "embedded": 0, "removed": 0}
+        if not is_source_file(path):
+            # E.g. grown past MAX_FILE_BYTES: drop what was indexed of it
+            return self.sync_files([], on_chunk, cancel_token, removed=[relative])
+        return self.sync_files([path], on_chunk, cancel_token)
+
+    def sync_files(self, paths: List[str], on_chunk: Optional[Callable[[str], None]] = None,
+                   cancel_token=None, removed: Sequence[str] = ()) -> Dict:
+        """Re-index files (absolute paths under root) and drop the removed relative paths.
+
+        Each chunk whose text hash is already in the index keeps (or copies)
+        its vector; only new texts are embedded, in as few calls as the
+        batch size allows. Rows of chunks that no longer exist are marked
+        dead, and the matrix is compacted when too many are.
+        """
+        root = self.root
+        if root is None:
+            return {"error": "The index has no project root; build() it first"}
+        chunks: List[Chunk] = []
+        files: List[str] = list(removed)
+        for path in paths:
+            relative = os.path.relpath(os.path.abspath(path), root)
+            files.append(relative)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    chunks.extend(chunk_source(relative, f.read()))
+            except (OSError, UnicodeDecodeError):
+                continue  # Deleted or unreadable: its chunks are dropped below
+
+        with self._lock:
+            known = {chunk.hash for chunk in chunks if self._row_with_hash(chunk.hash) is not None}
+        new_texts = list(dict.fromkeys(c.text for c in chunks if c.hash not in known))
+        if new_texts and on_chunk is not None:
+            on_chunk(f"Embedding {len(new_texts)} new chunks")
+        vectors = self.embed(new_texts, cancel_token) if new_texts else None
+        if new_texts and vectors is None:
+            if cancel_token is not None and cancel_token.cancelled:
+                return {"error": "Cancelled", "cancelled": True}
+            return {"error": f"Could not embed the project with {self.model}"}
+
+        with self._lock:
+            dim = int(self._meta("dim") or 0)
+            if vectors is not None and dim and vectors.shape[1] != dim:
+                return {"error": f"{self.model} returned {vectors.shape[1]}-dimensional vectors, expected {dim}"}
+            # Where each hash's vector already is: fresh rows, then any live row
+            source: Dict[str, int] = {}
+            unused = set()
+            if vectors is not None:
+                for text, row in zip(new_texts, self._append(vectors)):
+                    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+                    source[digest] = row
+                    unused.add(row)
+            old_rows: Dict[str, List[int]] = {}
+            for relative in files:
+                for row, digest in self._db.execute("SELECT row, hash FROM chunks WHERE path = ?", (relative,)):
+                    old_rows.setdefault(digest, []).append(row)
+                    unused.add(row)
+
+            # Each chunk takes an unused row holding its vector, or a copy of one
+            placed = []
+            copies = []
+            for chunk in chunks:
+                row = source.get(chunk.hash)
+                if row is None:
+                    row = self._row_with_hash(chunk.hash)
+                    source[chunk.hash] = row
+                if row in unused:
+                    unused.discard(row)
+                    placed.append((row, chunk))
+                elif old_rows.get(chunk.hash) and old_rows[chunk.hash][-1] in unused:
+                    row = old_rows[chunk.hash].pop()
+                    unused.discard(row)
+                    placed.append((row, chunk))
+                else:
+                    copies.append(chunk)
+            if copies:
+                rows = self._append(np.array(self.vectors[[source[c.hash] for c in copies]]))
+                placed.extend(zip(rows, copies))
+            dead = sorted(unused)
+            self.live[dead] = False
+
+            placeholders = ",".join("?" * len(files))
+            self._db.execute(f"DELETE FROM chunks WHERE path IN ({placeholders})", files)
+            self._db.executemany(
+                "INSERT INTO chunks (row, path, start_line, end_line, text, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                [(row, c.path, c.start_line, c.end_line, c.text, c.hash) for row, c in placed]
+            )
+            self._set_meta(rows=self.rows, dim=dim or (vectors.shape[1] if vectors is not None else 0),
+                           model=self.model)
+            self._db.commit()
+            if self.vectors is not None:
+                self.vectors.flush()
+            if self.needs_compaction:
+                self.compact()
+        return {"files": len(paths), "chunks": len(chunks), "embedded": len(new_texts), "removed": len(dead)}
+
+    def _row_with_hash(self, digest: str) -> Optional[int]:
+        found = self._db.execute("SELECT row FROM chunks WHERE hash = ? LIMIT 1", (digest,)).fetchone()
+        return found[0] if found else None
+
+    def compact(self):
+        """Rewrite the matrix without dead rows and renumber the chunks"""
+        with self._lock:
+            if self.vectors is None:
+                return
+            live_rows = np.flatnonzero(self.live[:self.rows])
+            vectors = np.array(self.vectors[live_rows])
+            renumber = {int(old): new for new, old in enumerate(live_rows)}
+            chunks = self._db.execute("SELECT row, path, start_line, end_line, text, hash FROM chunks").fetchall()
+            self.vectors = None
+            temporary = self.vectors_path + ".tmp"
+            if len(vectors):
+                matrix = np.memmap(temporary, dtype=np.float32, mode="w+", shape=vectors.shape)
+                matrix[:] = vectors
+                matrix.flush()
+                del matrix
+                os.replace(temporary, self.vectors_path)
+            elif os.path.exists(self.vectors_path):
+                os.remove(self.vectors_path)
+            self._db.execute("DELETE FROM chunks")
+            self._db.executemany(
+                "INSERT INTO chunks (row, path, start_line, end_line, text, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                [(renumber[row],) + tuple(rest) for row, *rest in chunks]
+            )
+            self._set_meta(rows=len(vectors))
+            self._db.commit()
+            self._open_vectors()
+            logger.info("Compacted embedding index to %d rows", len(vectors))
+
+    def replace(self, chunks: List[Chunk], vectors: np.ndarray, root: str):
+        """Store chunks (paths relative to root) and their unit vectors, replacing the whole index"""
+        with self._lock:
+            self._reset()
+            self._open_vectors()
+            rows = self._append(vectors) if len(chunks) else []
+            self._db.executemany(
+                "INSERT INTO chunks (row, path, start_line, end_line, text, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                [(row, c.path, c.start_line, c.end_line, c.text, c.hash) for row, c in zip(rows, chunks)]
+            )
+            self._set_meta(rows=self.rows, dim=vectors.shape[1] if len(chunks) else 0,
+                           root=os.path.abspath(root))
+            self._db.commit()
+            if self.vectors is not None:
+                self.vectors.flush()
+
+    def search(self, query: str, k: int = 5, exclude_path: Optional[str] = None) -> List[SearchHit]:
+        """The k chunks most similar to query (empty if the index is empty or embedding fails)"""
+        if not len(self):
+            return []
+        vector = self.embed([query])
+        if vector is None:
+            return []
+        return self.search_vector(vector[0], k, exclude_path)
+
+    def search_vector(self, vector: np.ndarray, k: int = 5,
+                      exclude_path: Optional[str] = None) -> List[SearchHit]:
+        """The k live chunks whose vectors have the highest cosine similarity to a unit vector"""
+        with self._lock:
+            live = len(self)
+            if self.vectors is None or not live:
+                return []
+            scores = self.vectors[:self.rows] @ vector
+            scores[~self.live[:self.rows]] = -np.inf
+            # Over-fetch when excluding a file, since its rows may take top places
+            wanted = min(live, k * 4 if exclude_path else k)
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+            top = top[np.argsort(-scores[top])]
+            hits = []
+            for row in top:
+                chunk = self._chunk(int(row))
+                if chunk is None or chunk.path == exclude_path:
+                    continue
+                hits.append(SearchHit(float(scores[row]), chunk))
+                if len(hits) == k:
+                    break
+            return hits
+
+    def _chunk(self, row: int) -> Optional[Chunk]:
+        found = self._db.execute(
+            "SELECT path, start_line, end_line, text FROM chunks WHERE row = ?", (row,)
+        ).fetchone()
+        return Chunk(*found) if found else None
+
+    def close(self):
+        with self._lock:
+            self.vectors = None
+            self._db.close()
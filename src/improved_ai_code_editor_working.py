@@ -15,10 +15,28 @@ from PyQt5.QtWidgets import (
     QLabel, QComboBox, QSlider, QCheckBox, QGroupBox, QScrollArea,
     QMenuBar, QMenu, QAction, QToolBar, QStatusBar, QFileDialog,
     QMessageBox, QProgressBar, QDialog, QDialogButtonBox, QTabWidget,
-    QFrame, QGridLayout, QFormLayout, QSpinBox, QLineEdit
+    QFrame, QGridLayout, QFormLayout, QSpinBox, QLineEdit, QStackedWidget
 )
 from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QSize
-from PyQt5.QtGui import QFont, QColor, QPalette, QIcon
+from PyQt5.QtGui import QFont, QColor, QPalette, QIcon, QPainter, QTextCursor
+
+from ai_metrics import get_default_recorder
+from ai_worker import AIJobExecutor
+from backend_status import BackendStatus
+from ollama_client import OllamaClient, get_default_client
+from prompt_builder import BuiltPrompt, PromptBuilder
+from chat_session import ChatSession
+from code_chunker import chunk_source, enclosing_chunk, is_python
+from embedding_index import EmbeddingIndex, find_project_root, index_dir_for
+from large_file_view import LargeFileView
+from lexical_index import LexicalIndex, fuse
+from model_manager import ModelManager
+from inline_completion import InlineCompleter
+from metrics_dialog import MetricsDialog
+from model_router import ModelRouter
+from piece_table import PieceTable
+from python_highlighter import PythonHighlighter
+from project_search import ProjectSearchDialog
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -63,8 +81,15 @@ class AIResponseWidget(QWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.chat_session: Optional[ChatSession] = None
+        self.ai_executor: Optional[AIJobExecutor] = None
         self.setup_ui()
         
+    def attach_chat(self, chat_session: ChatSession, ai_executor: AIJobExecutor):
+        """Answer messages through a live chat session instead of canned replies"""
+        self.chat_session = chat_session
+        self.ai_executor = ai_executor
+        
     def setup_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(10, 10, 10, 10)
@@ -115,8 +140,8 @@ class AIResponseWidget(QWidget):
         input_layout.addWidget(self.send_button)
         layout.addLayout(input_layout)
         
-    def add_message(self, sender: str, message: str, msg_type: str = "user"):
-        """Add a message to the chat display"""
+    def add_message(self, sender: str, message: str, msg_type: str = "user") -> QLabel:
+        """Add a message to the chat display and return its text label"""
         message_widget = QFrame()
         message_layout = QVBoxLayout(message_widget)
         
@@ -133,6 +158,7 @@ class AIResponseWidget(QWidget):
         
         # Message content
         message_label = QLabel(message)
+        message_label.setTextFormat(Qt.PlainText)
         message_label.setWordWrap(True)
         message_label.setStyleSheet(f"""
             QLabel {{
@@ -153,6 +179,16 @@ class AIResponseWidget(QWidget):
         
         # Auto-scroll to bottom
         QTimer.singleShot(100, self.scroll_to_bottom)
+        return message_label
+        
+    def start_streaming_message(self, sender: str) -> QLabel:
+        """Add an empty AI message that streamed text can be appended to"""
+        return self.add_message(sender, "", "ai")
+        
+    def append_to_message(self, message_label: QLabel, text: str):
+        """Append a streamed piece of text to a message created by start_streaming_message"""
+        message_label.setText(message_label.text() + text)
+        self.scroll_to_bottom()
         
     def scroll_to_bottom(self):
         """Scroll to the bottom of the message area"""
@@ -160,7 +196,7 @@ class AIResponseWidget(QWidget):
         scrollbar.setValue(scrollbar.maximum())
         
     def send_message(self):
-        """Send a message to AI (simulated)"""
+        """Send a message to AI, streaming the reply into the chat"""
         message = self.input_field.text().strip()
         if not message:
             return
@@ -169,11 +205,34 @@ class AIResponseWidget(QWidget):
         self.add_message("You", message, "user")
         self.input_field.clear()
         
-        # Simulate AI response
-        QTimer.singleShot(1000, lambda: self.simulate_ai_response(message))
+        if self.chat_session is None:
+            # Simulate AI response
+            QTimer.singleShot(1000, lambda: self.simulate_ai_response(message))
+            return
+            
+        message_label = self.start_streaming_message("AI Assistant")
+        
+        def on_finished(result: Dict):
+            if result.get("cancelled"):
+                self.append_to_message(message_label, "\n⏹ Cancelled")
+            elif "error" in result:
+                # Ollama unavailable - fall back to the offline replies
+                self.append_to_message(message_label, self.canned_response(message))
+                
+        # Sending again while a reply is streaming replaces that reply
+        self.ai_executor.submit(
+            self.chat_session.send, message,
+            on_chunk=lambda text: self.append_to_message(message_label, text),
+            on_finished=on_finished,
+            supersede_key="chat"
+        )
         
     def simulate_ai_response(self, user_message: str):
         """Simulate an AI response based on user input"""
+        self.add_message("AI Assistant", self.canned_response(user_message), "ai")
+        
+    def canned_response(self, user_message: str) -> str:
+        """Offline reply to a chat message, based on keywords"""
         responses = {
             "help": "I can help you with code generation, optimization, debugging, and explanations. What would you like to work on?",
             "function": "Here's a sample function template:\n\ndef example_function(param):\n    '''Function docstring'''\n    return param * 2",
@@ -189,7 +248,7 @@ class AIResponseWidget(QWidget):
                 response = default_response
                 break
                 
-        self.add_message("AI Assistant", response, "ai")
+        return response
 
 
 class FileExplorer(QTreeWidget):
@@ -253,12 +312,16 @@ class FileExplorer(QTreeWidget):
 
 
 class CodeEditor(QTextEdit):
-    """Enhanced code editor with syntax highlighting simulation"""
+    """Enhanced code editor with Python syntax highlighting"""
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.ghost_text = ""  # Inline AI suggestion drawn after the cursor; Tab accepts it
+        # Re-highlights only the lines an edit touches (see python_highlighter.py)
+        self.highlighter = PythonHighlighter(self.document())
         self.setup_ui()
         self.load_sample_code()
+        self.cursorPositionChanged.connect(self.clear_ghost_text)
         
     def setup_ui(self):
         # Set font
@@ -294,8 +357,66 @@ class CodeEditor(QTextEdit):
             }
         """)
         
+    def set_highlighting(self, enabled: bool):
+        """Highlight the text as Python, or not (e.g. for other kinds of files)"""
+        if enabled != (self.highlighter.document() is not None):
+            self.highlighter.setDocument(self.document() if enabled else None)
+            
+    def set_ghost_text(self, text: str):
+        """Show an inline suggestion at the cursor without inserting it"""
+        self.ghost_text = text
+        self.viewport().update()
+        
+    def clear_ghost_text(self):
+        if self.ghost_text:
+            self.ghost_text = ""
+            self.viewport().update()
+            
+    def accept_ghost_text(self):
+        """Insert the inline suggestion at the cursor"""
+        text = self.ghost_text
+        self.clear_ghost_text()
+        cursor = self.textCursor()
+        cursor.insertText(text)
+        self.setTextCursor(cursor)
+        
+    def keyPressEvent(self, event):
+        if self.ghost_text:
+            if event.key() == Qt.Key_Tab:
+                self.accept_ghost_text()
+                return
+            self.clear_ghost_text()
+            if event.key() == Qt.Key_Escape:
+                return
+        super().keyPressEvent(event)
+        
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.ghost_text:
+            return
+        painter = QPainter(self.viewport())
+        painter.setFont(self.font())
+        metrics = self.fontMetrics()
+        cursor_rect = self.cursorRect()
+        line_start = self.textCursor()
+        line_start.movePosition(QTextCursor.StartOfBlock)
+        left = self.cursorRect(line_start).left()
+        
+        lines = self.ghost_text.split("\n")
+        baseline = cursor_rect.top() + metrics.ascent()
+        # Continuation lines cover the code below them until accepted or dismissed
+        if len(lines) > 1:
+            width = max(metrics.horizontalAdvance(line) for line in lines[1:])
+            painter.fillRect(left, cursor_rect.bottom() + 1, width + 4,
+                             metrics.lineSpacing() * (len(lines) - 1), QColor("#1e1e1e"))
+        painter.setPen(QColor("#6a6a6a"))
+        painter.drawText(cursor_rect.right() + 1, baseline, lines[0])
+        for index, line in enumerate(lines[1:], 1):
+            painter.drawText(left, baseline + index * metrics.lineSpacing(), line)
+        painter.end()
+        
     def load_sample_code(self):
-        """Load sample code with syntax highlighting simulation"""
+        """Load the welcome sample code"""
         sample_code = '''# 🚀 Welcome to Advanced AI Code Editor
 # This is a demonstration of the enhanced GUI
 
@@ -328,9 +449,9 @@ class AICodeAssistant:
         """Generate a function template"""
         template = [
             "def ai_generated_function(param1: str, param2: int = 0) -> bool:",
-            "    '''",
+            '    """',
             "    AI-generated function template",
-            "    '''",
+            '    """',
             "    try:",
             "        # Your implementation here",
             "        result = param1 + str(param2)",
@@ -345,16 +466,16 @@ class AICodeAssistant:
         """Generate a class template"""
         template = [
             "class AIGeneratedClass:",
-            "    '''",
+            '    """',
             "    AI-generated class template",
-            "    '''",
+            '    """',
             "    ",
             "    def __init__(self, name: str):",
             "        self.name = name",
             "        self.data = {}",
             "    ",
             "    def process_data(self, data: Dict) -> bool:",
-            "        '''Process the provided data'''",
+            '        """Process the provided data"""',
             "        try:",
             "            self.data.update(data)",
             "            return True",
@@ -406,8 +527,8 @@ class AIControlPanel(QWidget):
         model_group = QGroupBox("🤖 AI Model")
         model_layout = QVBoxLayout(model_group)
         
+        # Filled with the locally installed Ollama models (see set_models)
         self.model_combo = QComboBox()
-        self.model_combo.addItems(["GPT-4", "Claude-3", "CodeLlama", "Local Model"])
         self.model_combo.setStyleSheet("""
             QComboBox {
                 background-color: #2b2b2b;
@@ -439,6 +560,14 @@ class AIControlPanel(QWidget):
             }
         """)
         model_layout.addWidget(self.model_combo)
+        
+        # Small model for latency-critical requests (inline completion)
+        fast_label = QLabel("⚡ Fast model")
+        fast_label.setStyleSheet("color: #ffffff; font-size: 12px;")
+        self.fast_model_combo = QComboBox()
+        self.fast_model_combo.setStyleSheet(self.model_combo.styleSheet())
+        model_layout.addWidget(fast_label)
+        model_layout.addWidget(self.fast_model_combo)
         layout.addWidget(model_group)
         
         # Temperature Control
@@ -448,6 +577,7 @@ class AIControlPanel(QWidget):
         self.temp_slider = QSlider(Qt.Horizontal)
         self.temp_slider.setRange(0, 100)
         self.temp_slider.setValue(70)
+        self.temp_slider.setToolTip("Used for code generation and chat; explain and optimize always run at 0")
         self.temp_slider.setStyleSheet("""
             QSlider::groove:horizontal {
                 border: 2px solid #4CAF50;
@@ -489,9 +619,11 @@ class AIControlPanel(QWidget):
             ("Error Detection", True),
             ("Code Suggestions", False),
             ("Documentation", True),
-            ("Refactoring", False)
+            ("Refactoring", False),
+            ("Project Context", True)
         ]
         
+        self.feature_checks: Dict[str, QCheckBox] = {}
         for feature, checked in features:
             cb = QCheckBox(feature)
             cb.setChecked(checked)
@@ -517,6 +649,7 @@ class AIControlPanel(QWidget):
                 }
             """)
             features_layout.addWidget(cb)
+            self.feature_checks[feature] = cb
             
         layout.addWidget(features_group)
         
@@ -535,15 +668,208 @@ class AIControlPanel(QWidget):
         actions_layout.addWidget(self.optimize_button)
         
         layout.addWidget(actions_group)
+        
+    def set_models(self, models: List[str], current: str, fast: str):
+        """Replace the model lists, keeping the current selections"""
+        for combo, selected in ((self.model_combo, current), (self.fast_model_combo, fast)):
+            items = models if selected in models else [selected] + models
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItems(items)
+            combo.setCurrentText(selected)
+            combo.blockSignals(False)
+
+
+class AICodeAssistant:
+    """Ollama-backed assistant behind the editor's generate/explain/optimize actions"""
+    
+    DEFAULT_MODEL = "codellama"
+    
+    INSTRUCTIONS = {
+        "explain": "Explain what this code does:",
+        "optimize": "Suggest performance, readability and security improvements for this code:",
+        "generate": "Reply with Python code only, without markdown fences.",
+    }
+    
+    # Actions that analyse existing code run at temperature 0 whatever the
+    # slider says: the same code gets the same answer, so repeats are cache hits
+    DETERMINISTIC_ACTIONS = frozenset({"explain", "optimize"})
+    
+    # Related project code may use this share of the prompt budget
+    RELATED_SHARE = 0.25
+    RELATED_CHUNKS = 4
+    
+    def __init__(self, model_name: str = DEFAULT_MODEL, client: Optional[OllamaClient] = None):
+        self.model_name = model_name
+        self.temperature = 0.7
+        self.client = client or get_default_client()
+        self.prompt_builder = PromptBuilder()
+        # Picks a model per action when set; otherwise model_name is used for everything
+        self.router: Optional[ModelRouter] = None
+        # Project indexes; explain/optimize add related code from them when set
+        self.index: Optional[EmbeddingIndex] = None
+        self.lexical_index: Optional[LexicalIndex] = None
+        
+    def build_prompt(self, action: str, code: str, document: Optional[str] = None,
+                     selection: Optional[Tuple[int, int]] = None, cursor: int = 0,
+                     related: str = "", source_path: Optional[str] = None) -> BuiltPrompt:
+        """Build the prompt for an action, fitted to the context window.
+        
+        For explain/optimize, code is the selected text; when the whole
+        document is given, surrounding lines are added as budget allows,
+        starting with the rest of the function or class around the
+        selection. For generate, code is the request and the document around
+        the cursor is added as context. related (see related_code) goes
+        before the instruction.
+        """
+        if action == "generate":
+            instruction = f"{code}\n{self.INSTRUCTIONS['generate']}"
+            if document is None:
+                return self.prompt_builder.build("", instruction=instruction)
+            instruction += "\nThe code will be inserted at the cursor in this file:"
+            focus = self.enclosing_lines(document, cursor, cursor, source_path)
+            return self.prompt_builder.build(document, cursor, instruction=instruction, focus=focus)
+        if document is None:
+            document, selection = code, (0, len(code))
+        focus = self.enclosing_lines(document, *selection, source_path) if selection else None
+        return self.prompt_builder.build(
+            document, cursor, selection, instruction=related + self.INSTRUCTIONS[action], focus=focus
+        )
+        
+    def enclosing_lines(self, document: str, start: int, end: int,
+                        source_path: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """0-based line range of the function or class around offsets start..end, if any"""
+        first_line = document.count("\n", 0, start) + 1
+        last_line = first_line + document.count("\n", start, max(start, end - 1))
+        # Up to half the budget: the enclosing code shouldn't crowd out everything else
+        chunk = enclosing_chunk(source_path or "", document, first_line, last_line,
+                                max_tokens=self.prompt_builder.budget // 2)
+        if chunk is None:
+            return None
+        return chunk.start_line - 1, chunk.end_line - 1
+        
+    def related_code(self, code: str, source_path: Optional[str] = None) -> str:
+        """The project chunks most related to code, within RELATED_SHARE of the budget.
+        
+        BM25 and embedding hits are combined by rank when both indexes are
+        set. Chunks from source_path itself are skipped: the prompt already
+        has that file's code around the selection. Empty without an index.
+        """
+        indexes = [index for index in (self.lexical_index, self.index) if index is not None]
+        if not indexes or not code.strip():
+            return ""
+        rankings = []
+        for index in indexes:
+            exclude = index.relative(source_path) if source_path else None
+            rankings.append(index.search(code, k=self.RELATED_CHUNKS, exclude_path=exclude))
+        budget = int(self.prompt_builder.budget * self.RELATED_SHARE)
+        blocks = []
+        for hit in fuse(rankings, k=self.RELATED_CHUNKS):
+            block = f"# {hit.chunk.label}\n{hit.chunk.text.rstrip()}\n\n"
+            tokens = self.prompt_builder.counter.count(block, remember=False)
+            if tokens > budget:
+                continue
+            budget -= tokens
+            blocks.append(block)
+        if not blocks:
+            return ""
+        return "Related code from elsewhere in the project:\n\n" + "".join(blocks)
+        
+    def run_action(self, action: str, code: str, document: Optional[str] = None,
+                   selection: Optional[Tuple[int, int]] = None, source_path: Optional[str] = None,
+                   on_chunk=None, cancel_token=None) -> Dict:
+        """Explain or optimize code with related project code added; runs on a worker.
+        
+        The result carries the prompt's token usage as "prompt_summary".
+        """
+        related = self.related_code(code, source_path)
+        built = self.build_prompt(action, code, document, selection, related=related, source_path=source_path)
+        result = self.complete(built.prompt, on_chunk, cancel_token, action=action)
+        result["prompt_summary"] = built.summary()
+        return result
+        
+    def generate_code(self, prompt: str, on_chunk=None, cancel_token=None,
+                      document: Optional[str] = None, cursor: int = 0,
+                      source_path: Optional[str] = None) -> Dict:
+        """Generate code from a prompt, streaming pieces to on_chunk if given"""
+        built = self.build_prompt("generate", prompt, document, cursor=cursor, source_path=source_path)
+        return self.complete(built.prompt, on_chunk, cancel_token, action="generate")
+        
+    def explain_code(self, code: str, on_chunk=None, cancel_token=None,
+                     document: Optional[str] = None, selection: Optional[Tuple[int, int]] = None,
+                     source_path: Optional[str] = None) -> Dict:
+        """Explain what the code does, streaming pieces to on_chunk if given"""
+        return self.run_action("explain", code, document, selection, source_path, on_chunk, cancel_token)
+        
+    def optimize_code(self, code: str, on_chunk=None, cancel_token=None,
+                      document: Optional[str] = None, selection: Optional[Tuple[int, int]] = None,
+                      source_path: Optional[str] = None) -> Dict:
+        """Suggest optimizations for the code, streaming pieces to on_chunk if given"""
+        return self.run_action("optimize", code, document, selection, source_path, on_chunk, cancel_token)
+        
+    def model_for(self, action: str, prompt: str) -> str:
+        """Model to run an action's prompt on"""
+        if self.router is None:
+            return self.model_name
+        prompt_tokens = self.prompt_builder.counter.count(prompt, remember=False)
+        return self.router.route(action, prompt_tokens, default=self.model_name)
+        
+    def complete(self, prompt: str, on_chunk=None, cancel_token=None, action: str = "generate") -> Dict:
+        """Send a prompt for an action to Ollama; returns the response dict or an error dict"""
+        temperature = 0 if action in self.DETERMINISTIC_ACTIONS else self.temperature
+        result = self.client.generate(
+            prompt, model=self.model_for(action, prompt),
+            options={"temperature": temperature, "num_ctx": self.prompt_builder.num_ctx},
+            on_chunk=on_chunk, cancel_token=cancel_token, action=action
+        )
+        if "error" in result and not result.get("cancelled"):
+            logger.warning("AI request failed: %s", result["error"])
+        return result
 
 
 class ImprovedAICodeEditor(QMainWindow):
     """Main application window with enhanced UI"""
     
+    # Explain Each Function queues at most this many chat actions
+    BATCH_MAX_FUNCTIONS = 20
+    # Files from this size open in the piece-table view instead of QTextEdit
+    LARGE_FILE_BYTES = 8 * 1024 * 1024
+    
     def __init__(self):
         super().__init__()
         self.current_file = None
+        self.ai_assistant = AICodeAssistant()
+        # Sends each action to the fast or the quality model (see model_router.py)
+        self.model_router = ModelRouter({"fast": self.ai_assistant.model_name,
+                                         "quality": self.ai_assistant.model_name})
+        self.ai_assistant.router = self.model_router
+        self.ai_assistant.client.add_observer(self.model_router.observe)
+        self.ai_executor = AIJobExecutor(max_workers=2)
+        # Project indexing gets its own worker so it never holds up an AI action
+        self.index_executor = AIJobExecutor(max_workers=1)
+        # And so does finding the lines of a large file
+        self.file_executor = AIJobExecutor(max_workers=1)
+        # Project searches wait for the index's lock during indexing; on their own worker
+        self.search_executor = AIJobExecutor(max_workers=1)
+        self.project_index: Optional[EmbeddingIndex] = None
+        self.search_index: Optional[LexicalIndex] = None
+        self.project_search: Optional[ProjectSearchDialog] = None
+        self.project_root: Optional[str] = None
+        # One conversation per window; keep_alive lets Ollama reuse its KV cache between turns
+        self.chat_session = ChatSession(
+            self.ai_assistant.model_name, client=self.ai_assistant.client,
+            system="You are a helpful programming assistant inside a code editor.",
+            prompt_builder=self.ai_assistant.prompt_builder
+        )
+        self.chat_session.router = self.model_router
+        # Preloads the selected model and keeps it warm while the app is in use
+        self.model_manager = ModelManager(self.ai_assistant.client, self)
         self.init_ui()
+        # Ghost-text completion in the editor (see inline_completion.py)
+        self.inline_completer = InlineCompleter(
+            self.code_editor, self.ai_assistant.client, self.ai_assistant.model_name, parent=self
+        )
+        self.inline_completer.router = self.model_router
         self.setup_connections()
         
     def init_ui(self):
@@ -638,15 +964,20 @@ class ImprovedAICodeEditor(QMainWindow):
         left_panel.setMaximumWidth(350)
         left_panel.setMinimumWidth(250)
         
-        # Center panel (Code Editor)
+        # Center panel (Code Editor; very large files get the virtualized view)
         self.code_editor = CodeEditor()
+        self.large_file_view = LargeFileView()
+        self.editor_stack = QStackedWidget()
+        self.editor_stack.addWidget(self.code_editor)
+        self.editor_stack.addWidget(self.large_file_view)
         
         # Right panel (AI Chat)
         self.ai_response_widget = AIResponseWidget()
+        self.ai_response_widget.attach_chat(self.chat_session, self.ai_executor)
         
         # Add panels to splitter
         main_splitter.addWidget(left_panel)
-        main_splitter.addWidget(self.code_editor)
+        main_splitter.addWidget(self.editor_stack)
         main_splitter.addWidget(self.ai_response_widget)
         
         # Set splitter proportions
@@ -688,6 +1019,9 @@ class ImprovedAICodeEditor(QMainWindow):
         ai_explain_action = toolbar.addAction("📖 Explain")
         ai_explain_action.triggered.connect(self.explain_code)
         
+        ai_stop_action = toolbar.addAction("⏹ Stop")
+        ai_stop_action.triggered.connect(self.stop_ai)
+        
         toolbar.addSeparator()
         
         # View operations
@@ -712,12 +1046,12 @@ class ImprovedAICodeEditor(QMainWindow):
         
         # Edit menu
         edit_menu = menubar.addMenu("✏️ Edit")
-        edit_menu.addAction("↩️ Undo", self.code_editor.undo)
-        edit_menu.addAction("↪️ Redo", self.code_editor.redo)
+        edit_menu.addAction("↩️ Undo", lambda: self.current_editor().undo())
+        edit_menu.addAction("↪️ Redo", lambda: self.current_editor().redo())
         edit_menu.addSeparator()
-        edit_menu.addAction("✂️ Cut", self.code_editor.cut)
-        edit_menu.addAction("📋 Copy", self.code_editor.copy)
-        edit_menu.addAction("📄 Paste", self.code_editor.paste)
+        edit_menu.addAction("✂️ Cut", lambda: self.current_editor().cut())
+        edit_menu.addAction("📋 Copy", lambda: self.current_editor().copy())
+        edit_menu.addAction("📄 Paste", lambda: self.current_editor().paste())
         
         # AI menu
         ai_menu = menubar.addMenu("🤖 AI Assistant")
@@ -725,6 +1059,14 @@ class ImprovedAICodeEditor(QMainWindow):
         ai_menu.addAction("⚡ Generate Code", self.generate_code)
         ai_menu.addAction("📖 Explain Code", self.explain_code)
         ai_menu.addAction("🚀 Optimize Code", self.optimize_code)
+        ai_menu.addAction("🧩 Explain Each Function", self.explain_each_function)
+        ai_menu.addSeparator()
+        ai_menu.addAction("⏹ Stop AI", self.stop_ai)
+        ai_menu.addAction("📊 AI Usage Stats", self.show_ai_stats)
+        
+        # Search menu
+        search_menu = menubar.addMenu("🔎 Search")
+        search_menu.addAction("🔎 Search Project", self.show_project_search, "Ctrl+Shift+F")
         
         # View menu
         view_menu = menubar.addMenu("👁️ View")
@@ -745,6 +1087,19 @@ class ImprovedAICodeEditor(QMainWindow):
         self.file_type_label.setStyleSheet("color: #4CAF50; font-weight: bold;")
         status_bar.addPermanentWidget(self.file_type_label)
         
+        self.cache_label = QLabel()
+        self.cache_label.setStyleSheet("color: #4CAF50; font-weight: bold;")
+        status_bar.addPermanentWidget(self.cache_label)
+        self.update_cache_stats()
+        
+        self.completion_label = QLabel()
+        self.completion_label.setStyleSheet("color: #4CAF50; font-weight: bold;")
+        status_bar.addPermanentWidget(self.completion_label)
+        
+        # Backend reachability, loaded model, token rate and AI job load
+        self.backend_label = QLabel()
+        status_bar.addPermanentWidget(self.backend_label)
+        
     def setup_connections(self):
         """Setup signal connections"""
         # Connect AI control panel buttons
@@ -753,21 +1108,251 @@ class ImprovedAICodeEditor(QMainWindow):
         self.ai_control_panel.explain_button.clicked.connect(self.explain_code)
         self.ai_control_panel.optimize_button.clicked.connect(self.optimize_code)
         
+        # Keep the assistant's and the chat's temperature in sync with the slider
+        self.ai_control_panel.temp_slider.valueChanged.connect(self.set_temperature)
+        self.set_temperature(self.ai_control_panel.temp_slider.value())
+        
+        # The Auto-complete checkbox switches inline completion on and off
+        auto_complete = self.ai_control_panel.feature_checks["Auto-complete"]
+        auto_complete.toggled.connect(self.inline_completer.set_enabled)
+        self.inline_completer.set_enabled(auto_complete.isChecked())
+        self.inline_completer.stats_changed.connect(self.update_completion_stats)
+        self.update_completion_stats()
+        self.ai_control_panel.feature_checks["Project Context"].toggled.connect(self.set_project_context)
+        
+        # Model selection: list the local models, warm up the selected one
+        self.ai_control_panel.model_combo.currentTextChanged.connect(self.set_model)
+        self.ai_control_panel.fast_model_combo.currentTextChanged.connect(self.set_fast_model)
+        self.model_manager.models_changed.connect(self.on_models_listed)
+        self.model_manager.model_ready.connect(
+            lambda model: self.statusBar().showMessage(f"🔥 {model} loaded and ready")
+        )
+        self.backend_status = BackendStatus(self.ai_assistant.client, self.ai_executor, self)
+        self.backend_status.changed.connect(self.update_backend_status)
+        self.model_manager.model_ready.connect(self.backend_status.set_loaded_model)
+        self.update_backend_status()
+        self.backend_status.check()
+        self.model_manager.model_failed.connect(
+            lambda model, error: self.statusBar().showMessage(f"⚠️ Could not load {model}: {error}")
+        )
+        # The warm-up starts once the list arrives, so a model that isn't installed isn't loaded
+        self.ai_control_panel.set_models([], self.ai_assistant.model_name, self.inline_completer.model)
+        self.model_manager.refresh_models()
+        
         # Connect editor cursor position changes
         self.code_editor.cursorPositionChanged.connect(self.update_cursor_position)
+        self.large_file_view.cursorPositionChanged.connect(self.update_cursor_position)
+        
+    def update_backend_status(self):
+        """Show the backend's state in the status bar, flagging queued AI jobs"""
+        self.backend_label.setText(self.backend_status.text())
+        color = "#FF9800" if self.backend_status.saturated else "#4CAF50"
+        self.backend_label.setStyleSheet(f"color: {color}; font-weight: bold;")
+        
+    def on_models_listed(self, models: List[str]):
+        """Show the installed models, switching to one of them if ours isn't installed"""
+        current = self.ai_assistant.model_name
+        fast = self.inline_completer.model
+        if models and current not in models:
+            current = f"{current}:latest" if f"{current}:latest" in models else models[0]
+        if models and fast not in models:
+            fast = self.model_manager.smallest(models)
+        self.ai_control_panel.set_models(models, current, fast)
+        self.model_router.set_tier("fast", fast)
+        self.inline_completer.model = fast
+        self.set_model(current)
+        
+    def set_model(self, model: str):
+        """Use model for the AI actions and chat, and start loading it"""
+        if not model:
+            return
+        self.ai_assistant.model_name = model
+        self.chat_session.model = model
+        self.model_router.set_tier("quality", model)
+        self.model_manager.keep_warm(self.model_router.models())
+        
+    def set_fast_model(self, model: str):
+        """Use model for inline completion and as the fallback for slow requests"""
+        if not model:
+            return
+        self.inline_completer.model = model
+        self.model_router.set_tier("fast", model)
+        self.model_manager.keep_warm(self.model_router.models())
+        
+    def index_project(self, file_path: str):
+        """Index the project containing file_path in the background, if it isn't already"""
+        root = find_project_root(file_path)
+        if root == self.project_root:
+            return
+        self.project_root = root
+        # An earlier index of this project answers queries until the rebuild finishes
+        self.project_index = EmbeddingIndex(index_dir_for(root), self.ai_assistant.client)
+        self.search_index = LexicalIndex(index_dir_for(root))
+        self.set_project_context(self.ai_control_panel.feature_checks["Project Context"].isChecked())
+        if self.project_search is not None:
+            self.project_search.set_index(self.search_index)
+        
+        def on_finished(result: Dict):
+            if result.get("cancelled"):
+                return
+            if "error" in result:
+                self.statusBar().showMessage(f"⚠️ Project context unavailable: {result['error']}")
+            else:
+                self.statusBar().showMessage(
+                    f"🧭 Indexed {result['files']} files ({result['chunks']} chunks) for project context"
+                )
+                
+        # The search index needs no model, so it is ready long before the embeddings
+        self.index_executor.submit(
+            self.search_index.build, root,
+            on_finished=lambda result: logger.info("Search index of %s: %s", root, result),
+            supersede_key="search-index"
+        )
+        self.index_executor.submit(
+            self.project_index.build, root,
+            on_chunk=lambda message: self.statusBar().showMessage(f"🧭 {message}"),
+            on_finished=on_finished, supersede_key="index"
+        )
+        
+    def reindex_file(self, file_path: str):
+        """Re-index a saved file for search and re-embed its changed chunks, in the background"""
+        if self.project_index is None:
+            return
+        self.index_executor.submit(
+            self.search_index.update_file, file_path,
+            supersede_key=("search-reindex", file_path)
+        )
+        self.index_executor.submit(
+            self.project_index.update_file, file_path,
+            on_finished=lambda result: logger.info("Reindexed %s: %s", file_path, result),
+            supersede_key=("reindex", file_path)
+        )
+        
+    def set_project_context(self, enabled: bool):
+        """Let explain/optimize add related code from the project indexes"""
+        self.ai_assistant.index = self.project_index if enabled else None
+        self.ai_assistant.lexical_index = self.search_index if enabled else None
+        
+    def show_project_search(self):
+        """Open the project search panel (kept open alongside the editor)"""
+        if self.project_search is None:
+            self.project_search = ProjectSearchDialog(self.search_executor, self)
+            self.project_search.location_selected.connect(self.open_location)
+            self.project_search.set_index(self.search_index)
+        self.project_search.show()
+        self.project_search.raise_()
+        self.project_search.query_edit.setFocus()
+        
+    def open_location(self, file_path: str, line: int):
+        """Show file_path in the editor with the cursor at the start of a 1-based line"""
+        if file_path != self.current_file and not self.load_file(file_path):
+            return
+        if self.large_file_mode():
+            self.large_file_view.go_to_line(line - 1)
+            self.large_file_view.setFocus()
+            return
+        block = self.code_editor.document().findBlockByNumber(line - 1)
+        cursor = self.code_editor.textCursor()
+        cursor.setPosition(block.position())
+        self.code_editor.setTextCursor(cursor)
+        self.code_editor.ensureCursorVisible()
+        self.code_editor.setFocus()
+        
+    def set_temperature(self, slider_value: int):
+        """Apply the temperature slider (0-100) to the AI requests"""
+        self.ai_assistant.temperature = slider_value / 100
+        self.chat_session.temperature = slider_value / 100
+        
+    def update_completion_stats(self):
+        """Show how many keystrokes the completion cache answered without the model"""
+        cache = self.inline_completer.cache
+        if cache.hits + cache.misses:
+            self.completion_label.setText(f"👻 Completions: {cache.hit_rate:.0%} cached")
+        else:
+            self.completion_label.setText("👻 Completions: -")
+        
+    def update_cache_stats(self):
+        """Show response cache hit/miss counts in the status bar"""
+        cache = self.ai_assistant.client.cache
+        if cache is None:
+            self.cache_label.setText("")
+            return
+        self.cache_label.setText(f"🗄️ Cache: {cache.hits} hits / {cache.misses} misses")
+        # Hovering the model selector shows what the router has measured
+        self.ai_control_panel.model_combo.setToolTip(self.model_router.describe())
         
     def update_cursor_position(self):
         """Update cursor position in status bar"""
-        cursor = self.code_editor.textCursor()
-        line = cursor.blockNumber() + 1
-        col = cursor.columnNumber() + 1
+        if self.large_file_mode():
+            line, col = (value + 1 for value in self.large_file_view.cursor_position())
+        else:
+            cursor = self.code_editor.textCursor()
+            line = cursor.blockNumber() + 1
+            col = cursor.columnNumber() + 1
         self.line_col_label.setText(f"Line: {line}, Col: {col}")
         
+    def large_file_mode(self) -> bool:
+        """Whether the current file is shown in the piece-table view (see LARGE_FILE_BYTES)"""
+        return self.editor_stack.currentWidget() is self.large_file_view
+        
+    def current_editor(self):
+        """The CodeEditor, or the LargeFileView while a large file is open"""
+        return self.editor_stack.currentWidget()
+        
+    def show_editor(self, editor):
+        """Switch the center panel to editor, releasing the other one's text"""
+        if editor is self.code_editor:
+            self.large_file_view.set_document(PieceTable())
+        else:
+            self.code_editor.clear()
+        self.editor_stack.setCurrentWidget(editor)
+        
+    def open_large_file(self, file_path: str):
+        """Show a large file at once from a memory map and index its lines in the background"""
+        document = PieceTable.open(file_path)
+        self.large_file_view.set_document(document)
+        self.show_editor(self.large_file_view)
+        if document.indexed:
+            return
+        
+        def on_progress(message: str):
+            if document is self.large_file_view.document and document.add_scanned_lines():
+                self.large_file_view.refresh()
+                self.statusBar().showMessage(f"📜 {message}")
+                
+        def on_finished(result: Dict):
+            if result.get("cancelled") or document is not self.large_file_view.document:
+                return
+            if "error" in result:
+                self.statusBar().showMessage(f"⚠️ Could not index {file_path}: {result['error']}")
+                return
+            document.add_scanned_lines()
+            self.large_file_view.refresh()
+            self.statusBar().showMessage(f"📜 {os.path.basename(file_path)}: {len(document):,} lines")
+                
+        self.file_executor.submit(
+            document.scan, on_chunk=on_progress, on_finished=on_finished, supersede_key="line-index"
+        )
+        
+    def write_document(self, file_path: str):
+        """Write the editor's text to file_path; a large file is streamed from its piece table.
+        
+        Lines of a large file that are still being indexed are indexed first.
+        """
+        if self.large_file_mode():
+            self.large_file_view.document.save(file_path)
+            return
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(self.code_editor.toPlainText())
+        
     # File operations
     def new_file(self):
         """Create a new file"""
+        self.show_editor(self.code_editor)
         self.code_editor.clear()
+        self.code_editor.set_highlighting(True)
         self.current_file = None
+        self.inline_completer.reset_cache()
         self.setWindowTitle("🚀 Advanced AI Code Editor - New File")
         self.statusBar().showMessage("📄 New file created")
         
@@ -777,23 +1362,36 @@ class ImprovedAICodeEditor(QMainWindow):
             self, "Open File", "", "Python Files (*.py);;All Files (*)"
         )
         if file_path:
-            try:
+            self.load_file(file_path)
+            
+    def load_file(self, file_path: str) -> bool:
+        """Show file_path in the editor; False (after telling the user) if it can't be read"""
+        try:
+            if os.path.getsize(file_path) >= self.LARGE_FILE_BYTES:
+                self.open_large_file(file_path)
+            else:
                 with open(file_path, 'r', encoding='utf-8') as file:
                     content = file.read()
-                    self.code_editor.setPlainText(content)
-                    self.current_file = file_path
-                    self.setWindowTitle(f"🚀 Advanced AI Code Editor - {os.path.basename(file_path)}")
-                    self.statusBar().showMessage(f"📁 Opened: {file_path}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to open file:\\n{str(e)}")
+                self.show_editor(self.code_editor)
+                self.code_editor.set_highlighting(is_python(file_path))
+                self.code_editor.setPlainText(content)
+            self.current_file = file_path
+            self.inline_completer.reset_cache()
+            self.setWindowTitle(f"🚀 Advanced AI Code Editor - {os.path.basename(file_path)}")
+            self.statusBar().showMessage(f"📁 Opened: {file_path}")
+            self.index_project(file_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to open file:\\n{str(e)}")
+            return False
+        return True
                 
     def save_file(self):
         """Save the current file"""
         if self.current_file:
             try:
-                with open(self.current_file, 'w', encoding='utf-8') as file:
-                    file.write(self.code_editor.toPlainText())
-                    self.statusBar().showMessage(f"💾 Saved: {self.current_file}")
+                self.write_document(self.current_file)
+                self.statusBar().showMessage(f"💾 Saved: {self.current_file}")
+                self.reindex_file(self.current_file)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to save file:\\n{str(e)}")
         else:
@@ -806,11 +1404,13 @@ class ImprovedAICodeEditor(QMainWindow):
         )
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(self.code_editor.toPlainText())
-                    self.current_file = file_path
-                    self.setWindowTitle(f"🚀 Advanced AI Code Editor - {os.path.basename(file_path)}")
-                    self.statusBar().showMessage(f"💾 Saved as: {file_path}")
+                self.write_document(file_path)
+                self.current_file = file_path
+                self.code_editor.set_highlighting(is_python(file_path))
+                self.setWindowTitle(f"🚀 Advanced AI Code Editor - {os.path.basename(file_path)}")
+                self.statusBar().showMessage(f"💾 Saved as: {file_path}")
+                self.index_project(file_path)
+                self.reindex_file(file_path)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to save file:\\n{str(e)}")
                 
@@ -822,6 +1422,8 @@ class ImprovedAICodeEditor(QMainWindow):
         
     def generate_code(self):
         """Generate code using AI"""
+        if self.large_file_unsupported():
+            return
         cursor = self.code_editor.textCursor()
         selected_text = cursor.selectedText()
         
@@ -830,52 +1432,163 @@ class ImprovedAICodeEditor(QMainWindow):
         else:
             prompt = "Generate a sample function"
             
-        # Simulate AI code generation
-        generated_code = self.simulate_code_generation(prompt)
-        
-        if generated_code:
-            cursor.insertText(generated_code)
+        built = self.ai_assistant.build_prompt(
+            "generate", prompt, self.code_editor.toPlainText(), cursor=cursor.selectionStart(),
+            source_path=self.current_file
+        )
+        self.statusBar().showMessage(f"⚡ Generating code... prompt {built.summary()}")
+        
+        def on_finished(result: Dict):
+            self.statusBar().showMessage(self.ai_status_message("⚡ Code generated successfully", result))
+            if result.get("cancelled"):
+                return
+            if "error" in result:
+                # Ollama unavailable - fall back to the offline templates
+                cursor.insertText(self.simulate_code_generation(prompt))
+            self.update_cache_stats()
             self.ai_response_widget.add_message(
                 "AI Assistant", 
                 f"Generated code based on: {prompt}",
                 "ai"
             )
-            self.statusBar().showMessage("⚡ Code generated successfully")
+            
+        # Stream the generated code straight into the editor at the cursor
+        self.ai_executor.submit(
+            self.ai_assistant.complete, built.prompt, action="generate",
+            on_chunk=cursor.insertText, on_finished=on_finished,
+            supersede_key=("generate", self.document_key())
+        )
             
     def explain_code(self):
         """Explain selected code using AI"""
+        if self.large_file_unsupported():
+            return
         cursor = self.code_editor.textCursor()
-        selected_text = cursor.selectedText()
         
-        if not selected_text:
-            selected_text = self.get_current_line()
+        if not cursor.hasSelection():
+            cursor.select(cursor.LineUnderCursor)
             
-        explanation = self.simulate_code_explanation(selected_text)
-        self.ai_response_widget.add_message(
-            "AI Assistant",
-            f"Code explanation:\\n{explanation}",
-            "ai"
+        self.run_chat_action(
+            "explain", cursor, "Code explanation:\n", self.simulate_code_explanation,
+            "📖 Explaining code...", "📖 Code explanation generated"
         )
-        self.statusBar().showMessage("📖 Code explanation generated")
         
     def optimize_code(self):
         """Optimize selected code using AI"""
+        if self.large_file_unsupported():
+            return
         cursor = self.code_editor.textCursor()
-        selected_text = cursor.selectedText()
         
-        if not selected_text:
+        if not cursor.hasSelection():
             QMessageBox.information(
                 self, "Info", "Please select code to optimize"
             )
             return
             
-        optimization = self.simulate_code_optimization(selected_text)
-        self.ai_response_widget.add_message(
-            "AI Assistant",
-            f"Code optimization suggestions:\\n{optimization}",
-            "ai"
+        self.run_chat_action(
+            "optimize", cursor, "Code optimization suggestions:\n", self.simulate_code_optimization,
+            "🚀 Optimizing code...", "🚀 Code optimization suggestions generated"
         )
-        self.statusBar().showMessage("🚀 Code optimization suggestions generated")
+        
+    def explain_each_function(self):
+        """Explain every function in the selection (or the file), one chat message each"""
+        if self.large_file_unsupported():
+            return
+        cursor = self.code_editor.textCursor()
+        document = self.code_editor.document()
+        if cursor.hasSelection():
+            first = document.findBlock(cursor.selectionStart()).blockNumber() + 1
+            last = document.findBlock(cursor.selectionEnd()).blockNumber() + 1
+        else:
+            first, last = 1, document.blockCount()
+        functions = [
+            chunk for chunk in chunk_source(self.current_file or "", self.code_editor.toPlainText(), min_tokens=0)
+            if chunk.kind in ("function", "method") and first <= chunk.start_line and chunk.end_line <= last
+        ]
+        if not functions:
+            self.statusBar().showMessage("🧩 No functions to explain")
+            return
+        for chunk in functions[:self.BATCH_MAX_FUNCTIONS]:
+            function_cursor = QTextCursor(document)
+            function_cursor.setPosition(document.findBlockByNumber(chunk.start_line - 1).position())
+            end_block = document.findBlockByNumber(chunk.end_line - 1)
+            function_cursor.setPosition(end_block.position() + end_block.length() - 1, QTextCursor.KeepAnchor)
+            self.run_chat_action(
+                "explain", function_cursor, f"{chunk.name} (line {chunk.start_line}):\n",
+                self.simulate_code_explanation, f"🧩 Explaining {len(functions)} functions...",
+                "🧩 Function explained",
+                supersede_key=("explain-each", self.document_key(), chunk.name, chunk.start_line)
+            )
+        if len(functions) > self.BATCH_MAX_FUNCTIONS:
+            self.statusBar().showMessage(
+                f"🧩 Explaining the first {self.BATCH_MAX_FUNCTIONS} of {len(functions)} functions; "
+                "select code to choose others"
+            )
+        
+    def run_chat_action(self, kind: str, cursor, header: str, fallback,
+                        progress_message: str, success_message: str, supersede_key=None):
+        """Run an assistant action on the selection, streaming its answer into the chat.
+        
+        The prompt holds the selection plus as much surrounding code as fits
+        the context window, and related code from the project index when
+        Project Context is on. A newer action with the same supersede_key
+        (by default: the same kind on the same document) cancels this one.
+        """
+        document = self.code_editor.toPlainText()
+        selection = (cursor.selectionStart(), cursor.selectionEnd())
+        code = document[selection[0]:selection[1]]
+        self.statusBar().showMessage(progress_message)
+        
+        message_label = self.ai_response_widget.start_streaming_message("AI Assistant")
+        self.ai_response_widget.append_to_message(message_label, header)
+        
+        def on_finished(result: Dict):
+            if result.get("cancelled"):
+                self.ai_response_widget.append_to_message(message_label, "\n⏹ Cancelled")
+            elif "error" in result:
+                self.ai_response_widget.append_to_message(message_label, fallback(code))
+            self.update_cache_stats()
+            self.statusBar().showMessage(self.ai_status_message(success_message, result))
+            
+        # The index lookup embeds the selection, so the prompt is built on the worker
+        self.ai_executor.submit(
+            self.ai_assistant.run_action, kind, code, document, selection, self.current_file,
+            on_chunk=lambda text: self.ai_response_widget.append_to_message(message_label, text),
+            on_finished=on_finished,
+            supersede_key=supersede_key or (kind, self.document_key())
+        )
+        
+    def large_file_unsupported(self) -> bool:
+        """True (after saying so) if a large file is open: AI actions work on the CodeEditor's text"""
+        if not self.large_file_mode():
+            return False
+        self.statusBar().showMessage(
+            f"📜 AI actions are off for files over {self.LARGE_FILE_BYTES // 2 ** 20} MB"
+        )
+        return True
+        
+    def show_ai_stats(self):
+        """Show the recorded AI request metrics"""
+        MetricsDialog(get_default_recorder(), self).exec_()
+        
+    def stop_ai(self):
+        """Cancel every queued and running AI request"""
+        self.ai_executor.cancel_all()
+        self.statusBar().showMessage("⏹ AI requests cancelled")
+        
+    def document_key(self) -> str:
+        """Identifies the current document for superseding AI requests"""
+        return self.current_file or "untitled"
+        
+    def ai_status_message(self, success_message: str, result: Dict) -> str:
+        """Status bar text for a finished AI request"""
+        if result.get("cancelled"):
+            return "⏹ AI request cancelled"
+        if "error" in result:
+            return "⚠️ Ollama unavailable - showing offline suggestions"
+        if "prompt_summary" in result:
+            return f"{success_message} (prompt {result['prompt_summary']})"
+        return success_message
         
     # AI simulation methods
     def simulate_code_generation(self, prompt: str) -> str:
@@ -957,6 +1670,18 @@ print(result)
         cursor.select(cursor.LineUnderCursor)
         return cursor.selectedText()
         
+    def closeEvent(self, event):
+        """Stop the AI worker threads before closing"""
+        self.backend_status.close()
+        self.ai_assistant.client.remove_observer(self.model_router.observe)
+        self.inline_completer.shutdown()
+        self.model_manager.shutdown()
+        self.ai_executor.shutdown()
+        self.index_executor.shutdown()
+        self.file_executor.shutdown()
+        self.search_executor.shutdown()
+        super().closeEvent(event)
+        
     # Utility methods
     def zoom_in(self):
         """Increase editor font size"""
@@ -965,6 +1690,7 @@ print(result)
         if size < 24:
             font.setPointSize(size + 1)
             self.code_editor.setFont(font)
+            self.large_file_view.setFont(font)
             self.statusBar().showMessage(f"🔍+ Font size: {size + 1}")
             
     def zoom_out(self):
@@ -974,6 +1700,7 @@ print(result)
         if size > 8:
             font.setPointSize(size - 1)
             self.code_editor.setFont(font)
+            self.large_file_view.setFont(font)
             self.statusBar().showMessage(f"🔍- Font size: {size - 1}")
 
 
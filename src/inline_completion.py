@@ -0,0 +1,192 @@
+"""
+👻 Inline Completion
+Ghost-text completion for the code editor. After a pause in typing, the
+code around the cursor is sent to Ollama as a fill-in-the-middle request
+(the text before the cursor as the prompt, the text after it as the
+suffix). Requests run on a dedicated worker, so keystrokes never wait on
+the model. A suggestion is dropped if it misses the deadline, or if the
+buffer or cursor changed while it was being generated. Suggestions are
+remembered in a CompletionCache: while the user types what the last
+suggestion predicted, the rest of it is shown without a new request.
+"""
+
+import time
+import logging
+from typing import Dict, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QTextBlock
+from PyQt5.QtWidgets import QTextEdit
+
+from ai_worker import AIJobExecutor
+from completion_cache import CompletionCache
+from model_router import ModelRouter
+from ollama_client import OllamaClient
+from prompt_builder import PromptBuilder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE_MS = 250
+DEFAULT_DEADLINE_MS = 300
+MAX_SUGGESTION_LINES = 8
+
+# Short, focused answers: a completion is a few lines at most
+FIM_OPTIONS = {"temperature": 0.2, "num_predict": 64, "stop": ["\n\n\n"]}
+
+
+class InlineCompleter(QObject):
+    """Requests fill-in-the-middle completions for an editor and shows them as ghost text.
+
+    The editor must provide set_ghost_text(text) and clear_ghost_text().
+    """
+
+    suggestion_shown = pyqtSignal(str)
+    stats_changed = pyqtSignal()
+
+    def __init__(self, editor: QTextEdit, client: OllamaClient, model: str,
+                 debounce_ms: int = DEFAULT_DEBOUNCE_MS,
+                 deadline_ms: int = DEFAULT_DEADLINE_MS, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.client = client
+        self.model = model
+        self.router: Optional[ModelRouter] = None  # Overrides model when set
+        self.deadline_ms = deadline_ms
+        self.enabled = True
+        # A small window keeps prefill, and so latency, short
+        self.prompt_builder = PromptBuilder(num_ctx=2048, reserved_output=FIM_OPTIONS["num_predict"])
+        # Its own worker: completions never queue behind a long chat or explain request
+        self.executor = AIJobExecutor(max_workers=1)
+        self.stats = {"requested": 0, "shown": 0, "late": 0, "stale": 0, "failed": 0}
+        self.cache = CompletionCache(max_lines=MAX_SUGGESTION_LINES)
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(debounce_ms)
+        self.debounce.timeout.connect(self.request_completion)
+        editor.textChanged.connect(self.on_text_changed)
+        editor.document().contentsChange.connect(self.on_contents_change)
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+        if not enabled:
+            self.debounce.stop()
+            self.executor.cancel_all()
+            self.editor.clear_ghost_text()
+
+    def reset_cache(self):
+        """Start a fresh cache, e.g. for a different document"""
+        self.cache = CompletionCache(max_lines=MAX_SUGGESTION_LINES)
+        self.stats_changed.emit()
+
+    def on_contents_change(self, position: int, removed: int, added: int):
+        # The cursor has already moved: typing (or pasting) leaves it after the edit
+        if self.editor.textCursor().position() == position + added:
+            self.cache.invalidate(self.editor.document().findBlock(position).blockNumber())
+        else:
+            self.cache.clear()
+
+    def on_text_changed(self):
+        if self.enabled:
+            # After the editor has moved its cursor (which clears the ghost text)
+            QTimer.singleShot(0, self.show_cached_or_schedule)
+
+    def show_cached_or_schedule(self):
+        """Show a cached suggestion at once, or restart the typing-pause timer"""
+        cursor = self.editor.textCursor()
+        if not self.enabled or cursor.hasSelection():
+            return
+        block = cursor.block()
+        column = cursor.positionInBlock()
+        suggestion = self.cache.lookup(
+            block.blockNumber(), lambda line: text_since(block, column, line), block.text()[column:]
+        )
+        self.stats_changed.emit()
+        if suggestion:
+            # Any outstanding request is for text the user has typed past
+            self.debounce.stop()
+            self.executor.cancel_all()
+            self.editor.set_ghost_text(suggestion)
+            self.suggestion_shown.emit(suggestion)
+            return
+        self.debounce.start()
+
+    def request_completion(self):
+        """Send a completion request for the current cursor position"""
+        cursor = self.editor.textCursor()
+        if cursor.hasSelection() or not self.model:
+            return
+        text = self.editor.toPlainText()
+        position = cursor.position()
+        if position < len(text) and (text[position].isalnum() or text[position] == "_"):
+            return  # In the middle of a word; nothing sensible to insert
+        prefix, suffix = self.prompt_builder.build_fim(text, position)
+        if not prefix.strip():
+            return
+
+        model = self.model
+        if self.router is not None:
+            counter = self.prompt_builder.counter
+            prompt_tokens = counter.count(prefix, remember=False) + counter.count(suffix, remember=False)
+            model = self.router.route("inline", prompt_tokens, default=self.model)
+
+        revision = self.editor.document().revision()
+        line = cursor.blockNumber()
+        column = cursor.positionInBlock()
+        line_text = cursor.block().text()
+        started = time.monotonic()
+        self.stats["requested"] += 1
+        job = self.executor.submit(
+            self.client.generate, prefix, model=model, options=FIM_OPTIONS, suffix=suffix, action="inline",
+            cacheable=False,  # Completions have their own cache (completion_cache.py)
+            on_finished=lambda result: self.on_completion(
+                result, line, line_text[:column], line_text[column:], revision, position, started),
+            supersede_key="inline"
+        )
+        # Past the deadline the suggestion is useless: stop the generation
+        QTimer.singleShot(self.deadline_ms, job.cancel)
+
+    def on_completion(self, result: Dict, line: int, typed: str, after: str,
+                      revision: int, position: int, started: float):
+        """Show the suggestion if it is on time and the buffer is unchanged"""
+        if result.get("cancelled"):
+            if (time.monotonic() - started) * 1000 >= self.deadline_ms:
+                self.stats["late"] += 1
+            return
+        if "error" in result:
+            self.stats["failed"] += 1
+            logger.debug("Inline completion failed: %s", result["error"])
+            return
+        if (time.monotonic() - started) * 1000 > self.deadline_ms:
+            self.stats["late"] += 1
+            return
+        if (not self.enabled or self.editor.document().revision() != revision
+                or self.editor.textCursor().position() != position):
+            self.stats["stale"] += 1
+            return
+
+        suggestion = clean_suggestion(result.get("response", ""))
+        if suggestion:
+            self.cache.put(line, typed, after, suggestion)
+            self.stats["shown"] += 1
+            self.editor.set_ghost_text(suggestion)
+            self.suggestion_shown.emit(suggestion)
+
+    def shutdown(self):
+        self.debounce.stop()
+        self.executor.shutdown()
+
+
+def text_since(block: QTextBlock, column: int, line: int) -> str:
+    """Text from the start of line to column in block"""
+    parts = [block.text()[:column]]
+    while block.blockNumber() > line:
+        block = block.previous()
+        parts.append(block.text())
+    return "\n".join(reversed(parts))
+
+
+def clean_suggestion(text: str, max_lines: int = MAX_SUGGESTION_LINES) -> str:
+    """Trim a raw completion to something worth showing inline"""
+    lines = text.rstrip().split("\n")[:max_lines]
+    return "\n".join(lines).rstrip()
@@ -0,0 +1,369 @@
+"""
+📜 Large File View
+An editor widget for a PieceTable that only lays out the lines on screen:
+the scrollbar counts lines, and each paint reads and draws the visible
+lines (and only their visible columns), so scrolling, typing and painting
+cost the same in a 100 MB file as in a small one. A mapped file can be
+shown while its lines are still being indexed: the view grows on refresh().
+Used by the main window for files too large for QTextEdit.
+"""
+
+from typing import List, Optional, Tuple
+
+from PyQt5.QtWidgets import QAbstractScrollArea, QApplication
+from PyQt5.QtCore import QEvent, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QKeySequence, QPainter
+
+from piece_table import PieceTable, Position
+
+TAB_WIDTH = 4
+MARGIN = 8
+MAX_UNDO = 1000
+
+
+def visual_column(line: str, column: int) -> int:
+    """Screen column of a character column, with tabs expanded"""
+    return len(line[:column].expandtabs(TAB_WIDTH))
+
+
+def text_column(line: str, visual: int) -> int:
+    """Character column nearest to a screen column"""
+    position = 0
+    for column, char in enumerate(line):
+        width = TAB_WIDTH - position % TAB_WIDTH if char == "\t" else 1
+        if position + width / 2 > visual:
+            return column
+        position += width
+    return len(line)
+
+
+class LargeFileView(QAbstractScrollArea):
+    """Plain-text editor over a PieceTable with a virtualized viewport"""
+
+    cursorPositionChanged = pyqtSignal()
+    textChanged = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.document = PieceTable()
+        self.cursor: Position = (0, 0)
+        self.anchor: Position = (0, 0)  # Other end of the selection; equals cursor when none
+        self.undo_stack: List[Tuple] = []
+        self.redo_stack: List[Tuple] = []
+        self.history_generation = 0  # Document generation the undo steps belong to
+        self.last_edit: Optional[Tuple[str, int]] = None
+        # Widest line seen on screen so far, in screen columns
+        self.widest = 0
+
+        font = QFont("Consolas", 12)
+        font.setFixedPitch(True)
+        self.setFont(font)
+        self.viewport().setCursor(Qt.IBeamCursor)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setStyleSheet("""
+            QAbstractScrollArea {
+                background-color: #1e1e1e;
+                border: 2px solid #4CAF50;
+                border-radius: 8px;
+            }
+            QScrollBar:vertical, QScrollBar:horizontal {
+                background-color: #2b2b2b;
+                border-radius: 6px;
+            }
+            QScrollBar::handle:vertical, QScrollBar::handle:horizontal {
+                background-color: #4CAF50;
+                border-radius: 6px;
+            }
+        """)
+
+    # Document
+    def set_document(self, document: PieceTable):
+        """Show document, closing the one shown before"""
+        if document is not self.document:
+            self.document.close()
+        self.document = document
+        self.cursor = self.anchor = (0, 0)
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.history_generation = document.generation
+        self.last_edit = None
+        self.widest = 0
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self.update_scrollbars()
+        self.viewport().update()
+        self.cursorPositionChanged.emit()
+
+    def refresh(self):
+        """Catch up with lines added to the document outside the view (e.g. by indexing)"""
+        self.update_scrollbars()
+        self.viewport().update()
+
+    def cursor_position(self) -> Position:
+        return self.cursor
+
+    def has_selection(self) -> bool:
+        return self.cursor != self.anchor
+
+    def selection(self) -> Tuple[Position, Position]:
+        return min(self.cursor, self.anchor), max(self.cursor, self.anchor)
+
+    def selected_text(self) -> str:
+        return self.document.text(*self.selection())
+
+    def go_to_line(self, line: int):
+        """Put the cursor at the start of a 0-based line and scroll it into view"""
+        self.set_cursor((max(0, min(line, len(self.document) - 1)), 0))
+        self.verticalScrollBar().setValue(self.cursor[0] - self.visible_lines() // 3)
+
+    # Geometry
+    def line_height(self) -> int:
+        return self.fontMetrics().lineSpacing()
+
+    def char_width(self) -> int:
+        return self.fontMetrics().horizontalAdvance(" ")
+
+    def visible_lines(self) -> int:
+        return max(1, self.viewport().height() // self.line_height())
+
+    def update_scrollbars(self):
+        lines = self.visible_lines()
+        vertical = self.verticalScrollBar()
+        vertical.setRange(0, max(0, len(self.document) - lines))
+        vertical.setPageStep(lines)
+        horizontal = self.horizontalScrollBar()
+        width = self.viewport().width() - MARGIN * 2
+        horizontal.setRange(0, max(0, self.widest * self.char_width() - width))
+        horizontal.setPageStep(width)
+        horizontal.setSingleStep(self.char_width() * 4)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbars()
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        self.viewport().update()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self.update_scrollbars()
+
+    def position_at(self, x: int, y: int) -> Position:
+        """Document position under a viewport point"""
+        line = self.verticalScrollBar().value() + max(0, y) // self.line_height()
+        line = min(line, len(self.document) - 1)
+        visual = (x - MARGIN + self.horizontalScrollBar().value()) / self.char_width()
+        return line, text_column(self.document.line(line), visual)
+
+    def ensure_cursor_visible(self):
+        line, column = self.cursor
+        vertical = self.verticalScrollBar()
+        if line < vertical.value():
+            vertical.setValue(line)
+        elif line >= vertical.value() + self.visible_lines():
+            vertical.setValue(line - self.visible_lines() + 1)
+        x = visual_column(self.document.line(line), column) * self.char_width()
+        horizontal = self.horizontalScrollBar()
+        width = self.viewport().width() - MARGIN * 2
+        if x < horizontal.value():
+            horizontal.setValue(x)
+        elif x > horizontal.value() + width:
+            self.widest = max(self.widest, x // self.char_width() + 1)
+            self.update_scrollbars()
+            horizontal.setValue(x - width + self.char_width())
+
+    # Painting
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.setFont(self.font())
+        metrics = self.fontMetrics()
+        height, char_width = self.line_height(), self.char_width()
+        scroll_x = self.horizontalScrollBar().value()
+        first_visual = scroll_x // char_width
+        columns = self.viewport().width() // char_width + 2
+        first = self.verticalScrollBar().value()
+        start, end = self.selection()
+        painter.fillRect(event.rect(), QColor("#1e1e1e"))
+
+        widest = self.widest
+        for row, line in enumerate(range(first, min(first + self.visible_lines() + 1, len(self.document)))):
+            text = self.document.line(line)
+            expanded = text.expandtabs(TAB_WIDTH)
+            widest = max(widest, len(expanded))
+            top = row * height
+            left = MARGIN - scroll_x
+            if line == self.cursor[0]:
+                painter.fillRect(0, top, self.viewport().width(), height, QColor("#2a2d2e"))
+            if start[0] <= line <= end[0] and start != end:
+                begin = visual_column(text, start[1]) if line == start[0] else 0
+                stop = visual_column(text, end[1]) if line == end[0] else len(expanded) + 1
+                painter.fillRect(left + begin * char_width, top, (stop - begin) * char_width, height,
+                                 QColor("#264f78"))
+            painter.setPen(QColor("#ffffff"))
+            # Only the columns on screen are laid out, however long the line
+            painter.drawText(left + first_visual * char_width, top + metrics.ascent(),
+                             expanded[first_visual:first_visual + columns])
+            if line == self.cursor[0] and self.hasFocus():
+                x = left + visual_column(text, self.cursor[1]) * char_width
+                painter.fillRect(x, top, 2, height, QColor("#4CAF50"))
+        painter.end()
+        if widest > self.widest:
+            self.widest = widest
+            self.update_scrollbars()
+
+    # Editing
+    def set_cursor(self, position: Position, keep_anchor: bool = False):
+        self.cursor = position
+        if not keep_anchor:
+            self.anchor = position
+        self.last_edit = None
+        self.ensure_cursor_visible()
+        self.viewport().update()
+        self.cursorPositionChanged.emit()
+
+    def edit(self, text: str, start: Optional[Position] = None, end: Optional[Position] = None,
+             kind: str = "edit"):
+        """Replace start..end (default: the selection) with text, as one undo step.
+
+        Consecutive typing on one line is a single undo step.
+        """
+        if start is None:
+            start, end = self.selection()
+        self._drop_stale_history()
+        if kind != "type" or self.last_edit != (kind, start[0]) or start != end:
+            self.undo_stack.append((self.document.snapshot(), self.cursor, self.anchor))
+            del self.undo_stack[:-MAX_UNDO]
+        self.redo_stack.clear()
+        position = self.document.replace(start, end, text)
+        self.cursor = self.anchor = position
+        self.update_scrollbars()
+        self.ensure_cursor_visible()
+        self.last_edit = (kind, position[0])
+        self.viewport().update()
+        self.textChanged.emit()
+        self.cursorPositionChanged.emit()
+
+    def undo(self):
+        self._step(self.undo_stack, self.redo_stack)
+
+    def redo(self):
+        self._step(self.redo_stack, self.undo_stack)
+
+    def _drop_stale_history(self):
+        """Forget undo steps taken before the document was remapped (see PieceTable.save)"""
+        if self.history_generation != self.document.generation:
+            self.history_generation = self.document.generation
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.last_edit = None
+
+    def _step(self, source: List[Tuple], target: List[Tuple]):
+        self._drop_stale_history()
+        if not source:
+            return
+        target.append((self.document.snapshot(), self.cursor, self.anchor))
+        snapshot, cursor, anchor = source.pop()
+        self.document.restore(snapshot)
+        self.update_scrollbars()
+        self.set_cursor(cursor)
+        self.anchor = anchor
+        self.textChanged.emit()
+
+    def copy(self):
+        if self.has_selection():
+            QApplication.clipboard().setText(self.selected_text())
+
+    def cut(self):
+        if self.has_selection():
+            self.copy()
+            self.edit("")
+
+    def paste(self):
+        text = QApplication.clipboard().text()
+        if text:
+            self.edit(text)
+
+    def selectAll(self):
+        last = len(self.document) - 1
+        self.anchor = (0, 0)
+        self.set_cursor((last, len(self.document.line(last))), keep_anchor=True)
+
+    def moved(self, key: int, control: bool) -> Optional[Position]:
+        """Where a navigation key takes the cursor, or None for other keys"""
+        line, column = self.cursor
+        last = len(self.document) - 1
+        if key == Qt.Key_Left:
+            if column > 0:
+                return line, column - 1
+            return (line - 1, len(self.document.line(line - 1))) if line > 0 else self.cursor
+        if key == Qt.Key_Right:
+            if column < len(self.document.line(line)):
+                return line, column + 1
+            return (line + 1, 0) if line < last else self.cursor
+        rows = {Qt.Key_Up: -1, Qt.Key_Down: 1,
+                Qt.Key_PageUp: -self.visible_lines(), Qt.Key_PageDown: self.visible_lines()}.get(key)
+        if rows is not None:
+            target = max(0, min(line + rows, last))
+            visual = visual_column(self.document.line(line), column)
+            return target, text_column(self.document.line(target), visual)
+        if key == Qt.Key_Home:
+            return (0, 0) if control else (line, 0)
+        if key == Qt.Key_End:
+            if control:
+                return last, len(self.document.line(last))
+            return line, len(self.document.line(line))
+        return None
+
+    def keyPressEvent(self, event):
+        for sequence, action in ((QKeySequence.Copy, self.copy), (QKeySequence.Cut, self.cut),
+                                 (QKeySequence.Paste, self.paste), (QKeySequence.Undo, self.undo),
+                                 (QKeySequence.Redo, self.redo), (QKeySequence.SelectAll, self.selectAll)):
+            if event.matches(sequence):
+                action()
+                return
+        key = event.key()
+        control = bool(event.modifiers() & Qt.ControlModifier)
+        target = self.moved(key, control)
+        if target is not None:
+            self.set_cursor(target, keep_anchor=bool(event.modifiers() & Qt.ShiftModifier))
+            return
+        line, column = self.cursor
+        if key == Qt.Key_Backspace:
+            if self.has_selection():
+                self.edit("")
+            elif column > 0 or line > 0:
+                self.edit("", self.moved(Qt.Key_Left, False), self.cursor)
+        elif key == Qt.Key_Delete:
+            if self.has_selection():
+                self.edit("")
+            else:
+                self.edit("", self.cursor, self.moved(Qt.Key_Right, False))
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            self.edit("\n")
+        elif key == Qt.Key_Tab:
+            self.edit("\t", kind="type")
+        elif event.text() and event.text().isprintable() and not control:
+            self.edit(event.text(), kind="type")
+        else:
+            super().keyPressEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.set_cursor(self.position_at(event.x(), event.y()),
+                            keep_anchor=bool(event.modifiers() & Qt.ShiftModifier))
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & Qt.LeftButton:
+            self.set_cursor(self.position_at(event.x(), event.y()), keep_anchor=True)
+
+    def focusNextPrevChild(self, next: bool) -> bool:
+        return False  # Tab is typed, not used to move focus
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.viewport().update()
+
+    def focusOutEvent(self, event):
+        super().focusOutEvent(event)
+        self.viewport().update()
@@ -0,0 +1,350 @@
+"""
+🔤 Lexical Index
+A BM25 inverted index over the project's code chunks, for retrieval that
+needs no model: most lookups are for identifiers that appear verbatim.
+Identifiers are split on snake_case and camelCase (getDefaultClient and
+get_default_client both match "default client") and also indexed whole.
+
+Postings live in SQLite as NumPy arrays, one row per term and segment.
+Saving a file marks its old chunks dead and appends a small segment with
+the new ones; segments are merged (dropping dead chunks) once there are
+many. A query reads each term's postings once (cached) and scores all
+chunks with vectorized BM25, staying in the low milliseconds on large
+repositories.
+"""
+
+import os
+import re
+import math
+import sqlite3
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from code_chunker import Chunk, chunk_source
+from embedding_index import SearchHit, is_source_file, iter_source_files
+
+logger = logging.getLogger(__name__)
+
+# Indexing is local and cheap, so this covers far larger trees than the embedding index
+MAX_FILES = 100_000
+# Merge postings once this many segments exist
+MAX_SEGMENTS = 16
+MAX_QUERY_TERMS = 64
+POSTINGS_CACHE_TERMS = 4096
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_WORD_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Words in nearly every Python chunk; indexing them only makes postings long
+STOP_WORDS = frozenset("""
+    and as assert async await break class continue def del elif else except false finally
+    for from global if import in is lambda none nonlocal not or pass raise return self
+    true try while with yield
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Identifier-aware terms: each snake/camel part, plus compound identifiers whole"""
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        parts = [part.lower() for piece in identifier.split("_") for part in _WORD_PART.findall(piece)]
+        whole = identifier.lower()
+        if len(parts) > 1 and whole not in STOP_WORDS:
+            terms.append(whole)
+        terms.extend(part for part in parts if len(part) > 1 and part not in STOP_WORDS)
+    return terms
+
+
+def _signature(path: str) -> Tuple[int, int]:
+    """(size, mtime in ns) of a file, to notice changes without reading it"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def fuse(rankings: Sequence[List[SearchHit]], k: int = 5, smoothing: int = 60) -> List[SearchHit]:
+    """Reciprocal rank fusion of several result lists (e.g. BM25 and vector hits).
+
+    Chunks are matched by path and first line; scores are not comparable
+    across rankers, so only ranks are used.
+    """
+    fused: Dict[Tuple[str, int], List] = {}
+    for hits in rankings:
+        for rank, hit in enumerate(hits):
+            key = (hit.chunk.path, hit.chunk.start_line)
+            entry = fused.setdefault(key, [0.0, hit.chunk])
+            entry[0] += 1.0 / (smoothing + rank + 1)
+    best = sorted(fused.values(), key=lambda entry: -entry[0])[:k]
+    return [SearchHit(score, chunk) for score, chunk in best]
+
+
+class LexicalIndex:
+    """BM25 over code chunks, persisted as segmented postings in SQLite"""
+
+    def __init__(self, directory: str, k1: float = 1.2, b: float = 0.75):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings_cache: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+        # Updated on a worker thread, queried from others; access is serialized by _lock
+        self._db = sqlite3.connect(os.path.join(directory, "lexical.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "doc INTEGER PRIMARY KEY, path TEXT NOT NULL, start_line INTEGER NOT NULL, "
+            "end_line INTEGER NOT NULL, text TEXT NOT NULL, length INTEGER NOT NULL, "
+            "live INTEGER NOT NULL DEFAULT 1)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS docs_path ON docs (path)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, segment INTEGER NOT NULL, docs BLOB NOT NULL, tfs BLOB NOT NULL, "
+            "PRIMARY KEY (term, segment))"
+        )
+        # Size and mtime of each indexed file, so reopening a project skips unchanged ones
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+        self._load_docs()
+
+    def _load_docs(self):
+        """Read per-chunk lengths, liveness and paths into arrays"""
+        rows = self._db.execute("SELECT doc, length, live, path FROM docs").fetchall()
+        size = max((row[0] for row in rows), default=-1) + 1
+        self.lengths = np.zeros(size, dtype=np.float32)
+        self.live = np.zeros(size, dtype=bool)
+        self.paths: List[Optional[str]] = [None] * size
+        for doc, length, live, path in rows:
+            self.lengths[doc] = length
+            self.live[doc] = bool(live)
+            self.paths[doc] = path
+        last, self.segments = self._db.execute(
+            "SELECT MAX(segment), COUNT(DISTINCT segment) FROM postings").fetchone()
+        self._next_segment = 0 if last is None else last + 1
+        self._postings_cache.clear()
+        self._update_stats()
+
+    def _update_stats(self):
+        self.count = int(self.live.sum())
+        # Dead chunks still have postings (and docs rows) until the next merge
+        self.dead = len(self.paths) - self.paths.count(None) - self.count
+        average_length = float(self.lengths[self.live].mean()) if self.count else 1.0
+        # BM25's length normalisation per chunk, so queries only gather it
+        self._norms = (self.k1 * (1 - self.b + self.b * self.lengths / average_length)).astype(np.float32)
+
+    def __len__(self) -> int:
+        """Number of live chunks"""
+        return self.count
+
+    @property
+    def root(self) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+            return row[0] if row else None
+
+    def relative(self, path: str) -> Optional[str]:
+        """path as stored in the index (relative to root), or None if outside the project"""
+        root = self.root
+        if root is None:
+            return None
+        relative = os.path.relpath(os.path.abspath(path), root)
+        return None if relative.startswith("..") else relative
+
+    def build(self, root: str, on_chunk: Optional[Callable[[str], None]] = None,
+              cancel_token=None) -> Dict:
+        """Index the source files under root that changed since the last build.
+
+        Files that disappeared are dropped. Follows the AIJobExecutor job
+        signature so it can run on a worker.
+        """
+        root = os.path.abspath(root)
+        with self._lock:
+            if self.root not in (None, root):
+                for table in ("docs", "postings", "files"):
+                    self._db.execute(f"DELETE FROM {table}")
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('root', ?)", (root,))
+            self._db.commit()
+            self._load_docs()
+            indexed = {path: (size, mtime) for path, size, mtime in self._db.execute("SELECT * FROM files")}
+        changed, wanted = [], set()
+        for path in iter_source_files(root, max_files=MAX_FILES):
+            relative = os.path.relpath(path, root)
+            wanted.add(relative)
+            if indexed.get(relative) != _signature(path):
+                changed.append(path)
+        if on_chunk is not None:
+            on_chunk(f"Indexing {len(changed)} changed files for search")
+        result = self.sync_files(changed, removed=sorted(set(indexed) - wanted), cancel_token=cancel_token)
+        result.setdefault("unchanged", len(wanted) - len(changed))
+        return result
+
+    def update_file(self, path: str, on_chunk: Optional[Callable[[str], None]] = None,
+                    cancel_token=None) -> Dict:
+        """Re-index one saved file; a job for AIJobExecutor like build()"""
+        relative = self.relative(path)
+        if relative is None:
+            return {"files": 0, "chunks": 0}
+        if not is_source_file(path):
+            # E.g. grown past MAX_FILE_BYTES: drop what was indexed of it
+            return self.sync_files([], removed=[relative])
+        return self.sync_files([path])
+
+    def sync_files(self, paths: Sequence[str], removed: Sequence[str] = (), cancel_token=None) -> Dict:
+        """Replace the chunks of files (absolute paths) and drop removed relative paths"""
+        root = self.root
+        if root is None:
+            return {"error": "The index has no project root; build() it first"}
+        relatives = list(removed)
+        signatures = []
+        docs: List[Tuple[Chunk, Counter]] = []
+        for path in paths:
+            if cancel_token is not None and cancel_token.cancelled:
+                return {"error": "Cancelled", "cancelled": True}
+            relative = os.path.relpath(os.path.abspath(path), root)
+            relatives.append(relative)
+            try:
+                signature = _signature(path)
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            signatures.append((relative,) + signature)
+            for chunk in chunk_source(relative, text):
+                docs.append((chunk, Counter(tokenize(chunk.text))))
+
+        with self._lock:
+            self._mark_dead(relatives)
+            first = len(self.lengths)
+            lengths = [sum(terms.values()) for _chunk, terms in docs]
+            self._db.executemany(
+                "INSERT INTO docs (doc, path, start_line, end_line, text, length) VALUES (?, ?, ?, ?, ?, ?)",
+                [(first + i, c.path, c.start_line, c.end_line, c.text, length)
+                 for i, ((c, _terms), length) in enumerate(zip(docs, lengths))]
+            )
+            self._write_segment(first, [terms for _chunk, terms in docs])
+            self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+            self._db.executemany("INSERT OR REPLACE INTO files (path, size, mtime) VALUES (?, ?, ?)", signatures)
+            self._db.commit()
+            self.lengths = np.concatenate([self.lengths, np.asarray(lengths, dtype=np.float32)])
+            self.live = np.concatenate([self.live, np.ones(len(docs), dtype=bool)])
+            self.paths.extend(chunk.path for chunk, _terms in docs)
+            self._update_stats()
+            if self.segments > MAX_SEGMENTS:
+                self.merge_segments()
+        return {"files": len(paths), "chunks": len(docs), "removed": len(removed)}
+
+    def _mark_dead(self, relatives: List[str]):
+        for start in range(0, len(relatives), 500):
+            batch = relatives[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            dead = [doc for (doc,) in self._db.execute(
+                f"SELECT doc FROM docs WHERE live = 1 AND path IN ({placeholders})", batch)]
+            self._db.execute(f"UPDATE docs SET live = 0 WHERE path IN ({placeholders})", batch)
+            self.live[dead] = False
+
+    def _write_segment(self, first_doc: int, doc_terms: List[Counter]):
+        """Store postings for docs first_doc, first_doc + 1, ... as a new segment"""
+        if not doc_terms:
+            return
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        for offset, terms in enumerate(doc_terms):
+            for term, tf in terms.items():
+                entry = postings.setdefault(term, ([], []))
+                entry[0].append(first_doc + offset)
+                entry[1].append(tf)
+        self._db.executemany(
+            "INSERT INTO postings (term, segment, docs, tfs) VALUES (?, ?, ?, ?)",
+            [(term, self._next_segment, np.asarray(ids, dtype=np.int32).tobytes(),
+              np.asarray(tfs, dtype=np.float32).tobytes()) for term, (ids, tfs) in postings.items()]
+        )
+        self._next_segment += 1
+        self.segments += 1
+        for term in postings:
+            self._postings_cache.pop(term, None)
+
+    def merge_segments(self):
+        """Rewrite all postings as one segment without dead chunks, and delete those chunks"""
+        with self._lock:
+            merged = []
+            for term in [term for (term,) in self._db.execute("SELECT DISTINCT term FROM postings")]:
+                docs, tfs = self._read_postings(term)
+                alive = self.live[docs]
+                if alive.any():
+                    merged.append((term, 0, docs[alive].tobytes(), tfs[alive].tobytes()))
+            self._db.execute("DELETE FROM postings")
+            self._db.executemany("INSERT INTO postings (term, segment, docs, tfs) VALUES (?, ?, ?, ?)", merged)
+            self._db.execute("DELETE FROM docs WHERE live = 0")
+            self._db.commit()
+            self._load_docs()
+            logger.info("Merged lexical index postings into one segment (%d terms)", len(merged))
+
+    def _read_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        rows = self._db.execute("SELECT docs, tfs FROM postings WHERE term = ?", (term,)).fetchall()
+        if not rows:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        docs = np.concatenate([np.frombuffer(row[0], dtype=np.int32) for row in rows])
+        tfs = np.concatenate([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        return docs, tfs
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Live postings of a term; stored postings go through a small LRU cache"""
+        cached = self._postings_cache.get(term)
+        if cached is not None:
+            self._postings_cache.move_to_end(term)
+        else:
+            cached = self._postings_cache[term] = self._read_postings(term)
+            if len(self._postings_cache) > POSTINGS_CACHE_TERMS:
+                self._postings_cache.popitem(last=False)
+        docs, tfs = cached
+        if not self.dead:
+            return docs, tfs
+        alive = self.live[docs]
+        return docs[alive], tfs[alive]
+
+    def busy(self) -> bool:
+        """Whether another thread is writing to the index, so a search would wait"""
+        if not self._lock.acquire(blocking=False):
+            return True
+        self._lock.release()
+        return False
+
+    def search(self, query: str, k: int = 5, exclude_path: Optional[str] = None) -> List[SearchHit]:
+        """The k chunks with the highest BM25 score for query's terms"""
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        with self._lock:
+            count = self.count
+            if not terms or not count:
+                return []
+            scores = np.zeros(len(self.lengths), dtype=np.float32)
+            for term in terms:
+                docs, tfs = self._postings(term)
+                if not len(docs):
+                    continue
+                idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+                scores[docs] += np.float32(idf * (self.k1 + 1)) * tfs / (tfs + self._norms[docs])
+
+            matched = np.flatnonzero(scores)
+            if exclude_path is not None and len(matched):
+                matched = matched[[self.paths[doc] != exclude_path for doc in matched]]
+            if not len(matched):
+                return []
+            wanted = min(k, len(matched))
+            top = matched[np.argpartition(-scores[matched], wanted - 1)[:wanted]]
+            top = top[np.argsort(-scores[top])]
+            hits = []
+            for doc in top:
+                row = self._db.execute(
+                    "SELECT path, start_line, end_line, text FROM docs WHERE doc = ?", (int(doc),)
+                ).fetchone()
+                hits.append(SearchHit(float(scores[doc]), Chunk(*row)))
+            return hits
+
+    def close(self):
+        with self._lock:
+            self._db.close()
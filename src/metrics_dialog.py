@@ -0,0 +1,185 @@
+"""
+📊 AI Statistics Dialog
+Shows the requests recorded by a MetricsRecorder: latency and time-to-first-
+token percentiles, a histogram of the chosen measurement, and a breakdown
+per action and per model. The dialog updates as requests finish and can
+export the raw samples as JSON or CSV.
+"""
+
+from PyQt5.QtWidgets import (QComboBox, QDialog, QFileDialog, QHBoxLayout, QLabel,
+                             QMessageBox, QPushButton, QTableWidget, QTableWidgetItem,
+                             QVBoxLayout, QWidget)
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter
+
+from ai_metrics import MetricsRecorder, RequestMetric
+
+# (label, RequestMetric attribute, unit scale, unit)
+HISTOGRAM_FIELDS = [
+    ("Total latency", "latency", 1000, "ms"),
+    ("Time to first token", "ttft", 1000, "ms"),
+    ("Output speed", "tokens_per_second", 1, "tok/s"),
+    ("Prompt tokens", "prompt_tokens", 1, "tok"),
+    ("Output tokens", "output_tokens", 1, "tok"),
+]
+
+
+class HistogramWidget(QWidget):
+    """Bar chart of (low, high, count) buckets"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.buckets = []
+        self.scale = 1
+        self.unit = ""
+        self.setMinimumSize(420, 180)
+
+    def set_buckets(self, buckets, scale=1, unit=""):
+        self.buckets = buckets
+        self.scale = scale
+        self.unit = unit
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#1e1e1e"))
+        painter.setPen(QColor("#d4d4d4"))
+        if not self.buckets:
+            painter.drawText(self.rect(), Qt.AlignCenter, "No requests recorded yet")
+            return
+
+        label_height = painter.fontMetrics().height() + 4
+        chart_height = self.height() - 2 * label_height
+        bar_width = self.width() / len(self.buckets)
+        tallest = max(count for _low, _high, count in self.buckets) or 1
+        for index, (low, high, count) in enumerate(self.buckets):
+            height = int(chart_height * count / tallest)
+            x = int(index * bar_width)
+            y = label_height + chart_height - height
+            painter.fillRect(x + 1, y, max(1, int(bar_width) - 2), height, QColor("#007acc"))
+            if count:
+                painter.drawText(x, y - label_height, int(bar_width), label_height,
+                                 Qt.AlignHCenter | Qt.AlignBottom, str(count))
+
+        low, high = self.buckets[0][0], self.buckets[-1][1]
+        bottom = self.height() - label_height
+        painter.drawText(0, bottom, self.width(), label_height, Qt.AlignLeft | Qt.AlignVCenter,
+                         f"{low * self.scale:.0f} {self.unit}")
+        painter.drawText(0, bottom, self.width(), label_height, Qt.AlignRight | Qt.AlignVCenter,
+                         f"{high * self.scale:.0f} {self.unit}")
+
+
+class MetricsDialog(QDialog):
+    """Live view and export of recorded AI request metrics"""
+
+    metric_recorded = pyqtSignal()
+
+    def __init__(self, recorder: MetricsRecorder, parent=None):
+        super().__init__(parent)
+        self.recorder = recorder
+        self.setWindowTitle("📊 AI Usage Statistics")
+        self.resize(640, 560)
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        self.summary_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.summary_label)
+
+        field_row = QHBoxLayout()
+        field_row.addWidget(QLabel("Histogram:"))
+        self.field_combo = QComboBox()
+        for label, _attribute, _scale, _unit in HISTOGRAM_FIELDS:
+            self.field_combo.addItem(label)
+        self.field_combo.currentIndexChanged.connect(self.refresh)
+        field_row.addWidget(self.field_combo)
+        field_row.addStretch()
+        layout.addLayout(field_row)
+
+        self.histogram = HistogramWidget()
+        layout.addWidget(self.histogram)
+
+        self.breakdown_table = QTableWidget(0, 6)
+        self.breakdown_table.setHorizontalHeaderLabels(
+            ["Group", "Requests", "Errors", "p50 latency", "p95 latency", "p50 TTFT"])
+        self.breakdown_table.verticalHeader().setVisible(False)
+        self.breakdown_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.breakdown_table)
+
+        buttons = QHBoxLayout()
+        for text, slot in (("💾 Export JSON", self.export_json), ("💾 Export CSV", self.export_csv),
+                           ("🗑️ Clear", self.clear)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        buttons.addStretch()
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        # Requests finish on worker threads: hop to the GUI thread through a
+        # queued signal and redraw at most a few times per second
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(250)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.metric_recorded.connect(self.refresh_timer.start)
+        self.recorder.add_listener(self.on_metric)
+        self.finished.connect(lambda _result: self.recorder.remove_listener(self.on_metric))
+        self.refresh()
+
+    def on_metric(self, metric: RequestMetric):
+        """Recorder listener; runs on the thread that made the request"""
+        self.metric_recorded.emit()
+
+    def refresh(self):
+        samples = self.recorder.snapshot()
+        summary = self.recorder.summary(samples)
+        latency, ttft = summary["latency"], summary["ttft"]
+        self.summary_label.setText(
+            f"Requests: {summary['requests']}   Errors: {summary['errors']}   "
+            f"Cancelled: {self.recorder.cancelled}   "
+            f"Success rate: {summary['success_rate']:.1%}   "
+            f"Cache hits: {summary['cache_hit_rate']:.1%}\n"
+            f"Latency p50/p95/p99: {latency[50] * 1000:.0f} / {latency[95] * 1000:.0f} / "
+            f"{latency[99] * 1000:.0f} ms\n"
+            f"Time to first token p50/p95/p99: {ttft[50] * 1000:.0f} / {ttft[95] * 1000:.0f} / "
+            f"{ttft[99] * 1000:.0f} ms\n"
+            f"Output speed: {summary['tokens_per_second']:.1f} tok/s   "
+            f"Tokens: {summary['prompt_tokens']} prompt, {summary['output_tokens']} output"
+        )
+
+        _label, attribute, scale, unit = HISTOGRAM_FIELDS[self.field_combo.currentIndex()]
+        self.histogram.set_buckets(self.recorder.histogram(attribute, samples=samples), scale, unit)
+
+        rows = [(f"action: {name}", stats) for name, stats in sorted(self.recorder.breakdown("action").items())]
+        rows += [(f"model: {name}", stats) for name, stats in sorted(self.recorder.breakdown("model").items())]
+        self.breakdown_table.setRowCount(len(rows))
+        for row, (name, stats) in enumerate(rows):
+            values = [name, str(stats["requests"]), str(stats["errors"]),
+                      f"{stats['latency'][50] * 1000:.0f} ms", f"{stats['latency'][95] * 1000:.0f} ms",
+                      f"{stats['ttft'][50] * 1000:.0f} ms"]
+            for column, value in enumerate(values):
+                self.breakdown_table.setItem(row, column, QTableWidgetItem(value))
+        self.breakdown_table.resizeColumnsToContents()
+
+    def export_json(self):
+        self.export("JSON Files (*.json)", ".json", self.recorder.export_json)
+
+    def export_csv(self):
+        self.export("CSV Files (*.csv)", ".csv", self.recorder.export_csv)
+
+    def export(self, file_filter: str, extension: str, write):
+        """Ask for a path and write the samples with write(path)"""
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export AI Statistics",
+                                                   f"ai_stats{extension}", file_filter)
+        if not file_path:
+            return
+        try:
+            write(file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not export statistics:\n{str(e)}")
+
+    def clear(self):
+        self.recorder.clear()
+        self.refresh()
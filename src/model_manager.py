@@ -0,0 +1,140 @@
+"""
+🔥 Model Manager
+Keeps the selected Ollama models warm. The model list comes from
+/api/tags; the selected models are preloaded in the background at startup
+and whenever the selection changes, so the first real request doesn't pay
+the model load. While the application is active a heartbeat renews the
+keep-alive; once it has been inactive for a while the models are unloaded
+to free memory.
+"""
+
+import logging
+from typing import Dict, List, Set
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+
+from ai_worker import AIJobExecutor
+from ollama_client import OllamaClient
+
+logger = logging.getLogger(__name__)
+
+KEEP_ALIVE = "10m"
+HEARTBEAT_MS = 4 * 60 * 1000      # Renew well before KEEP_ALIVE runs out
+IDLE_RELEASE_MS = 5 * 60 * 1000   # Inactive this long -> unload the model
+
+
+class ModelManager(QObject):
+    """Lists the local models and keeps the selected ones loaded while the app is in use"""
+
+    models_changed = pyqtSignal(list)   # Model names from /api/tags (empty if unreachable)
+    model_ready = pyqtSignal(str)       # The model finished loading
+    model_failed = pyqtSignal(str, str) # Model name, error message
+
+    def __init__(self, client: OllamaClient, parent=None):
+        super().__init__(parent)
+        self.client = client
+        # Its own worker: a cold model load never holds up the user's AI actions
+        self.executor = AIJobExecutor(max_workers=1)
+        self.models: List[str] = []
+        self.loaded: Set[str] = set()
+        self.model_sizes: Dict[str, int] = {}  # Bytes on disk, from /api/tags
+
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(HEARTBEAT_MS)
+        self.heartbeat.timeout.connect(self.warm_up)
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(IDLE_RELEASE_MS)
+        self.idle_timer.timeout.connect(self.release)
+
+        app = QApplication.instance()
+        if app is not None:
+            app.applicationStateChanged.connect(self.on_application_state_changed)
+
+    def refresh_models(self):
+        """Fetch the model list in the background; emits models_changed"""
+        self.executor.submit(
+            lambda on_chunk, cancel_token: self.client.tags(),
+            on_finished=self._on_tags
+        )
+
+    def _on_tags(self, result: Dict):
+        if "error" in result:
+            logger.warning("Could not list Ollama models: %s", result["error"])
+            self.models_changed.emit([])
+            return
+        names: List[str] = []
+        for entry in result.get("models", []):
+            name = entry.get("name") or entry.get("model")
+            if name:
+                names.append(name)
+                self.model_sizes[name] = entry.get("size", 0)
+        self.models_changed.emit(names)
+
+    def smallest(self, models: List[str]) -> str:
+        """The model with the fewest bytes on disk, usually the fastest"""
+        return min(models, key=lambda name: self.model_sizes.get(name, 0))
+
+    def select(self, model: str):
+        """Make model the one kept warm, preloading it in the background"""
+        self.keep_warm([model])
+
+    def keep_warm(self, models: List[str]):
+        """Keep exactly these models loaded, preloading new ones in the background"""
+        models = [model for model in models if model]
+        if models == self.models:
+            return
+        # Don't hold models in memory that are no longer used
+        for previous in self.models:
+            if previous not in models:
+                self.loaded.discard(previous)
+                self.executor.submit(
+                    lambda on_chunk, cancel_token, previous=previous: self.client.unload_model(previous)
+                )
+        self.models = models
+        self.warm_up()
+        self.heartbeat.start()
+
+    def warm_up(self):
+        """Load (or renew the keep-alive of) the selected models in the background"""
+        for model in self.models:
+            self.executor.submit(
+                lambda on_chunk, cancel_token, model=model: self.client.load_model(model, keep_alive=KEEP_ALIVE),
+                on_finished=lambda result, model=model: self._on_loaded(model, result),
+                supersede_key=("warm_up", model)
+            )
+
+    def _on_loaded(self, model: str, result: Dict):
+        if result.get("cancelled") or model not in self.models:
+            return
+        if "error" in result:
+            self.model_failed.emit(model, result["error"])
+            return
+        self.loaded.add(model)
+        self.model_ready.emit(model)
+
+    def release(self):
+        """Unload the selected models; they are loaded again when the app is used"""
+        self.heartbeat.stop()
+        for model in list(self.loaded):
+            logger.info("Idle, unloading %s", model)
+            self.executor.submit(
+                lambda on_chunk, cancel_token, model=model: self.client.unload_model(model)
+            )
+        self.loaded.clear()
+
+    def shutdown(self):
+        self.heartbeat.stop()
+        self.idle_timer.stop()
+        self.executor.shutdown()
+
+    def on_application_state_changed(self, state):
+        if state == Qt.ApplicationActive:
+            self.idle_timer.stop()
+            if self.models and not self.heartbeat.isActive():
+                self.warm_up()
+                self.heartbeat.start()
+        else:
+            self.idle_timer.start()
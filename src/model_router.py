@@ -0,0 +1,146 @@
+"""
+🧭 Model Router
+Picks the model for each AI request. Every action is configured with a
+model tier ("fast" for a small model, "quality" for a large one), a latency
+budget and the answer length it usually needs. The router tracks each
+model's recent prompt and generation speed from Ollama's timings; when the
+configured tier is expected to miss the action's budget for a prompt of
+this size, the request goes to the faster tier instead.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fastest first: the fallback order
+TIERS = ("fast", "quality")
+
+
+@dataclass
+class RouteRule:
+    """How an action is routed"""
+    tier: str
+    latency_budget: float   # Seconds
+    output_tokens: int      # Typical answer length, for the estimate
+
+
+DEFAULT_RULES: Dict[str, RouteRule] = {
+    "inline": RouteRule("fast", 0.5, 64),
+    "generate": RouteRule("quality", 30.0, 400),
+    "explain": RouteRule("quality", 60.0, 500),
+    "optimize": RouteRule("quality", 60.0, 500),
+    "chat": RouteRule("quality", 30.0, 400),
+}
+
+
+@dataclass
+class ModelSpeed:
+    """Exponentially weighted recent speeds of one model, in tokens per second"""
+    prompt_rate: Optional[float] = None
+    generation_rate: Optional[float] = None
+    samples: int = 0
+
+
+class ModelRouter:
+    """Chooses a model per action from the configured tiers and observed speeds"""
+
+    def __init__(self, tiers: Optional[Dict[str, str]] = None,
+                 rules: Optional[Dict[str, RouteRule]] = None, smoothing: float = 0.3):
+        self.tiers: Dict[str, str] = dict(tiers or {})
+        self.rules = dict(DEFAULT_RULES)
+        if rules:
+            self.rules.update(rules)
+        self.smoothing = smoothing
+        self.speeds: Dict[str, ModelSpeed] = {}
+        self.fallbacks = 0
+        self._lock = threading.Lock()  # Results are observed on worker threads
+
+    def set_tier(self, tier: str, model: str):
+        self.tiers[tier] = model
+
+    def models(self) -> List[str]:
+        """Distinct models in use, fastest tier first"""
+        models: List[str] = []
+        for tier in TIERS:
+            model = self.tiers.get(tier)
+            if model and model not in models:
+                models.append(model)
+        return models
+
+    def observe(self, model: str, result: Dict):
+        """Update a model's speeds from the timings of a finished Ollama request"""
+        prompt_rate = _rate(result.get("prompt_eval_count"), result.get("prompt_eval_duration"))
+        generation_rate = _rate(result.get("eval_count"), result.get("eval_duration"))
+        if prompt_rate is None and generation_rate is None:
+            return
+        with self._lock:
+            speed = self.speeds.setdefault(model, ModelSpeed())
+            speed.prompt_rate = self._smooth(speed.prompt_rate, prompt_rate)
+            speed.generation_rate = self._smooth(speed.generation_rate, generation_rate)
+            speed.samples += 1
+
+    def estimate(self, model: str, prompt_tokens: int, output_tokens: int) -> Optional[float]:
+        """Expected seconds for a request, or None until the model's generation speed is known"""
+        with self._lock:
+            speed = self.speeds.get(model)
+            if speed is None or not speed.generation_rate:
+                return None
+            seconds = output_tokens / speed.generation_rate
+            if speed.prompt_rate:
+                seconds += prompt_tokens / speed.prompt_rate
+            return seconds
+
+    def route(self, action: str, prompt_tokens: int, default: Optional[str] = None) -> Optional[str]:
+        """Model for an action with a prompt of prompt_tokens tokens"""
+        rule = self.rules.get(action)
+        if rule is None:
+            return default or self.tiers.get("quality")
+        model = self.tiers.get(rule.tier) or default
+        expected = self.estimate(model, prompt_tokens, rule.output_tokens) if model else None
+        if expected is None or expected <= rule.latency_budget:
+            return model
+
+        # Over budget: take the quickest faster tier. One whose speed isn't
+        # known yet is assumed to be quicker, as a smaller model should be.
+        best, best_time = model, expected
+        for tier in TIERS[:TIERS.index(rule.tier)]:
+            candidate = self.tiers.get(tier)
+            if not candidate or candidate == model:
+                continue
+            candidate_time = self.estimate(candidate, prompt_tokens, rule.output_tokens)
+            if candidate_time is None:
+                candidate_time = 0.0
+            if candidate_time < best_time:
+                best, best_time = candidate, candidate_time
+        if best != model:
+            self.fallbacks += 1
+            logger.info("%s: %s expected to take %.1fs (budget %.1fs), using %s",
+                        action, model, expected, rule.latency_budget, best)
+        return best
+
+    def describe(self) -> str:
+        """One line per model with its recent speeds"""
+        lines = []
+        with self._lock:
+            for model, speed in self.speeds.items():
+                prompt = f"{speed.prompt_rate:.0f}" if speed.prompt_rate else "?"
+                generation = f"{speed.generation_rate:.1f}" if speed.generation_rate else "?"
+                lines.append(f"{model}: prompt {prompt} tok/s, generation {generation} tok/s")
+        return "\n".join(lines)
+
+    def _smooth(self, current: Optional[float], sample: Optional[float]) -> Optional[float]:
+        if sample is None:
+            return current
+        if current is None:
+            return sample
+        return (1 - self.smoothing) * current + self.smoothing * sample
+
+
+def _rate(count, duration_ns) -> Optional[float]:
+    """Tokens per second from an Ollama count and duration (nanoseconds)"""
+    if not count or not duration_ns:
+        return None
+    return count / (duration_ns / 1e9)
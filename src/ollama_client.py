@@ -0,0 +1,578 @@
+"""
+🔌 Ollama Client
+A long-lived client for the Ollama HTTP API. All AI actions in the app share
+one instance, so requests reuse pooled keep-alive connections instead of
+opening a new TCP connection to the server every time. Transient failures
+are retried, and while the server is down a circuit breaker fails requests
+at once (see resilience.py).
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ai_metrics import MetricsRecorder, get_default_recorder
+from resilience import RETRYABLE_STATUS, CircuitBreaker, RetryPolicy
+from response_cache import ResponseCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# OLLAMA_HOST is the variable the ollama CLI itself honours
+DEFAULT_BASE_URL = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+# (connect, read) timeouts in seconds per endpoint. For streaming requests the
+# read timeout applies between chunks, so it mostly has to cover model load
+# and prompt prefill.
+DEFAULT_TIMEOUTS: Dict[str, tuple] = {
+    "generate": (3.05, 120),
+    "chat": (3.05, 120),
+    "tags": (3.05, 5),
+    "ps": (3.05, 5),
+    "embed": (3.05, 30),
+}
+
+
+class CancelToken:
+    """Cancellation flag for one request; cancelling closes its HTTP stream.
+
+    Closing the connection is what makes Ollama stop generating, so the
+    token keeps a reference to the open streaming response.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._response = None
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """Mark the request cancelled and close its connection (any thread)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            response, self._response = self._response, None
+            callbacks, self._callbacks = self._callbacks, []
+        if response is not None:
+            response.close()
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Call callback on cancel (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def attach(self, response):
+        """Register the open response so cancel() can close it"""
+        with self._lock:
+            if not self._event.is_set():
+                self._response = response
+                return
+        response.close()
+
+    def detach(self):
+        with self._lock:
+            self._response = None
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to timeout seconds; returns True early if cancelled"""
+        return self._event.wait(timeout)
+
+
+def cancelled_result() -> Dict:
+    """Result dict for a request that was cancelled or superseded"""
+    return {"error": "Cancelled", "cancelled": True}
+
+
+def circuit_open_result() -> Dict:
+    """Result dict for a request refused because the backend is known to be down"""
+    return {"error": "Ollama is unreachable; retrying in the background.", "circuit_open": True}
+
+
+class _Flight:
+    """One in-flight request shared by every caller that asked for it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.chunks: List[str] = []
+        self.waiters: Dict[int, tuple] = {}
+        self.next_waiter = 0
+        self.token = CancelToken()
+        self.result: Optional[Dict] = None
+
+    def subscribe(self, on_chunk) -> tuple:
+        """Add a waiter, replaying the text streamed so far; returns (id, wake event)"""
+        wake = threading.Event()
+        with self.lock:
+            waiter_id = self.next_waiter
+            self.next_waiter += 1
+            self.waiters[waiter_id] = (on_chunk, wake)
+            if on_chunk is not None:
+                for text in self.chunks:
+                    on_chunk(text)
+        return waiter_id, wake
+
+    def unsubscribe(self, waiter_id: int):
+        """Remove a cancelled waiter; the request is cancelled once nobody waits"""
+        with self.lock:
+            waiter = self.waiters.pop(waiter_id, None)
+            nobody_left = not self.waiters and self.result is None
+        if waiter is not None:
+            waiter[1].set()
+        if nobody_left:
+            self.token.cancel()
+
+    def broadcast(self, text: str):
+        # Called under the lock so late subscribers see chunks in order
+        with self.lock:
+            self.chunks.append(text)
+            for on_chunk, _wake in self.waiters.values():
+                if on_chunk is not None:
+                    on_chunk(text)
+
+    def finish(self, result: Dict):
+        with self.lock:
+            self.result = result
+            waiters = list(self.waiters.values())
+        for _on_chunk, wake in waiters:
+            wake.set()
+
+
+class SingleFlight:
+    """Coalesces identical concurrent requests into one underlying call.
+
+    The first caller for a key starts the call on its own thread; callers
+    arriving while it is in flight get the text streamed so far, then every
+    later chunk, and the same final result. A caller that cancels gets a
+    cancelled result straight away, and the call is only cancelled when every
+    caller waiting on it has cancelled.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def do(self, key: str, call: Callable[..., Dict],
+           on_chunk: Optional[Callable[[str], None]] = None,
+           cancel_token: Optional[CancelToken] = None) -> Dict:
+        """Run call(on_chunk=..., cancel_token=...) once per key among concurrent callers"""
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None or flight.token.cancelled
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+            waiter_id, wake = flight.subscribe(on_chunk)
+        if is_leader:
+            threading.Thread(target=self._run, args=(key, flight, call),
+                             name="ai-single-flight", daemon=True).start()
+        if cancel_token is not None:
+            cancel_token.add_callback(lambda: flight.unsubscribe(waiter_id))
+
+        # Wakes on the result or, for this caller only, on cancellation
+        wake.wait()
+
+        if (cancel_token is not None and cancel_token.cancelled) or flight.result is None:
+            return cancelled_result()
+        result = dict(flight.result)
+        if not is_leader:
+            result["shared"] = True
+        return result
+
+    def _run(self, key: str, flight: _Flight, call: Callable[..., Dict]):
+        try:
+            result = call(on_chunk=flight.broadcast, cancel_token=flight.token)
+        except Exception as e:
+            logger.exception("Shared AI request failed")
+            result = {"error": f"Unexpected error: {e}"}
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+        flight.finish(result)
+
+    def in_flight(self) -> int:
+        """Number of distinct requests currently running"""
+        with self._lock:
+            return len(self._flights)
+
+
+class OllamaClient:
+    """Ollama API client backed by a pooled, keep-alive requests.Session"""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL,
+                 timeouts: Optional[Dict[str, tuple]] = None,
+                 pool_size: int = 8,
+                 cache: Optional[ResponseCache] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 metrics: Optional[MetricsRecorder] = None):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.metrics = metrics
+        self.retry = retry or RetryPolicy()
+        self.breaker = CircuitBreaker(self._probe)
+        self.single_flight = SingleFlight()
+        self.observers: List[Callable[[str, Dict], None]] = []
+        self.stream_listeners: List[Callable[[str, str], None]] = []
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, prompt: str, model: str, options: Optional[Dict] = None,
+                 on_chunk: Optional[Callable[[str], None]] = None,
+                 cancel_token: Optional[CancelToken] = None, action: str = "generate",
+                 cacheable: Optional[bool] = None, **params) -> Dict:
+        """Call /api/generate; streams text to on_chunk when given.
+
+        Returns Ollama's response dict (in streaming mode the final chunk with
+        "response" set to the full text) or an {"error": ...} dict. With a
+        cache attached, cacheable calls (by default those at temperature 0,
+        whose answer doesn't change) are looked up and their complete answers
+        stored; a hit is returned with "cached": True and its text is passed
+        to on_chunk in one piece. Cancelling cancel_token closes the
+        stream and returns cancelled_result(). Identical concurrent calls
+        share one request; the extra callers get results with "shared": True.
+        With a metrics recorder attached, the call is recorded under action.
+        """
+        if cacheable is None:
+            cacheable = (options or {}).get("temperature") == 0
+        return self._measured(action, model, on_chunk, lambda on_chunk: self._generate(
+            prompt, model, options, on_chunk, cancel_token, cacheable, **params))
+
+    def _generate(self, prompt: str, model: str, options: Optional[Dict],
+                  on_chunk: Optional[Callable[[str], None]],
+                  cancel_token: Optional[CancelToken], cacheable: bool, **params) -> Dict:
+        key = make_cache_key(model, prompt, options, **params)
+        cache = self.cache if cacheable else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                if on_chunk is not None and cached.get("response"):
+                    on_chunk(cached["response"])
+                cached["cached"] = True
+                return cached
+
+        payload = {"model": model, "prompt": prompt, "stream": on_chunk is not None}
+        if options:
+            payload["options"] = options
+        payload.update(params)
+
+        def call(on_chunk, cancel_token):
+            on_chunk = self._streaming(model, on_chunk)
+            result = self._post("generate", payload, on_chunk, "response", cancel_token)
+            self._notify(model, result)
+            # Only a complete answer is stored; a stream cut short ends without "done"
+            if cache is not None and "error" not in result and result.get("done"):
+                # The context token array is large and only useful to the live session
+                cache.put(key, {k: v for k, v in result.items() if k != "context"})
+            return result
+
+        # The shared request always streams, so callers joining late still get text as it arrives
+        return self.single_flight.do("generate:" + key, call, on_chunk, cancel_token)
+
+    def chat(self, messages: List[Dict], model: str, options: Optional[Dict] = None,
+             on_chunk: Optional[Callable[[str], None]] = None,
+             cancel_token: Optional[CancelToken] = None, action: str = "chat",
+             **params) -> Dict:
+        """Call /api/chat; streams the assistant message content to on_chunk when given"""
+        return self._measured(action, model, on_chunk, lambda on_chunk: self._chat(
+            messages, model, options, on_chunk, cancel_token, **params))
+
+    def _chat(self, messages: List[Dict], model: str, options: Optional[Dict],
+              on_chunk: Optional[Callable[[str], None]],
+              cancel_token: Optional[CancelToken], **params) -> Dict:
+        payload = {"model": model, "messages": messages, "stream": on_chunk is not None}
+        if options:
+            payload["options"] = options
+        payload.update(params)
+        key = make_cache_key(model, json.dumps(messages, sort_keys=True), options, **params)
+
+        def call(on_chunk, cancel_token):
+            on_chunk = self._streaming(model, on_chunk)
+            result = self._post("chat", payload, on_chunk, "message", cancel_token)
+            self._notify(model, result)
+            return result
+
+        return self.single_flight.do("chat:" + key, call, on_chunk, cancel_token)
+
+    def _measured(self, action: str, model: str, on_chunk: Optional[Callable[[str], None]],
+                  run: Callable[[Optional[Callable[[str], None]]], Dict]) -> Dict:
+        """Run run(on_chunk), recording its timings and outcome in self.metrics"""
+        if self.metrics is None:
+            return run(on_chunk)
+        started = time.perf_counter()
+        first_token: List[float] = []
+
+        def timed_chunk(text: str):
+            if not first_token:
+                first_token.append(time.perf_counter())
+            on_chunk(text)
+
+        result = run(timed_chunk if on_chunk is not None else None)
+        try:
+            self.metrics.record_result(action, model, result, started,
+                                       first_token[0] if first_token else None)
+        except Exception:
+            logger.exception("Recording request metrics failed")
+        return result
+
+    def add_observer(self, observer: Callable[[str, Dict], None]):
+        """Call observer(model, result) after every completed generate/chat request.
+
+        Observers run on the requesting thread and see each backend request
+        once: cache hits and callers sharing a request are not reported.
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer: Callable[[str, Dict], None]):
+        # A new list, so a request notifying on another thread isn't disturbed
+        self.observers = [o for o in self.observers if o != observer]
+
+    def _notify(self, model: str, result: Dict):
+        if "error" in result:
+            return
+        for observer in self.observers:
+            try:
+                observer(model, result)
+            except Exception:
+                logger.exception("Request observer failed")
+
+    def add_stream_listener(self, listener: Callable[[str, str], None]):
+        """Call listener(model, text) for every chunk streamed by the backend.
+
+        Listeners run on the requesting thread, once per chunk the server
+        sends: cache hits and callers sharing a request are not reported.
+        """
+        self.stream_listeners.append(listener)
+
+    def remove_stream_listener(self, listener: Callable[[str, str], None]):
+        self.stream_listeners = [l for l in self.stream_listeners if l != listener]
+
+    def _streaming(self, model: str, on_chunk: Callable[[str], None]) -> Callable[[str], None]:
+        """Wrap on_chunk so stream listeners see every chunk"""
+        if not self.stream_listeners:
+            return on_chunk
+
+        def notify(text: str):
+            for listener in self.stream_listeners:
+                try:
+                    listener(model, text)
+                except Exception:
+                    logger.exception("Stream listener failed")
+            on_chunk(text)
+        return notify
+
+    def tags(self) -> Dict:
+        """Call /api/tags to list the locally available models"""
+        return self._get("tags")
+
+    def running_models(self) -> Dict:
+        """Call /api/ps to list the models currently loaded in memory"""
+        return self._get("ps")
+
+    def _get(self, endpoint: str) -> Dict:
+        try:
+            response = self._send("get", endpoint)
+            if isinstance(response, dict):
+                return response
+            return response.json()
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            return {"error": describe_error(e)}
+
+    def load_model(self, model: str, keep_alive="10m") -> Dict:
+        """Load a model into memory and keep it there for keep_alive.
+
+        A /api/generate call without a prompt only loads the model, so the
+        next real request doesn't pay the load time.
+        """
+        return self._post("generate", {"model": model, "keep_alive": keep_alive, "stream": False}, None)
+
+    def unload_model(self, model: str) -> Dict:
+        """Ask Ollama to unload a model now, freeing its memory"""
+        return self.load_model(model, keep_alive=0)
+
+    def embed(self, inputs: List[str], model: str) -> Dict:
+        """Call /api/embed for a batch of inputs"""
+        return self._post("embed", {"model": model, "input": inputs}, None)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.breaker.stop()
+        self.session.close()
+
+    def _probe(self) -> bool:
+        """Whether the server answers; used by the circuit breaker while it is open"""
+        try:
+            return self.session.get(f"{self.base_url}/api/tags", timeout=self.timeouts["tags"]).ok
+        except requests.exceptions.RequestException:
+            return False
+
+    def _send(self, method: str, endpoint: str, cancel_token: Optional[CancelToken] = None, **kwargs):
+        """Send a request to /api/<endpoint>, retrying transient failures.
+
+        Returns the response (status already checked) or, when the circuit
+        is open or the request was cancelled while backing off, a result
+        dict. Connection failures count towards opening the circuit; retries
+        stop as soon as it opens. Other errors are raised.
+        """
+        if not self.breaker.allow():
+            return circuit_open_result()
+        url = f"{self.base_url}/api/{endpoint}"
+        attempt = 1
+        while True:
+            try:
+                response = self.session.request(method, url, timeout=self.timeouts[endpoint], **kwargs)
+            except requests.exceptions.ConnectionError:
+                # Includes connect timeouts; read timeouts are not retried
+                if cancel_token is not None and cancel_token.cancelled:
+                    return cancelled_result()
+                self.breaker.record_failure()
+                if attempt >= self.retry.max_attempts or self.breaker.state == CircuitBreaker.OPEN:
+                    raise
+            else:
+                self.breaker.record_success()
+                if response.status_code not in RETRYABLE_STATUS or attempt >= self.retry.max_attempts:
+                    response.raise_for_status()
+                    return response
+                response.close()
+            delay = self.retry.delay(attempt)
+            logger.info("Ollama %s attempt %d failed, retrying in %.2fs", endpoint, attempt, delay)
+            if cancel_token is not None:
+                if cancel_token.wait(delay):
+                    return cancelled_result()
+            else:
+                time.sleep(delay)
+            attempt += 1
+
+    def _post(self, endpoint: str, payload: Dict, on_chunk, text_key: str = "response",
+              cancel_token: Optional[CancelToken] = None) -> Dict:
+        """POST to /api/<endpoint>, reading an NDJSON stream when on_chunk is given.
+
+        Cancellable requests are always streamed: only an open stream can be
+        closed mid-generation.
+        """
+        if cancel_token is not None:
+            if cancel_token.cancelled:
+                return cancelled_result()
+            if on_chunk is None:
+                on_chunk = lambda text: None
+        stream = on_chunk is not None
+        if "stream" in payload:
+            payload["stream"] = stream
+        try:
+            response = self._send("post", endpoint, cancel_token, json=payload, stream=stream)
+            if isinstance(response, dict):
+                return response
+            if not stream:
+                return response.json()
+            if cancel_token is None:
+                with response:
+                    return read_ollama_stream(response, on_chunk, text_key)
+            cancel_token.attach(response)
+            try:
+                result = read_ollama_stream(response, on_chunk, text_key, cancel_token)
+            finally:
+                cancel_token.detach()
+                response.close()
+            return cancelled_result() if cancel_token.cancelled else result
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                return cancelled_result()
+            return {"error": describe_error(e)}
+        except Exception:
+            # Closing the response from another thread can surface as almost any
+            # error inside urllib3; only swallow it if that is what happened
+            if cancel_token is not None and cancel_token.cancelled:
+                return cancelled_result()
+            raise
+
+
+def read_ollama_stream(response, on_chunk: Callable[[str], None], text_key: str = "response",
+                       cancel_token: Optional[CancelToken] = None) -> Dict:
+    """Read an NDJSON streaming response, calling on_chunk for every piece of text.
+
+    Ollama sends one JSON object per line; joining the text of every chunk
+    gives exactly the text of the non-streaming call. The last chunk has
+    "done": true and carries the timings (and "context" for /api/generate).
+    Returns that final chunk with the text field replaced by the full text.
+    The body is read to the end, so the connection goes back to the pool.
+    """
+    parts = []
+    final_chunk: Dict = {}
+    lines = response.iter_lines()
+    for line in lines:
+        if cancel_token is not None and cancel_token.cancelled:
+            return cancelled_result()
+        if not line:
+            continue  # Skip keep-alive blank lines
+        chunk = json.loads(line)
+        if "error" in chunk:
+            return {"error": f"Ollama Error: {chunk['error']}"}
+        text = chunk.get(text_key, "")
+        if isinstance(text, dict):  # /api/chat wraps the text in a message
+            text = text.get("content", "")
+        if text:
+            parts.append(text)
+            on_chunk(text)
+        if chunk.get("done"):
+            final_chunk = chunk
+            # Consume the chunked terminator; stopping here leaves the connection unusable
+            for _ in lines:
+                pass
+            break
+    full_text = "".join(parts)
+    if text_key == "message":
+        final_chunk["message"] = {"role": "assistant", "content": full_text}
+    else:
+        final_chunk[text_key] = full_text
+    return final_chunk
+
+
+def describe_error(error: Exception) -> str:
+    """User-facing description of a failed Ollama request"""
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "Connection Error: Could not connect to Ollama. Is it running?"
+    if isinstance(error, requests.exceptions.Timeout):
+        return "Timeout: The request to Ollama timed out."
+    if isinstance(error, requests.exceptions.HTTPError):
+        return f"HTTP Error: {error.response.status_code} - {error.response.text}"
+    if isinstance(error, json.JSONDecodeError):
+        return "JSON Decode Error: Failed to parse Ollama's response."
+    return f"Request Exception: An unexpected error occurred: {error}"
+
+
+_default_client: Optional[OllamaClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> OllamaClient:
+    """The shared client used by every AI action in the app"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = OllamaClient(cache=ResponseCache(), metrics=get_default_recorder())
+        return _default_client
+
+
+def set_default_client(client: OllamaClient):
+    """Replace the shared client (benchmarks, tests, custom hosts)"""
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
@@ -33,8 +33,9 @@
 #
 # 2. Ollama API URL (Optional):
 #    - If your Ollama instance is running on a different host or port, you'll need to
-#      update the `ollama_api_url` variable inside the `send_code_to_ollama` function.
-#      Default: `ollama_api_url = "http://localhost:11434/api/generate"`
+#      set the `OLLAMA_HOST` environment variable (e.g. `OLLAMA_HOST=http://otherhost:11434`)
+#      or update `DEFAULT_BASE_URL` in `ollama_client.py`.
+#      Default: `DEFAULT_BASE_URL = "http://localhost:11434"`
 #
 # --- Running the Script ---
 # Save this file as `main_qt.py` (or any other .py name).
@@ -58,10 +59,14 @@
 
 import sys
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QTextEdit, QPushButton, QHBoxLayout
+from PyQt5.QtGui import QTextCursor
 # If not already there: from PyQt5.QtWidgets import QApplication, QMainWindow
-import requests # For making HTTP requests
 import json     # For handling JSON data
 
+from ai_worker import AIJobExecutor # Runs Ollama requests off the GUI thread
+from ollama_client import get_default_client # Shared, connection-pooling Ollama client
+from prompt_builder import PromptBuilder # Fits the prompt into the model's context window
+
 # --- Explanation of Core PyQt5 Concepts ---
 # QApplication: Manages the GUI application's control flow and main settings.
 #               Every PyQt5 application must have exactly one QApplication instance.
@@ -103,6 +108,11 @@ class CodeEditorWindow(QMainWindow):
         main_layout = QVBoxLayout()
         central_widget.setLayout(main_layout)
 
+        # Worker threads for Ollama requests (see ai_worker.py)
+        self.ai_executor = AIJobExecutor(max_workers=2)
+        # Trims what we send to the model's context window (see prompt_builder.py)
+        self.prompt_builder = PromptBuilder()
+
         self.init_ui(main_layout)
         self.apply_styles() # Call a new method to apply styles
 
@@ -135,6 +145,12 @@ class CodeEditorWindow(QMainWindow):
         self.runButton.clicked.connect(self.on_run_button_clicked) # Connect the signal to the slot
         main_layout.addWidget(self.runButton)
 
+        # Button to stop the running request (closes the stream so Ollama stops generating)
+        self.stopButton = QPushButton("Stop")
+        self.stopButton.setObjectName("stopButton")
+        self.stopButton.clicked.connect(self.on_stop_button_clicked)
+        main_layout.addWidget(self.stopButton)
+
         # --- Explanation of Widget Sizing (Stretch Factors) ---
         # When adding widgets to a QVBoxLayout (or QHBoxLayout), the second argument to addWidget (e.g., 1 in main_layout.addWidget(self.codeInput, 1))
         # is a stretch factor. Widgets with higher stretch factors will expand more to fill available space compared to those with lower or zero stretch factors.
@@ -156,7 +172,7 @@ class CodeEditorWindow(QMainWindow):
                 font-size: 14px;
                 padding: 5px;
             }
-            QPushButton#runButton {
+            QPushButton#runButton, QPushButton#stopButton {
                 background-color: #007bff;
                 color: white;
                 border: none;
@@ -164,10 +180,10 @@ class CodeEditorWindow(QMainWindow):
                 border-radius: 4px;
                 font-size: 14px;
             }
-            QPushButton#runButton:hover {
+            QPushButton#runButton:hover, QPushButton#stopButton:hover {
                 background-color: #0056b3;
             }
-            QPushButton#runButton:pressed {
+            QPushButton#runButton:pressed, QPushButton#stopButton:pressed {
                 background-color: #004085;
             }
         """
@@ -183,34 +199,80 @@ class CodeEditorWindow(QMainWindow):
             self.outputArea.setText("Please enter some code.")
             return
 
-        # Show some feedback that it's working
-        self.outputArea.setText("Sending to Ollama... Please wait.")
-        QApplication.processEvents() # Allow UI to update
+        # Long files don't fit in the model's context window (num_ctx); Ollama would silently drop
+        # the start of the prompt. Instead we send the selection (if any) plus as many of the
+        # surrounding lines as fit, or a window of lines around the cursor.
+        cursor = self.codeInput.textCursor()
+        selection = (cursor.selectionStart(), cursor.selectionEnd()) if cursor.hasSelection() else None
+        built = self.prompt_builder.build(code_to_send, cursor.position(), selection)
+
+        # Show some feedback that it's working, including how much of the context window is used
+        self.outputArea.setText(f"Sending to Ollama ({built.summary()})... Please wait.")
 
+        # Tokens are appended as they arrive; the placeholder is cleared by the first one
+        self._stream_started = False
+
+        # The request runs on a worker thread so the window keeps repainting and accepting input.
+        # Streamed text and the final result come back to this (GUI) thread through Qt signals.
         # IMPORTANT: Remind user they might need to change the model name here or pass it from a UI element eventually
         # For example, model_name = self.modelSelector.currentText() if you add a QComboBox for model selection.
-        ollama_response = send_code_to_ollama(code_to_send, model_name="your-ollama-coding-model-name") # Ensure this model name is configured by the user
+        # Clicking Run again while a request is running replaces it: the supersede key makes the
+        # executor cancel the older request, so Ollama doesn't keep generating an answer nobody reads.
+        # Temperature 0 makes the answer depend only on the code, so running unchanged code again
+        # is answered from the response cache in milliseconds.
+        self.ai_executor.submit(
+            send_code_to_ollama, built.prompt,
+            model_name="your-ollama-coding-model-name", # Ensure this model name is configured by the user
+            options={"num_ctx": self.prompt_builder.num_ctx, "temperature": 0},
+            on_chunk=self.append_output_chunk,
+            on_finished=self.on_ollama_response,
+            supersede_key="run"
+        )
+
+    def on_stop_button_clicked(self):
+        """Slot for the stopButton's clicked signal. Cancels any running request."""
+        if self.ai_executor.pending_count():
+            self.ai_executor.cancel_all()
+            self.outputArea.append("\n[Cancelled]")
 
+    def on_ollama_response(self, ollama_response):
+        """Slot called on the GUI thread when the Ollama request has finished."""
+        if ollama_response.get("cancelled"):
+            return # Stopped or replaced by a newer request, which owns the output area now
         if "error" in ollama_response:
             self.outputArea.setText(f"Error: {ollama_response['error']}")
-        elif "response" in ollama_response: # This is the expected key for Ollama's non-streaming response
-            self.outputArea.setText(ollama_response["response"])
+        elif "response" in ollama_response: # Full text, identical to what was streamed
+            self.outputArea.setPlainText(ollama_response["response"])
         else:
             # Fallback for unexpected response structure
             self.outputArea.setText(f"Unexpected response from Ollama: {json.dumps(ollama_response, indent=2)}")
 
+    def append_output_chunk(self, text):
+        """Appends one streamed piece of Ollama's answer to the output area."""
+        if not self._stream_started:
+            self.outputArea.clear()
+            self._stream_started = True
+        self.outputArea.moveCursor(QTextCursor.End)
+        self.outputArea.insertPlainText(text)
+
+    def closeEvent(self, event):
+        """Stops the AI worker threads before the window closes."""
+        self.ai_executor.shutdown()
+        super().closeEvent(event)
+
 
 # --- Explanation of 'requests' library ---
 # The 'requests' library is a popular third-party Python library for making HTTP requests.
 # It simplifies the process of sending GET, POST, etc., requests and handling responses.
 # You'll need to install it if you haven't already: pip install requests
-# Key methods used:
-#   requests.post(url, json=payload): Sends a POST request to the 'url' with 'payload' formatted as JSON.
+# Key methods used (by OllamaClient in ollama_client.py):
+#   requests.Session(): Keeps connections open between requests so they can be reused.
+#   session.post(url, json=payload): Sends a POST request to the 'url' with 'payload' formatted as JSON.
 #   response.raise_for_status(): Checks if the request was successful (status code 2xx). Raises an HTTPError if not.
 #   response.json(): Parses the JSON response content into a Python dictionary.
 # ---
 
-def send_code_to_ollama(code_text, model_name="your-ollama-coding-model-name"):
+def send_code_to_ollama(code_text, model_name="your-ollama-coding-model-name", on_chunk=None, cancel_token=None, options=None):
     """
     Sends the given code_text to the Ollama API and returns the response.
 
@@ -218,36 +280,24 @@ def send_code_to_ollama(code_text, model_name="your-ollama-coding-model-name"):
         code_text (str): The code to send to Ollama.
         model_name (str): The name of the Ollama model to use.
                           **IMPORTANT**: User needs to change this!
+        on_chunk (callable, optional): If given, the request is made in streaming mode and
+                          on_chunk(text) is called with each piece of the completion as soon
+                          as Ollama produces it.
+        cancel_token (CancelToken, optional): Cancelling it closes the HTTP stream, which makes
+                          Ollama stop generating.
+        options (dict, optional): Ollama model options, e.g. {"num_ctx": 4096} for the context size.
 
     Returns:
         dict: The JSON response from Ollama as a dictionary, or an error dictionary.
+              In streaming mode this is the final chunk from Ollama (timings, context, ...)
+              with "response" set to the full concatenated text, so callers get the same
+              shape as in non-streaming mode.
     """
-    # IMPORTANT: Remind the user that this endpoint might need to be changed
-    # if their Ollama instance is not running on the default location.
-    ollama_api_url = "http://localhost:11434/api/generate"
-
-    payload = {
-        "model": model_name,
-        "prompt": code_text,
-        "stream": False  # Keep it simple for now, no streaming
-    }
-
-    try:
-        # Tell the user that they may need to configure proxies if they are behind one
-        response = requests.post(ollama_api_url, json=payload, timeout=20) # Added timeout
-        response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        return {"error": "Connection Error: Could not connect to Ollama. Is it running?"}
-    except requests.exceptions.Timeout:
-        return {"error": "Timeout: The request to Ollama timed out."}
-    except requests.exceptions.HTTPError as e:
-        return {"error": f"HTTP Error: {e.response.status_code} - {e.response.text}"}
-    except requests.exceptions.RequestException as e:
-        # For any other requests-related errors
-        return {"error": f"Request Exception: An unexpected error occurred: {e}"}
-    except json.JSONDecodeError:
-        return {"error": "JSON Decode Error: Failed to parse Ollama's response."}
+    # All requests go through one shared OllamaClient (see ollama_client.py), which keeps a pool
+    # of keep-alive connections. If your Ollama instance is not running on the default location
+    # (http://localhost:11434), set OLLAMA_HOST or change DEFAULT_BASE_URL in ollama_client.py.
+    return get_default_client().generate(code_text, model=model_name, options=options,
+                                        on_chunk=on_chunk, cancel_token=cancel_token)
 
 
 def main():
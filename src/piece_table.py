@@ -0,0 +1,396 @@
+"""
+📜 Piece Table
+A line-oriented piece table for editing files too large for QTextEdit.
+The file is memory-mapped, not read: the index keeps the byte offset of
+every PAGE_LINES-th line, and a page of lines is decoded only when one of
+them is read (the last few pages stay cached). Opening indexes just the
+first screen; scan() finds the rest of the lines on a worker thread.
+Scanning and saving go through the whole map, so they hand the pages back
+to the OS as they go (where madvise exists), and only what was looked at
+stays resident.
+
+Edited lines go to an append-only list, and the document is a list of
+pieces, each a run of lines from the file or from that list, so an edit
+splits at most two pieces. Saving streams the file's byte ranges and the
+edited lines to disk without ever building the whole text.
+"""
+
+import os
+import mmap
+import queue
+import shutil
+import tempfile
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+ORIGINAL, ADDED = 0, 1
+# Lines per index entry and per decoded page
+PAGE_LINES = 256
+PAGE_CACHE_PAGES = 64
+# Indexed on open, before anything is shown: well over a screen of lines
+OPEN_INDEX_BYTES = 1024 * 1024
+SCAN_BLOCK_BYTES = 16 * 1024 * 1024
+# Edited lines written per write() call when saving
+WRITE_BATCH_LINES = 4096
+# Windows can't replace a file while it is mapped
+REPLACE_NEEDS_UNMAP = os.name == "nt"
+
+# (line, column), both 0-based; columns count characters
+Position = Tuple[int, int]
+Piece = Tuple[int, int, int]  # (ORIGINAL or ADDED, first line, line count)
+# Page starts found, lines complete so far, byte offset after them, whether the file is done
+ScannedBlock = Tuple[List[int], int, int, bool]
+
+
+def scan_lines(blocks: Iterable[bytes], lines: int, end: int, size: int) -> Iterator[ScannedBlock]:
+    """Index consecutive blocks of a file, the first starting at byte end, the start of line number lines.
+
+    Yields one ScannedBlock per block; the one for the block reaching size
+    also counts the file's last line (which has no line ending).
+    """
+    offset, done = end, False
+    for block in blocks:
+        starts = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10) + (offset + 1)
+        # Line lines + 1 starts at starts[0]; keep the lines that begin a page
+        page_starts = starts[(-(lines + 1)) % PAGE_LINES::PAGE_LINES].tolist()
+        lines += len(starts)
+        if len(starts):
+            end = int(starts[-1])
+        offset += len(block)
+        done = offset >= size
+        yield page_starts, lines + done, size if done else end, done
+    if not done and offset >= size:
+        yield [], lines + 1, size, True  # Nothing left to read: the last line is empty
+
+
+def map_file(path: str):
+    """A read-only map of the file at path (bytes when it is empty, which can't be mapped)"""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+
+class PieceTable:
+    """Editable text of a large file; data is bytes or an mmap in encoding"""
+
+    def __init__(self, data=b"", encoding: str = "utf-8", index_bytes: Optional[int] = None):
+        """Index the lines of data now, or only of its first index_bytes (see scan)"""
+        self.encoding = encoding
+        self.path: Optional[str] = None  # The mapped file, for open()ed documents
+        # Bumped when save() has to map the saved file in place of the old one,
+        # which invalidates earlier snapshots
+        self.generation = 0
+        self._load(data, index_bytes)
+
+    def _load(self, data, index_bytes: Optional[int]):
+        self.data = data
+        self.page_offsets: List[int] = [0]
+        self.original_lines = 0  # Lines of data indexed so far
+        self.indexed_end = 0  # Byte offset after them
+        self.indexed = False
+        self.added: List[str] = []
+        self.pieces: List[Piece] = []
+        self._starts: List[int] = []
+        self.line_count = 0
+        self.modified = False
+        self._pages: "OrderedDict[int, List[str]]" = OrderedDict()
+        self._scanned: "queue.Queue[ScannedBlock]" = queue.Queue()
+        self.closed = False
+
+        block_size = SCAN_BLOCK_BYTES if index_bytes is None else max(index_bytes, 1)
+        for block in scan_lines(self._blocks(0, block_size), 0, 0, len(data)):
+            self._add_block(block)
+            # With a limit, stop once there is a line to show
+            if index_bytes is not None and self.original_lines:
+                break
+        # Lines joined by edits are written with the file's own line ending
+        first_end = self._line_start(1) if self.original_lines > 1 else 0
+        self.newline = "\r\n" if first_end >= 2 and data[first_end - 2] == 13 else "\n"
+
+    @classmethod
+    def open(cls, path: str, encoding: str = "utf-8") -> "PieceTable":
+        """Map a file and index its first lines; the rest come from scan()"""
+        table = cls(map_file(path), encoding, index_bytes=OPEN_INDEX_BYTES)
+        table.path = os.path.abspath(path)
+        return table
+
+    @classmethod
+    def from_text(cls, text: str) -> "PieceTable":
+        return cls(text.encode("utf-8"))
+
+    def __len__(self) -> int:
+        return self.line_count
+
+    def close(self):
+        """Unmap the file; the document can't be read afterwards"""
+        self.closed = True
+        self._pages.clear()
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def _blocks(self, start: int, size: int) -> Iterator[bytes]:
+        """Copies of consecutive blocks of data from start on, releasing the map behind them"""
+        for offset in range(start, len(self.data), size):
+            if self.closed:
+                return
+            block = self.data[offset:offset + size]
+            self._release(offset, offset + len(block))
+            yield block
+
+    def _release(self, start: int, end: int):
+        """Let the OS drop mapped pages in start..end from this process (they stay in its file cache)"""
+        if isinstance(self.data, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+            start -= start % mmap.PAGESIZE
+            self.data.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    # Indexing
+    def scan(self, on_chunk=None, cancel_token=None) -> Dict:
+        """Find the lines after the indexed ones, for a worker thread.
+
+        The lines are queued rather than added, since the document belongs
+        to the GUI thread: call add_scanned_lines there. on_chunk gets a
+        progress message after each block. It stops, cancelled, once the
+        document is closed.
+        """
+        lines = self.original_lines
+        for block in self._scan_rest():
+            if self.closed or (cancel_token is not None and cancel_token.cancelled):
+                return {"error": "Cancelled", "cancelled": True}
+            self._scanned.put(block)
+            lines = block[1]
+            if on_chunk is not None:
+                on_chunk(f"Indexing lines: {block[2] / max(len(self.data), 1):.0%} ({lines:,} lines)")
+        return {"lines": lines}
+
+    def _scan_rest(self) -> Iterator[ScannedBlock]:
+        if not self.indexed:
+            blocks = self._blocks(self.indexed_end, SCAN_BLOCK_BYTES)
+            yield from scan_lines(blocks, self.original_lines, self.indexed_end, len(self.data))
+
+    def add_scanned_lines(self) -> bool:
+        """Add the lines scan() has found so far; True if there were any"""
+        added = False
+        while True:
+            try:
+                block = self._scanned.get_nowait()
+            except queue.Empty:
+                return added
+            if not self.indexed:  # Else finish_indexing got there first
+                self._add_block(block)
+                added = True
+
+    def finish_indexing(self):
+        """Index the rest of the file on this thread (saving needs every line)"""
+        self.add_scanned_lines()
+        for block in self._scan_rest():
+            self._add_block(block)
+
+    def _add_block(self, block: ScannedBlock):
+        page_starts, lines, end, done = block
+        self.page_offsets.extend(page_starts)
+        old = self.original_lines
+        self._pages.pop(old // PAGE_LINES, None)  # The last page gains lines
+        self.original_lines, self.indexed_end, self.indexed = lines, end, done
+        self._append_original(old)
+
+    def _append_original(self, first: int):
+        """Add the file's lines from first on to the end of the document.
+
+        Lines of the file not indexed yet always come after everything else.
+        """
+        if first == self.original_lines:
+            return
+        if self.pieces and self.pieces[-1][0] == ORIGINAL and sum(self.pieces[-1][1:]) == first:
+            source, start, count = self.pieces.pop()
+            self.pieces.append((source, start, count + self.original_lines - first))
+        else:
+            self.pieces.append((ORIGINAL, first, self.original_lines - first))
+        self._restart()
+        self.line_count += self.original_lines - first
+
+    # Reading
+    def _locate(self, line: int) -> Tuple[int, int]:
+        """Index of the piece holding line, and the line's offset in it"""
+        index = bisect_right(self._starts, line) - 1
+        return index, line - self._starts[index]
+
+    def _page(self, page: int) -> List[str]:
+        """Decoded lines of a page of the file"""
+        lines = self._pages.get(page)
+        if lines is not None:
+            self._pages.move_to_end(page)
+            return lines
+        start = self.page_offsets[page]
+        end = self.page_offsets[page + 1] if page + 1 < len(self.page_offsets) else self.indexed_end
+        parts = self.data[start:end].decode(self.encoding, errors="replace").split("\n")
+        # Every part but the last was followed by "\n"; the last is "" or the file's unterminated last line
+        lines = [part[:-1] if part.endswith("\r") else part for part in parts[:-1]] + parts[-1:]
+        lines = lines[:min(PAGE_LINES, self.original_lines - page * PAGE_LINES)]
+        self._pages[page] = lines
+        if len(self._pages) > PAGE_CACHE_PAGES:
+            self._pages.popitem(last=False)
+        return lines
+
+    def _line_start(self, line: int) -> int:
+        """Byte offset where an indexed line of the file starts (indexed_end for the one after them)"""
+        if line >= self.original_lines:
+            return self.indexed_end
+        position = self.page_offsets[line // PAGE_LINES]
+        for _ in range(line % PAGE_LINES):
+            position = self.data.find(b"\n", position) + 1
+        return position
+
+    def _content_end(self, line: int) -> int:
+        """Byte offset where a line of the file ends, before its line ending"""
+        start, end = self._line_start(line), self._line_start(line + 1)
+        if end > start and self.data[end - 1] == 10:
+            end -= 1
+            if end > start and self.data[end - 1] == 13:
+                end -= 1
+        return end
+
+    def line(self, line: int) -> str:
+        """Text of a 0-based line, without its line ending"""
+        index, offset = self._locate(line)
+        source, first, _count = self.pieces[index]
+        if source == ADDED:
+            return self.added[first + offset]
+        return self._page((first + offset) // PAGE_LINES)[(first + offset) % PAGE_LINES]
+
+    def lines(self, first: int, last: int) -> Iterator[str]:
+        """Text of lines first..last-1"""
+        for line in range(max(first, 0), min(last, self.line_count)):
+            yield self.line(line)
+
+    def text(self, start: Position, end: Position) -> str:
+        """Text between two positions, lines joined by "\\n" """
+        (first, first_column), (last, last_column) = start, end
+        if first == last:
+            return self.line(first)[first_column:last_column]
+        lines = list(self.lines(first, last + 1))
+        lines[0] = lines[0][first_column:]
+        lines[-1] = lines[-1][:last_column]
+        return "\n".join(lines)
+
+    # Editing
+    def replace(self, start: Position, end: Position, text: str) -> Position:
+        """Replace the text between two positions; returns the position after the new text"""
+        (first, first_column), (last, last_column) = start, end
+        head = self.line(first)[:first_column]
+        tail = self.line(last)[last_column:]
+        new_lines = (head + text.replace("\r\n", "\n").replace("\r", "\n") + tail).split("\n")
+        self.replace_lines(first, last + 1, new_lines)
+        return first + len(new_lines) - 1, len(new_lines[-1]) - len(tail)
+
+    def insert(self, position: Position, text: str) -> Position:
+        return self.replace(position, position, text)
+
+    def replace_lines(self, first: int, last: int, new_lines: List[str]):
+        """Replace lines first..last-1 with new_lines"""
+        if not new_lines and first == 0 and last >= self.line_count:
+            new_lines = [""]  # A document always has a line
+        start = len(self.added)
+        self.added.extend(new_lines)
+        before = self._split(first)
+        after = self._split(last)
+        replacement = [(ADDED, start, len(new_lines))] if new_lines else []
+        # Typing line after line appends to the same run of added lines
+        if replacement and before > 0:
+            source, previous_first, count = self.pieces[before - 1]
+            if source == ADDED and previous_first + count == start:
+                before -= 1
+                replacement = [(ADDED, previous_first, count + len(new_lines))]
+        self.pieces[before:after] = replacement
+        self._restart()
+        self.line_count += len(new_lines) - (last - first)
+        self.modified = True
+
+    def _split(self, line: int) -> int:
+        """Index of the piece starting at line, splitting the piece that holds it if needed"""
+        if line >= self.line_count:
+            return len(self.pieces)
+        index, offset = self._locate(line)
+        if offset == 0:
+            return index
+        source, first, count = self.pieces[index]
+        self.pieces[index:index + 1] = [(source, first, offset), (source, first + offset, count - offset)]
+        self._starts.insert(index + 1, line)
+        return index + 1
+
+    def _restart(self):
+        """Recompute the first line of each piece"""
+        self._starts = [0] + list(accumulate(count for _source, _first, count in self.pieces))[:-1]
+
+    def snapshot(self) -> Tuple[Tuple[Piece, ...], int, int]:
+        """State to restore on undo; pieces only point into buffers that never change"""
+        return tuple(self.pieces), self.line_count, self.original_lines
+
+    def restore(self, snapshot: Tuple[Tuple[Piece, ...], int, int]):
+        """Go back to a snapshot, keeping the lines indexed since it was taken"""
+        pieces, self.line_count, original_lines = snapshot
+        self.pieces = list(pieces)
+        self._restart()
+        self._append_original(original_lines)
+        self.modified = True
+
+    # Saving
+    def write(self, f: BinaryIO):
+        """Stream the document to a binary file: the file's byte ranges as they are, edited lines encoded"""
+        self.finish_indexing()
+        newline = self.newline.encode(self.encoding)
+        view = memoryview(self.data)
+        for index, (source, first, count) in enumerate(self.pieces):
+            if index:
+                f.write(newline)
+            if source == ORIGINAL:
+                start, end = self._line_start(first), self._content_end(first + count - 1)
+                for offset in range(start, end, SCAN_BLOCK_BYTES):
+                    f.write(view[offset:min(offset + SCAN_BLOCK_BYTES, end)])
+                    self._release(offset, min(offset + SCAN_BLOCK_BYTES, end))
+                continue
+            for batch in range(first, first + count, WRITE_BATCH_LINES):
+                if batch > first:
+                    f.write(newline)
+                lines = self.added[batch:min(batch + WRITE_BATCH_LINES, first + count)]
+                f.write(newline.join(line.encode(self.encoding) for line in lines))
+        view.release()
+
+    def save(self, path: str):
+        """Write the document to path through a temporary file, so the file is never half written"""
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temporary = tempfile.mkstemp(dir=directory, prefix=".save-")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                self.write(f)
+            if os.path.exists(path):
+                shutil.copymode(path, temporary)
+            if REPLACE_NEEDS_UNMAP and os.path.abspath(path) == self.path:
+                self._replace_mapped(temporary)
+            else:
+                os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+        self.modified = False
+
+    def _replace_mapped(self, temporary: str):
+        """Unmap the file, replace it with temporary, then map and index the saved file.
+
+        The saved file holds the document's text, so it becomes the whole
+        document again; if the replace fails the old file is mapped back
+        and the edits stay as they were.
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        try:
+            os.replace(temporary, self.path)
+        except BaseException:
+            self.data = map_file(self.path)
+            self._pages.clear()
+            raise
+        self._load(map_file(self.path), None)
+        self.generation += 1
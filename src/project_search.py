@@ -0,0 +1,124 @@
+"""
+🔎 Project Search
+A search panel over the project's LexicalIndex: results update as you type
+and activating one asks the editor to open that file at the chunk's first
+line. Queries run on a worker, since indexing holds the index's lock for
+whole bulk writes and a search must wait for it without freezing the window.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from PyQt5.QtWidgets import QDialog, QLabel, QLineEdit, QListWidget, QListWidgetItem, QVBoxLayout
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal
+
+from ai_worker import AIJob, AIJobExecutor
+from embedding_index import SearchHit
+from lexical_index import LexicalIndex
+
+MAX_RESULTS = 50
+# Wait for a pause in typing before searching
+SEARCH_DELAY_MS = 120
+
+
+def preview(hit: SearchHit) -> str:
+    """The first non-blank line of a hit, for the result list"""
+    for line in hit.chunk.text.splitlines():
+        if line.strip():
+            return line.strip()
+    return ""
+
+
+def run_search(index: LexicalIndex, query: str, on_chunk=None, cancel_token=None) -> Dict:
+    """Executor job: the top hits for query and the index size"""
+    return {"hits": index.search(query, k=MAX_RESULTS), "chunks": len(index)}
+
+
+class ProjectSearchDialog(QDialog):
+    """Search-as-you-type over project code chunks"""
+
+    # Absolute path and 1-based line of the chosen result
+    location_selected = pyqtSignal(str, int)
+
+    def __init__(self, executor: AIJobExecutor, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        self.index: Optional[LexicalIndex] = None
+        self.search_job: Optional[AIJob] = None
+        self.hits: List[SearchHit] = []
+        self.setWindowTitle("🔎 Search Project")
+        self.resize(640, 420)
+
+        layout = QVBoxLayout(self)
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Identifiers or words, e.g. \"retry timeout\" or getDefaultClient")
+        layout.addWidget(self.query_edit)
+        self.results = QListWidget()
+        layout.addWidget(self.results)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.search)
+        self.query_edit.textChanged.connect(self.search_timer.start)
+        self.query_edit.returnPressed.connect(self.open_current)
+        self.results.itemActivated.connect(self.open_current)
+        self.set_index(None)
+
+    def set_index(self, index: Optional[LexicalIndex]):
+        """Search index (None while no project is open)"""
+        if self.search_job is not None:
+            self.search_job.cancel()  # Its results are from the old index
+        self.index = index
+        self.query_edit.setEnabled(index is not None)
+        if index is None:
+            self.summary_label.setText("Open a file in a project to search it")
+        else:
+            self.search()
+
+    def search(self):
+        query = self.query_edit.text()
+        if self.index is None or not query.strip():
+            if self.search_job is not None:
+                self.search_job.cancel()  # Its results are for an older query
+            self.show_results({"hits": [], "chunks": 0}, "")
+            return
+        self.summary_label.setText("Indexing... results follow when it finishes" if self.index.busy() else "Searching...")
+        self.search_job = self.executor.submit(
+            run_search, self.index, query,
+            on_finished=lambda result: self.show_results(result, query),
+            supersede_key="search"
+        )
+
+    def show_results(self, result: Dict, query: str):
+        if result.get("cancelled"):
+            return
+        self.results.clear()
+        self.hits = result.get("hits", [])
+        if not query:
+            self.summary_label.setText("")
+            return
+        for hit in self.hits:
+            item = QListWidgetItem(f"{hit.chunk.label}    {preview(hit)}")
+            item.setToolTip(hit.chunk.text[:2000])
+            self.results.addItem(item)
+        if self.hits:
+            self.results.setCurrentRow(0)
+        self.summary_label.setText(f"{len(self.hits)} results in {result['chunks']} chunks")
+
+    def open_current(self, *args):
+        row = self.results.currentRow()
+        root = self.index.root if self.index is not None else None
+        if root is None or not 0 <= row < len(self.hits):
+            return
+        chunk = self.hits[row].chunk
+        self.location_selected.emit(os.path.join(root, chunk.path), chunk.start_line)
+
+    def keyPressEvent(self, event):
+        # Arrow keys move through the results while typing in the query
+        if event.key() in (Qt.Key_Up, Qt.Key_Down) and self.query_edit.hasFocus():
+            self.results.keyPressEvent(event)
+            return
+        super().keyPressEvent(event)
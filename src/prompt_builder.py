@@ -0,0 +1,244 @@
+"""
+📏 Prompt Builder
+Assembles AI prompts that fit the model's context window. A fast local
+token estimator (with per-line count caching) measures the editor content,
+and only a window of lines around the cursor or selection is sent, sized to
+the configured num_ctx budget. Each build reports how many tokens every part
+of the prompt used.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_NUM_CTX = 4096
+DEFAULT_RESERVED_OUTPUT = 512
+
+# Roughly how BPE tokenizers split code: short word pieces, digit groups,
+# single punctuation characters and newlines each cost about one token.
+_TOKEN_PATTERN = re.compile(r"[A-Za-z_]{1,8}|\d{1,3}|[^\sA-Za-z_\d]|\n")
+
+
+class TokenCounter:
+    """Fast approximate token counter with an LRU cache of counts per text chunk"""
+
+    def __init__(self, max_entries: int = 200_000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        # Shared by the GUI thread and the AI workers
+        self._lock = threading.Lock()
+
+    def count(self, text: str, remember: bool = True) -> int:
+        """Estimated token count of text; pass remember=False for one-off large texts"""
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+        tokens = len(_TOKEN_PATTERN.findall(text))
+        if not remember:
+            return tokens
+        with self._lock:
+            self._cache[text] = tokens
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return tokens
+
+
+@dataclass
+class BuiltPrompt:
+    """A prompt trimmed to the budget, with the token usage of each part"""
+    prompt: str
+    usage: Dict[str, int] = field(default_factory=dict)
+    trimmed: bool = False
+
+    def summary(self) -> str:
+        """Short human-readable usage line for status messages"""
+        parts = ", ".join(f"{name} {tokens}" for name, tokens in self.usage.items()
+                          if name not in ("total", "budget") and tokens)
+        text = f"{self.usage.get('total', 0)}/{self.usage.get('budget', 0)} tokens"
+        if parts:
+            text += f" ({parts})"
+        if self.trimmed:
+            text += ", trimmed to fit"
+        return text
+
+
+class PromptBuilder:
+    """Builds prompts from editor content within a num_ctx token budget"""
+
+    def __init__(self, num_ctx: int = DEFAULT_NUM_CTX,
+                 reserved_output: int = DEFAULT_RESERVED_OUTPUT,
+                 counter: Optional[TokenCounter] = None):
+        self.num_ctx = num_ctx
+        self.reserved_output = reserved_output
+        self.counter = counter or TokenCounter()
+
+    @property
+    def budget(self) -> int:
+        """Tokens available for the prompt once room for the answer is reserved"""
+        return max(0, self.num_ctx - self.reserved_output)
+
+    def build(self, text: str, cursor: int = 0,
+              selection: Optional[Tuple[int, int]] = None,
+              instruction: str = "", focus: Optional[Tuple[int, int]] = None) -> BuiltPrompt:
+        """Build a prompt from text around the cursor or selection.
+
+        Without a selection the prompt is the instruction (if any) followed by
+        a contiguous window of lines centred on the cursor line. With a
+        selection (start, end offsets), the selected text is always included,
+        truncated only if it alone exceeds the budget, and the lines before
+        and after it fill whatever budget is left. focus is a range of
+        0-based lines (e.g. the enclosing function) that is taken whole,
+        if it fits, before the window grows line by line.
+        """
+        # Only the lines the window actually visits are counted, so the cost
+        # depends on the budget rather than on the size of the document
+        lines = _split_lines(text)
+        line_tokens = lambda index: self.counter.count(lines[index])
+        budget = self.budget
+
+        if selection is None:
+            header = f"{instruction}\n\n" if instruction else ""
+            header_tokens = self.counter.count(header)
+            anchor = text.count("\n", 0, cursor)
+            anchor_text, anchor_tokens, trimmed = self._fit(lines[anchor], budget - header_tokens)
+            first, last, added = _expand_around(line_tokens, len(lines), anchor, anchor,
+                                                budget - header_tokens - anchor_tokens, focus)
+            prompt = header + "".join(lines[first:anchor]) + anchor_text + "".join(lines[anchor + 1:last + 1])
+            usage = {"instruction": header_tokens, "context": anchor_tokens + added}
+            trimmed = trimmed or first > 0 or last < len(lines) - 1
+        else:
+            start, end = sorted(selection)
+            selected = text[start:end]
+            header = f"{instruction}\n\n" if instruction else ""
+            header_tokens = self.counter.count(header)
+            selected, selection_tokens, trimmed = self._fit(selected, budget - header_tokens)
+
+            first_line = text.count("\n", 0, start)
+            last_line = first_line + text.count("\n", start, max(start, end - 1))
+            remaining = budget - header_tokens - selection_tokens
+            before: List[str] = []
+            after: List[str] = []
+            context_tokens = 0
+            if remaining > 0:
+                # Reserve room for the section labels before filling them
+                labels_tokens = self.counter.count(_BEFORE_LABEL + _AFTER_LABEL)
+                first, last, context_tokens = _expand_around(
+                    line_tokens, len(lines), first_line, last_line, remaining - labels_tokens, focus
+                )
+                before = lines[first:first_line]
+                after = lines[last_line + 1:last + 1]
+                trimmed = trimmed or first > 0 or last < len(lines) - 1
+            prompt = header + selected
+            if before:
+                prompt += _BEFORE_LABEL + "".join(before)
+            if after:
+                prompt += _AFTER_LABEL + "".join(after)
+            labels = (_BEFORE_LABEL if before else "") + (_AFTER_LABEL if after else "")
+            usage = {
+                "instruction": header_tokens + self.counter.count(labels),
+                "selection": selection_tokens,
+                "context": context_tokens,
+            }
+
+        usage["total"] = sum(usage.values())
+        usage["budget"] = budget
+        return BuiltPrompt(prompt, usage, trimmed)
+
+    def build_fim(self, text: str, cursor: int, suffix_share: float = 0.25) -> Tuple[str, str]:
+        """Split text at the cursor into a fill-in-the-middle (prefix, suffix) pair.
+
+        The prefix keeps the lines closest to the cursor within the budget
+        left after suffix_share of it goes to the code after the cursor.
+        """
+        lines = _split_lines(text)
+        anchor = text.count("\n", 0, cursor)
+        column = cursor - (text.rfind("\n", 0, cursor) + 1)
+        head, tail = lines[anchor][:column], lines[anchor][column:]
+
+        suffix_budget = int(self.budget * suffix_share) - self.counter.count(tail)
+        last = anchor
+        while last + 1 < len(lines) and self.counter.count(lines[last + 1]) <= suffix_budget:
+            last += 1
+            suffix_budget -= self.counter.count(lines[last])
+
+        prefix_budget = self.budget - int(self.budget * suffix_share) - self.counter.count(head)
+        first = anchor
+        while first > 0 and self.counter.count(lines[first - 1]) <= prefix_budget:
+            first -= 1
+            prefix_budget -= self.counter.count(lines[first])
+
+        prefix = "".join(lines[first:anchor]) + head
+        suffix = tail + "".join(lines[anchor + 1:last + 1])
+        return prefix, suffix
+
+    def _fit(self, text: str, budget: int) -> Tuple[str, int, bool]:
+        """Cut text to its leading lines that fit in budget"""
+        tokens = self.counter.count(text, remember=False)
+        if tokens <= budget:
+            return text, tokens, False
+        kept: List[str] = []
+        used = 0
+        for line in text.splitlines(keepends=True):
+            line_tokens = self.counter.count(line)
+            if used + line_tokens > budget:
+                break
+            kept.append(line)
+            used += line_tokens
+        return "".join(kept), used, True
+
+
+_BEFORE_LABEL = "\n\nCode before it in the file:\n"
+_AFTER_LABEL = "\n\nCode after it in the file:\n"
+
+
+def _split_lines(text: str) -> List[str]:
+    """Split on newlines only (matching text.count("\\n")), keeping the line ends"""
+    lines = text.split("\n")
+    for index in range(len(lines) - 1):
+        lines[index] += "\n"
+    return lines
+
+
+def _expand(line_tokens: Callable[[int], int], line_count: int,
+            first: int, last: int, budget: int) -> Tuple[int, int, int]:
+    """Grow the line range [first, last] alternately upwards and downwards.
+
+    Lines are added while their tokens fit in budget. Returns the new range
+    and the tokens of the lines that were added.
+    """
+    used = 0
+    above, below = first - 1, last + 1
+    while above >= 0 or below < line_count:
+        grew = False
+        if above >= 0 and used + line_tokens(above) <= budget:
+            used += line_tokens(above)
+            first = above
+            above -= 1
+            grew = True
+        if below < line_count and used + line_tokens(below) <= budget:
+            used += line_tokens(below)
+            last = below
+            below += 1
+            grew = True
+        if not grew:
+            break
+    return first, last, used
+
+
+def _expand_around(line_tokens: Callable[[int], int], line_count: int, first: int, last: int,
+                   budget: int, focus: Optional[Tuple[int, int]]) -> Tuple[int, int, int]:
+    """_expand, after first taking in the whole focus range if its lines fit in budget"""
+    used = 0
+    if focus is not None:
+        focus_first, focus_last = min(focus[0], first), min(max(focus[1], last), line_count - 1)
+        focus_tokens = sum(line_tokens(i) for i in range(focus_first, first))
+        focus_tokens += sum(line_tokens(i) for i in range(last + 1, focus_last + 1))
+        if focus_tokens <= budget:
+            first, last, used = focus_first, focus_last, focus_tokens
+    first, last, added = _expand(line_tokens, line_count, first, last, budget - used)
+    return first, last, used + added
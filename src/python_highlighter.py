@@ -0,0 +1,119 @@
+"""
+🎨 Python Highlighter
+Syntax highlighting for the code editor, built on QSyntaxHighlighter's
+per-block state. Each line is scanned once, left to right, and ends in a
+state saying whether it leaves a string open: a triple-quoted string, or
+a quoted string continued with a backslash. Qt re-highlights the edited
+line and then the following lines only while their starting state
+changes, so a keystroke normally costs one line, and opening or closing
+a triple quote costs the lines up to where the states agree again.
+"""
+
+import re
+import keyword
+import builtins
+from typing import Dict
+
+from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextCharFormat
+
+# Block states (-1, Qt's "not highlighted yet", counts as NORMAL)
+NORMAL = 0
+IN_TRIPLE_SINGLE = 1
+IN_TRIPLE_DOUBLE = 2
+IN_SINGLE = 3  # A '...' string continued on the next line with a backslash
+IN_DOUBLE = 4
+
+_QUOTES = {IN_TRIPLE_SINGLE: "'''", IN_TRIPLE_DOUBLE: '"""', IN_SINGLE: "'", IN_DOUBLE: '"'}
+_STATES = {quote: state for state, quote in _QUOTES.items()}
+# The rest of a string after its opening quote, up to and including the closing one
+_STRING_ENDS = {
+    state: re.compile(r"(?:\\.|[^\\])*?" + re.escape(quote) if len(quote) == 3
+                      else r"(?:\\.|[^\\" + quote + r"])*" + quote)
+    for state, quote in _QUOTES.items()
+}
+_TOKENS = re.compile(r"""
+    (?P<comment>\#.*)
+  | (?P<string>(?:(?<!\w)[rRbBuUfF]{1,2})?(?:'''|\"\"\"|'|"))
+  | (?P<decorator>@[\w.]+)
+  | (?P<number>\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*\.?[\d_]*(?:[eE][+-]?\d+)?j?|\.\d[\d_]*(?:[eE][+-]?\d+)?j?)\b)
+  | (?P<name>[A-Za-z_]\w*)
+""", re.VERBOSE)
+
+KEYWORDS = frozenset(keyword.kwlist) | frozenset(getattr(keyword, "softkwlist", ()))
+BUILTINS = frozenset(name for name in dir(builtins) if not name.startswith("_")) - KEYWORDS
+
+STYLES = {
+    "keyword": ("#569cd6", True),
+    "builtin": ("#4ec9b0", False),
+    "self": ("#9cdcfe", False),
+    "definition": ("#dcdcaa", False),
+    "string": ("#ce9178", False),
+    "comment": ("#6a9955", False),
+    "number": ("#b5cea8", False),
+    "decorator": ("#c586c0", False),
+}
+
+
+def _format(color: str, bold: bool) -> QTextCharFormat:
+    text_format = QTextCharFormat()
+    text_format.setForeground(QColor(color))
+    if bold:
+        text_format.setFontWeight(QFont.Bold)
+    return text_format
+
+
+class PythonHighlighter(QSyntaxHighlighter):
+    """Highlights Python in a QTextDocument, one line at a time"""
+
+    def __init__(self, document=None):
+        super().__init__(document)
+        self.formats: Dict[str, QTextCharFormat] = {
+            name: _format(color, bold) for name, (color, bold) in STYLES.items()
+        }
+
+    def highlightBlock(self, text: str):
+        state = max(self.previousBlockState(), NORMAL)
+        position = 0
+        if state != NORMAL:
+            position, state = self._string(text, 0, state)
+            self.setFormat(0, position, self.formats["string"])
+        formats = self.formats
+        definition = False  # The name after def/class
+        while state == NORMAL:
+            match = _TOKENS.search(text, position)
+            if match is None:
+                break
+            kind = match.lastgroup
+            start, position = match.span()
+            if kind == "name":
+                word = match.group()
+                if definition:
+                    self.setFormat(start, position - start, formats["definition"])
+                    definition = False
+                elif word in KEYWORDS:
+                    self.setFormat(start, position - start, formats["keyword"])
+                    definition = word in ("def", "class")
+                elif word in ("self", "cls"):
+                    self.setFormat(start, position - start, formats["self"])
+                elif word in BUILTINS:
+                    self.setFormat(start, position - start, formats["builtin"])
+            elif kind == "string":
+                position, state = self._string(text, position, _STATES[match.group().lstrip("rRbBuUfF")])
+                self.setFormat(start, position - start, formats["string"])
+            else:
+                self.setFormat(start, position - start, formats[kind])
+        self.setCurrentBlockState(state)
+
+    @staticmethod
+    def _string(text: str, position: int, state: int):
+        """Where the string open at position ends, and the state after it.
+
+        An unclosed triple-quoted string stays open; a quoted one only if
+        the line ends with a backslash.
+        """
+        match = _STRING_ENDS[state].match(text, position)
+        if match is not None:
+            return match.end(), NORMAL
+        if state in (IN_SINGLE, IN_DOUBLE) and not text.endswith("\\"):
+            state = NORMAL
+        return len(text), state
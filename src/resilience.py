@@ -0,0 +1,125 @@
+"""
+🛡️ Resilience
+Retry and circuit-breaker policies for the Ollama backend. Transient
+failures (a 503 while a model loads, a dropped connection) are retried a
+few times with jittered exponential backoff. Repeated connection failures
+open the circuit: requests then fail at once instead of each waiting for a
+timeout, while a background probe checks the server and closes the circuit
+as soon as it answers again.
+"""
+
+import random
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+# Ollama answers 503 while a model is loading or its queue is full
+RETRYABLE_STATUS = frozenset({429, 502, 503, 504})
+
+
+@dataclass
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff"""
+    max_attempts: int = 3
+    base_delay: float = 0.25
+    max_delay: float = 2.0
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt number attempt (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Fails requests fast while the backend is unreachable.
+
+    After failure_threshold consecutive connection failures the circuit
+    opens and allow() returns False. A daemon thread then calls probe()
+    with growing intervals; the first successful probe closes the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(self, probe: Callable[[], bool], failure_threshold: int = 2,
+                 probe_interval: float = 0.5, max_probe_interval: float = 15.0):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.max_probe_interval = max_probe_interval
+        self.failures = 0
+        self.rejected = 0  # Requests failed fast while open
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listeners: List[Callable[[str], None]] = []
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def add_listener(self, listener: Callable[[str], None]):
+        """Call listener(state) whenever the circuit opens or closes (on any thread)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str], None]):
+        self._listeners = [l for l in self._listeners if l != listener]
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        if self._state == self.CLOSED:
+            return True
+        with self._lock:
+            self.rejected += 1
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+        if self._state == self.OPEN:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            opening = self._state == self.CLOSED and self.failures >= self.failure_threshold
+            if opening:
+                self._state = self.OPEN
+        if opening:
+            logger.warning("Ollama unreachable, failing requests fast until it answers again")
+            self._notify(self.OPEN)
+            threading.Thread(target=self._probe_loop, name="ollama-probe", daemon=True).start()
+
+    def stop(self):
+        """Stop the background probe"""
+        self._stop.set()
+
+    def _probe_loop(self):
+        interval = self.probe_interval
+        while self._state == self.OPEN and not self._stop.wait(interval):
+            try:
+                healthy = self.probe()
+            except Exception:
+                logger.exception("Backend probe failed")
+                healthy = False
+            if healthy:
+                logger.info("Ollama is reachable again")
+                self.record_success()
+                return
+            interval = min(interval * 2, self.max_probe_interval)
+
+    def _set_state(self, state: str):
+        with self._lock:
+            if self._state == state:
+                return
+            self._state = state
+        self._notify(state)
+
+    def _notify(self, state: str):
+        for listener in self._listeners:
+            try:
+                listener(state)
+            except Exception:
+                logger.exception("Circuit breaker listener failed")
@@ -3,12 +3,85 @@ from tkinter import messagebox, filedialog, TclError
 import webbrowser
 import keyword
 import re
+from tkinter import font
+from bisect import bisect_right
+
+HIGHLIGHT_TAGS = ("keyword", "string", "comment")
+HIGHLIGHT_MARGIN = 50  # Lines highlighted above and below the visible ones
+
+# Wraps a Text widget's command. The edited index is taken before an insert or
+# delete and passed on only once it succeeds, so Tk's own errors (nothing to
+# undo, no selection to copy) stay plain Tcl errors that its bindings catch,
+# rather than passing through Python, which would raise them again in mainloop.
+EDIT_HOOK = """
+rename %(widget)s %(widget)s_text
+proc %(widget)s {operation args} {
+    if {$operation in {insert delete replace}} {
+        catch {%(widget)s_text index [lindex $args 0]} edited
+    }
+    set result [%(widget)s_text $operation {*}$args]
+    if {[info exists edited]} {
+        %(callback)s $edited
+    }
+    return $result
+}
+"""
+
+TOKENS = re.compile(
+    r"(?P<comment>#.*)"
+    r"|(?P<string>(?:\b[rRbBuUfF]{1,2})?(?:'''|\"\"\"|'|\"))"
+    r"|(?P<keyword>\b(?:" + "|".join(keyword.kwlist) + r")\b)"
+)
+STATE_TOKENS = re.compile(r"(?P<comment>#.*)|(?P<string>'''|\"\"\"|'|\")")
+# The rest of a string after its opening quote. A '...' string ends at the end
+# of its line unless a backslash continues it; an unclosed one never matches.
+STRING_ENDS = {
+    "'''": re.compile(r"(?:\\[\s\S]|[^\\])*?'''"),
+    '"""': re.compile(r'(?:\\[\s\S]|[^\\])*?"""'),
+    "'": re.compile(r"(?:\\[\s\S]|[^\\'\n])*(?:'|$)", re.MULTILINE),
+    '"': re.compile(r'(?:\\[\s\S]|[^\\"\n])*(?:"|$)', re.MULTILINE),
+}
+
+
+def scan_python(text, state="", pattern=TOKENS):
+    # The (tag, start, end) spans of text, which starts inside a string if state
+    # is its open quote, and the state at the start of each following line (the
+    # last one is for the line after text)
+    tokens = []
+    states = []
+    position = counted = start = 0
+    while True:
+        if state:
+            match = STRING_ENDS[state].match(text, position)
+            position = match.end() if match else len(text)
+            states += [""] * text.count("\n", counted, start) + [state] * text.count("\n", start, position)
+            counted = position
+            tokens.append(("string", start, position))
+            if match is None:
+                break
+            state = ""
+        match = pattern.search(text, position)
+        if match is None:
+            break
+        start, position = match.span()
+        if match.lastgroup == "string":
+            state = match.group().lstrip("rRbBuUfF")
+        else:
+            tokens.append((match.lastgroup, start, position))
+    states += [""] * text.count("\n", counted)
+    states.append(state)
+    return tokens, states
+
 
 class TextEditor:
     def __init__(self, root):
         self.root = root
         self.root.title("Simple Text Editor")
         self.root.geometry("800x600")
+        self.line_states = [""]  # Open quote, if any, at the start of each line
+        self.highlighted = (1, 0)  # Lines highlighted since the last edit
+        self.gutter_view = None  # Visible lines, first line's y and line count drawn in the gutter
+        self.update_pending = False
         self.create_widgets()
         self.text.edit_modified(False)  # Reset modified flag on initialization
         
@@ -61,31 +134,46 @@ class TextEditor:
         self.text = Text(self.text_frame, wrap="none", undo=True, yscrollcommand=self.sync_scroll_y, bg="#2E3440", fg="#D8DEE9", insertbackground="#D8DEE9")
         self.text.pack(side="left", fill="both", expand=True)
         self.scrollbar_y.config(command=self.scroll_y)
+        self.text.tag_config("keyword", foreground="#81A1C1")
+        self.text.tag_config("string", foreground="#A3BE8C")
+        self.text.tag_config("comment", foreground="#616E88")
+        self.create_edit_hook()
         
         # Bind events after creating the text widget
         self.text.bind("<Key>", self.on_text_changed)
         self.text.bind("<MouseWheel>", self.on_text_changed)
     
     def create_line_numbers(self):
-        self.line_numbers = Text(self.root, width=4, bg="#3B4252", fg="#D8DEE9", state="disabled", wrap="none")
+        self.line_font = font.Font(font=self.text["font"])
+        self.line_numbers = Canvas(self.root, width=self.line_font.measure("0000"), bg="#3B4252", highlightthickness=0)
         self.line_numbers.pack(side="left", fill="y")
         self.update_line_numbers()
     
     def update_line_numbers(self, *args):
-        self.line_numbers.config(state="normal")
-        self.line_numbers.delete(1.0, "end")
-        lines = self.text.get("1.0", "end-1c").split('\n')
-        line_numbers_str = '\n'.join(f'{i+1}' for i in range(len(lines)))
-        self.line_numbers.insert("1.0", line_numbers_str)
-        self.line_numbers.config(state="disabled")
+        # Draw the numbers of the visible lines only, where dlineinfo puts them,
+        # and only when the visible lines or the line count change
+        first, last = self.visible_lines()
+        info = self.text.dlineinfo(f"{first}.0")
+        view = (first, last, info and info[1], self.line_count())
+        if view == self.gutter_view:
+            return
+        self.gutter_view = view
+        width = self.line_font.measure("0" * max(4, len(str(view[3])) + 1))
+        if width != self.line_numbers.winfo_reqwidth():
+            self.line_numbers.config(width=width)
+        self.line_numbers.delete("all")
+        for line in range(first, last + 1):
+            info = self.text.dlineinfo(f"{line}.0")
+            if info is None:
+                break
+            self.line_numbers.create_text(width - 4, info[1], anchor="ne", text=str(line), fill="#D8DEE9", font=self.line_font)
         
     def sync_scroll_y(self, *args):
         self.scrollbar_y.set(*args)
-        self.line_numbers.yview_moveto(args[0])
+        self.schedule_update()
     
     def scroll_y(self, *args):
         self.text.yview(*args)
-        self.line_numbers.yview(*args)
 
     def create_context_menu(self):
         self.context_menu = Menu(self.text, tearoff=0)
@@ -119,23 +207,118 @@ class TextEditor:
                 content = self.text.get(1.0, END)
                 file.write(content)
     
+    def create_edit_hook(self):
+        # Route the widget's Tcl command through a Tcl proc so every insert and delete
+        # is seen, whether typed, pasted, undone or made by open_file
+        callback = self.root.register(self.text_edited)
+        self.root.tk.eval(EDIT_HOOK % {"widget": self.text._w, "callback": callback})
+    
+    def text_edited(self, index):
+        # Lines before the edit keep their states and tags
+        line = min(int(index.split(".")[0]), self.line_count())
+        del self.line_states[line:]
+        first, last = self.highlighted
+        self.highlighted = (first, min(last, line - 1))
+        self.schedule_update()
+    
+    def line_count(self):
+        return int(self.text.index("end-1c").split(".")[0])
+    
+    def visible_lines(self):
+        first = self.text.index("@0,0")
+        last = self.text.index(f"@0,{self.text.winfo_height()}")
+        return int(first.split(".")[0]), int(last.split(".")[0])
+    
+    def schedule_update(self):
+        # Highlighting and the gutter catch up once per batch of edits and scrolls
+        if not self.update_pending:
+            self.update_pending = True
+            self.text.after_idle(self.update_view)
+    
+    def update_view(self):
+        self.update_pending = False
+        self.highlight_syntax()
+        self.update_line_numbers()
+    
     def highlight_syntax(self):
-        self.text.tag_remove("keyword", "1.0", "end")
-        self.text.tag_remove("string", "1.0", "end")
-        self.text.tag_remove("comment", "1.0", "end")
+        # Highlight the visible lines plus a margin, skipping lines already
+        # highlighted since the last edit
+        first, last = self.visible_lines()
+        first = max(1, first - HIGHLIGHT_MARGIN)
+        last = min(self.line_count(), last + HIGHLIGHT_MARGIN)
+        done_first, done_last = self.highlighted
+        if done_last < first or done_first > last:
+            self.highlight_lines(first, last)
+        else:
+            if first < done_first:
+                self.highlight_lines(first, done_first - 1)
+            if last > done_last:
+                self.highlight_lines(done_last + 1, last)
+        self.highlighted = (first, last)
+    
+    def highlight_lines(self, first, last):
+        self.ensure_line_states(first)
+        text = self.text.get(f"{first}.0", f"{last}.end")
+        tokens, states = scan_python(text, self.line_states[first - 1])
+        self.line_states[first:last + 1] = states
+        
+        # Offsets of the line starts in text turn each match into a line.column index
+        offsets = [0] + [match.end() for match in re.finditer("\n", text)]
+        def index(offset):
+            line = bisect_right(offsets, offset) - 1
+            return f"{first + line}.{offset - offsets[line]}"
         
-        keywords_pattern = r'\b(?:' + '|'.join(keyword.kwlist) + r')\b'
-        strings_pattern = r'(\".*?\"|\'.*?\')'
-        comments_pattern = r'(#.*?$)'
+        ranges = {tag: [] for tag in HIGHLIGHT_TAGS}
+        for tag, start, end in tokens:
+            ranges[tag] += (index(start), index(end))
+        for tag, indices in ranges.items():
+            self.text.tag_remove(tag, f"{first}.0", f"{last}.end")
+            if indices:
+                self.text.tag_add(tag, *indices)
+    
+    def ensure_line_states(self, line):
+        # Extend the cached states (which string, if any, is open at the start of
+        # each line) through the given line
+        known = len(self.line_states)
+        if known < line:
+            text = self.text.get(f"{known}.0", f"{line - 1}.end")
+            self.line_states[known:] = scan_python(text, self.line_states[known - 1], STATE_TOKENS)[1]
+    
+    def on_text_changed(self, event=None):
+        self.schedule_update()
+    
+    def cut_text(self, event=None):
+        self.text.event_generate("<<Cut>>")
+    
+    def copy_text(self, event=None):
+        self.text.event_generate("<<Copy>>")
+    
+    def paste_text(self, event=None):
+        self.text.event_generate("<<Paste>>")
+    
+    def select_all(self, event=None):
+        self.text.tag_add("sel", "1.0", "end")
+    
+    def undo(self, event=None):
+        try:
+            self.text.edit_undo()
+        except TclError:
+            pass
+    
+    def redo(self, event=None):
+        try:
+            self.text.edit_redo()
+        except TclError:
+            pass
+    
+    def open_tkinter_help(self):
+        webbrowser.open_new(r"https://docs.python.org/3/library/tkinter.html")
+    
+    def about_tkinter(self):
+        messagebox.showinfo("About Tkinter", "Tkinter is the standard GUI library for Python. Python when combined with Tkinter provides a fast and easy way to create GUI applications. Tkinter provides a powerful object-oriented interface to the Tk GUI toolkit.")
 
-        text = self.text.get("1.0", "end-1c")
 
-        for match in re.finditer(keywords_pattern, text, re.MULTILINE):
-            start, end = match.span()
-            start_index = f"1.0 + {start} chars"
-            end_index = f"1.0 + {end} chars"
-            self.text.tag_add("keyword", start_index, end_index)
-        
-        for match in re.finditer(strings_pattern, text, re.MULTILINE):
-            start, end = match.span()
-            start_index = f"1.0 + {start} chars"
\ No newline at end of file
+if __name__ == "__main__":
+    root = Tk()
+    editor = TextEditor(root)
+    root.mainloop()